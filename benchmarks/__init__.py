@@ -0,0 +1 @@
+"""Performance benchmarks for webp2png."""
@@ -0,0 +1,5 @@
+"""Entry point for python -m benchmarks."""
+from .bench import cli
+
+if __name__ == '__main__':
+    cli()
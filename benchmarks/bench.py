@@ -0,0 +1,369 @@
+"""Micro-benchmarks for the converter, validator and file collection.
+
+使い方:
+    python -m benchmarks run --output baseline.json
+    python -m benchmarks run --output current.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.10
+    python -m benchmarks encoders --output encoders.json
+"""
+import io
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import click
+import PIL
+from PIL import Image
+
+from webp2png import __version__
+from webp2png.converter import (
+    DEFAULT_PROFILE,
+    ENCODE_PROFILES,
+    convert_multiple_files,
+    convert_webp_to_png,
+    get_encode_options,
+)
+from webp2png.encoders import available_encoders, get_encoder
+from webp2png.utils import collect_webp_files
+from webp2png.validator import is_webp_file, validate_input_file
+
+from .corpus import CORPUS_SPECS, generate_corpus
+
+# 回帰と判定する中央値の悪化率のデフォルト（10%）
+DEFAULT_THRESHOLD = 0.10
+
+
+def time_call(func: Callable[[], None], repeat: int) -> Dict[str, float]:
+    """
+    関数をrepeat回実行して所要時間の統計を返す
+
+    Args:
+        func: 計測する関数
+        repeat: 実行回数
+
+    Returns:
+        {"median": 秒, "min": 秒, "max": 秒}
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples),
+    }
+
+
+def build_benchmarks(
+    corpus: Dict[str, List[Path]],
+    corpus_root: Path,
+    output_root: Path,
+    jobs: int,
+    profile: str = DEFAULT_PROFILE
+) -> List[Tuple[str, int, Callable[[], None]]]:
+    """
+    計測対象の一覧を作る
+
+    Returns:
+        [(ベンチマーク名, 1回あたりの処理件数, 計測する関数)]
+    """
+    all_files = [path for paths in corpus.values() for path in paths]
+    benchmarks: List[Tuple[str, int, Callable[[], None]]] = []
+
+    def each(func: Callable[[Path], object], paths: List[Path]) -> Callable[[], None]:
+        def run() -> None:
+            for path in paths:
+                func(path)
+        return run
+
+    benchmarks.append(('is_webp_file', len(all_files), each(is_webp_file, all_files)))
+    benchmarks.append(('validate_input_file', len(all_files), each(validate_input_file, all_files)))
+    benchmarks.append((
+        'collect_webp_files',
+        len(all_files),
+        lambda: collect_webp_files([corpus_root], recursive=True)
+    ))
+
+    for name, paths in corpus.items():
+        output_dir = output_root / name
+
+        def convert(path: Path, output_dir: Path = output_dir) -> None:
+            convert_webp_to_png(path, output_dir / f"{path.stem}.png", force=True, profile=profile)
+
+        benchmarks.append((f'convert_webp_to_png[{name}]', len(paths), each(convert, paths)))
+
+    benchmarks.append((
+        f'convert_multiple_files[jobs={jobs}]',
+        len(all_files),
+        lambda: convert_multiple_files(
+            all_files, output_dir=output_root / 'batch', force=True, jobs=jobs, profile=profile
+        )
+    ))
+    return benchmarks
+
+
+def run_benchmarks(
+    corpus_dir: Optional[Path] = None,
+    repeat: int = 5,
+    quick: bool = False,
+    jobs: int = 4,
+    select: Optional[str] = None,
+    profile: str = DEFAULT_PROFILE
+) -> dict:
+    """
+    ベンチマークを実行して結果を返す
+
+    Args:
+        corpus_dir: コーパスの生成先（Noneの場合は一時ディレクトリ）
+        repeat: 各ベンチマークの繰り返し回数
+        quick: 縮小したコーパスで実行するか
+        jobs: convert_multiple_files の並列数
+        select: 名前にこの文字列を含むベンチマークのみ実行する
+        profile: 変換時のPNGエンコードプロファイル
+
+    Returns:
+        環境情報と計測結果の辞書
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="webp2png-bench-"))
+    try:
+        corpus_root = corpus_dir or work_dir / 'corpus'
+        corpus = generate_corpus(corpus_root, quick=quick)
+        output_root = work_dir / 'output'
+
+        results = {}
+        for name, ops, func in build_benchmarks(corpus, corpus_root, output_root, jobs, profile):
+            if select and select not in name:
+                continue
+            # 初回はキャッシュ・ディレクトリ作成の影響を除くためのウォームアップ
+            func()
+            stats = time_call(func, repeat)
+            stats['ops'] = ops
+            results[name] = stats
+            click.echo(f"{name:<48} {stats['median'] * 1000:10.2f} ms  ({ops} ops)", err=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'webp2png': __version__,
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'quick': quick,
+            'profile': profile,
+        },
+        'results': results,
+    }
+
+
+def run_encoder_benchmarks(
+    corpus_dir: Optional[Path] = None,
+    repeat: int = 3,
+    quick: bool = False,
+    profiles: Sequence[str] = tuple(ENCODE_PROFILES),
+    encoders: Optional[Sequence[str]] = None,
+    select: Optional[str] = None
+) -> dict:
+    """
+    エンコーダのバックエンドごとにPNGエンコードの速度と出力サイズを計測する
+
+    デコード済みの同じ画像を各バックエンドでエンコードするため、デコードの時間は含まない。
+    アニメーションはフレームごとに静止画と同じエンコードを行うため対象外とする。
+
+    Args:
+        corpus_dir: コーパスの生成先（Noneの場合は一時ディレクトリ）
+        repeat: 各ベンチマークの繰り返し回数
+        quick: 縮小したコーパスで実行するか
+        profiles: 計測するPNGエンコードプロファイル
+        encoders: 計測するバックエンド（Noneの場合は利用できるすべて）
+        select: 名前にこの文字列を含むベンチマークのみ実行する
+
+    Returns:
+        環境情報と計測結果の辞書（結果には ops, bytes, mp_per_s を含む）
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="webp2png-bench-"))
+    try:
+        corpus = generate_corpus(corpus_dir or work_dir / 'corpus', quick=quick)
+        encoders = list(encoders or available_encoders())
+        results = {}
+        for corpus_name, paths in corpus.items():
+            if CORPUS_SPECS[corpus_name].frames > 1:
+                continue
+            images = []
+            for path in paths:
+                with Image.open(path) as img:
+                    images.append(img.convert('RGBA' if img.mode == 'RGBA' else 'RGB'))
+            pixels = sum(img.size[0] * img.size[1] for img in images)
+
+            for profile in profiles:
+                encode_options = get_encode_options(profile)
+                for encoder_name in encoders:
+                    name = f'encode[{corpus_name}/{profile}/{encoder_name}]'
+                    if select and select not in name:
+                        continue
+                    encoder = get_encoder(encoder_name, encode_options)
+                    sizes = []
+
+                    def encode() -> None:
+                        sizes.clear()
+                        for img in images:
+                            buf = io.BytesIO()
+                            encoder.save(img, buf, encode_options)
+                            sizes.append(buf.tell())
+
+                    encode()
+                    stats = time_call(encode, repeat)
+                    stats['ops'] = len(images)
+                    stats['bytes'] = sum(sizes) // len(sizes)
+                    stats['mp_per_s'] = pixels / stats['median'] / 1e6
+                    results[name] = stats
+                    click.echo(
+                        f"{name:<56} {stats['mp_per_s']:8.1f} MP/s {stats['bytes'] / 1024:10.1f} KiB/file",
+                        err=True
+                    )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'webp2png': __version__,
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'quick': quick,
+            'encoders': encoders,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    ベースラインと現在の結果を比較する
+
+    Args:
+        baseline: ベースラインの結果
+        current: 現在の結果
+        threshold: 回帰と判定する中央値の悪化率（0.10 = 10%）
+
+    Returns:
+        両方に存在するベンチマークごとの比較結果
+    """
+    rows = []
+    for name, base in baseline['results'].items():
+        if name not in current['results']:
+            continue
+        cur = current['results'][name]
+        ratio = cur['median'] / base['median'] if base['median'] > 0 else float('inf')
+        rows.append({
+            'name': name,
+            'baseline': base['median'],
+            'current': cur['median'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
+
+
+@click.group()
+def cli() -> None:
+    """webp2png のマイクロベンチマーク"""
+
+
+@cli.command()
+@click.option('-o', '--output', type=click.Path(dir_okay=False, path_type=Path), help='結果を保存するJSONファイル')
+@click.option('--corpus-dir', type=click.Path(file_okay=False, path_type=Path), help='コーパスの生成先（再利用可能）')
+@click.option('--repeat', type=click.IntRange(min=1), default=5, show_default=True, help='繰り返し回数')
+@click.option('--quick', is_flag=True, help='縮小したコーパスで実行')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=4, show_default=True, help='一括変換の並列数')
+@click.option('-k', '--select', help='名前にこの文字列を含むベンチマークのみ実行')
+@click.option('--profile', type=click.Choice(list(ENCODE_PROFILES)), default=DEFAULT_PROFILE, show_default=True, help='PNGエンコードプロファイル')
+def run(
+    output: Optional[Path],
+    corpus_dir: Optional[Path],
+    repeat: int,
+    quick: bool,
+    jobs: int,
+    select: Optional[str],
+    profile: str
+) -> None:
+    """ベンチマークを実行する"""
+    # 変換ごとのINFOログは計測のノイズになるため抑制する
+    logging.getLogger('webp2png').setLevel(logging.WARNING)
+    result = run_benchmarks(corpus_dir, repeat=repeat, quick=quick, jobs=jobs, select=select, profile=profile)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if output:
+        output.write_text(text + "\n", encoding='utf-8')
+        click.echo(f"Saved: {output}", err=True)
+    else:
+        click.echo(text)
+
+
+@cli.command()
+@click.option('-o', '--output', type=click.Path(dir_okay=False, path_type=Path), help='結果を保存するJSONファイル')
+@click.option('--corpus-dir', type=click.Path(file_okay=False, path_type=Path), help='コーパスの生成先（再利用可能）')
+@click.option('--repeat', type=click.IntRange(min=1), default=3, show_default=True, help='繰り返し回数')
+@click.option('--quick', is_flag=True, help='縮小したコーパスで実行')
+@click.option('--profile', 'profiles', type=click.Choice(list(ENCODE_PROFILES)), multiple=True, help='計測するプロファイル（複数指定可能、デフォルト: すべて）')
+@click.option('-e', '--encoder', 'encoders', multiple=True, help='計測するバックエンド（複数指定可能、デフォルト: 利用できるすべて）')
+@click.option('-k', '--select', help='名前にこの文字列を含むベンチマークのみ実行')
+def encoders(
+    output: Optional[Path],
+    corpus_dir: Optional[Path],
+    repeat: int,
+    quick: bool,
+    profiles: Tuple[str, ...],
+    encoders: Tuple[str, ...],
+    select: Optional[str]
+) -> None:
+    """PNGエンコーダのバックエンドごとのスループットと出力サイズを比較する"""
+    result = run_encoder_benchmarks(
+        corpus_dir,
+        repeat=repeat,
+        quick=quick,
+        profiles=profiles or tuple(ENCODE_PROFILES),
+        encoders=encoders or None,
+        select=select
+    )
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if output:
+        output.write_text(text + "\n", encoding='utf-8')
+        click.echo(f"Saved: {output}", err=True)
+    else:
+        click.echo(text)
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--threshold', type=float, default=DEFAULT_THRESHOLD, show_default=True, help='回帰と判定する悪化率')
+def compare(baseline: Path, current: Path, threshold: float) -> None:
+    """ベースラインと比較し、閾値を超えて遅くなったベンチマークを報告する"""
+    rows = compare_results(
+        json.loads(baseline.read_text(encoding='utf-8')),
+        json.loads(current.read_text(encoding='utf-8')),
+        threshold
+    )
+    for row in rows:
+        mark = "REGRESSION" if row['regression'] else ""
+        click.echo(
+            f"{row['name']:<48} {row['baseline'] * 1000:10.2f} ms -> {row['current'] * 1000:10.2f} ms"
+            f"  x{row['ratio']:.2f} {mark}"
+        )
+
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        click.echo(f"\n{len(regressions)} regression(s) above {threshold:.0%}", err=True)
+        sys.exit(1)
+    click.echo(f"\nNo regressions above {threshold:.0%}")
@@ -0,0 +1,96 @@
+"""Synthetic WebP corpus generation for benchmarks."""
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from PIL import Image, ImageChops, ImageDraw
+
+
+class CorpusSpec(NamedTuple):
+    """ベンチマーク用コーパスの種類"""
+    size: Tuple[int, int]
+    lossless: bool
+    alpha: bool
+    frames: int
+    count: int
+
+
+# small/large × lossless/lossy × alpha/opaque と、アニメーションの組み合わせ
+CORPUS_SPECS: Dict[str, CorpusSpec] = {
+    'small_lossy_opaque': CorpusSpec((64, 64), lossless=False, alpha=False, frames=1, count=40),
+    'small_lossless_alpha': CorpusSpec((64, 64), lossless=True, alpha=True, frames=1, count=40),
+    'large_lossy_opaque': CorpusSpec((1920, 1080), lossless=False, alpha=False, frames=1, count=3),
+    'large_lossless_alpha': CorpusSpec((1920, 1080), lossless=True, alpha=True, frames=1, count=3),
+    'animated_alpha': CorpusSpec((256, 256), lossless=False, alpha=True, frames=24, count=3),
+}
+
+# --quick 実行時のファイル数の縮小率
+QUICK_DIVISOR = 4
+
+
+def make_image(size: Tuple[int, int], alpha: bool, seed: int) -> Image.Image:
+    """
+    決定的な合成画像を作る（グラデーションと図形の組み合わせ）
+
+    Args:
+        size: 画像サイズ
+        alpha: 半透明の領域を含めるか
+        seed: 画像ごとの変化を与える値
+
+    Returns:
+        RGBまたはRGBAの画像
+    """
+    width, height = size
+    red = Image.linear_gradient('L').resize(size)
+    green = Image.radial_gradient('L').resize(size)
+    blue = ImageChops.offset(red.transpose(Image.Transpose.ROTATE_90).resize(size), seed * 7, seed * 3)
+    img = Image.merge('RGB', (red, green, blue))
+
+    draw = ImageDraw.Draw(img)
+    step = max(width // 8, 4)
+    for i in range(8):
+        x = (i * step + seed * 13) % width
+        y = (i * step * 2 + seed * 5) % height
+        draw.ellipse([x, y, x + step, y + step], fill=((seed * 40 + i * 30) % 256, i * 32 % 256, 200))
+
+    if alpha:
+        mask = Image.radial_gradient('L').resize(size)
+        img.putalpha(ImageChops.invert(mask))
+    return img
+
+
+def generate_corpus(root: Path, quick: bool = False) -> Dict[str, List[Path]]:
+    """
+    ベンチマーク用のWebPコーパスを生成する（既存のファイルは再利用する）
+
+    Args:
+        root: 生成先のディレクトリ
+        quick: ファイル数を減らした短時間用のコーパスにするか
+
+    Returns:
+        {コーパス名: WebPファイルのパスリスト}
+    """
+    corpus: Dict[str, List[Path]] = {}
+    for name, spec in CORPUS_SPECS.items():
+        directory = root / name
+        directory.mkdir(parents=True, exist_ok=True)
+        count = max(spec.count // QUICK_DIVISOR, 1) if quick else spec.count
+        paths = []
+        for index in range(count):
+            path = directory / f"{name}_{index:04d}.webp"
+            if not path.exists():
+                _write_webp(path, spec, index)
+            paths.append(path)
+        corpus[name] = paths
+    return corpus
+
+
+def _write_webp(path: Path, spec: CorpusSpec, seed: int) -> None:
+    """コーパスの1ファイルを書き出す"""
+    save_kwargs = {'lossless': spec.lossless, 'quality': 80}
+    if spec.frames > 1:
+        frames = [make_image(spec.size, spec.alpha, seed + i) for i in range(spec.frames)]
+        frames[0].save(
+            path, 'WEBP', save_all=True, append_images=frames[1:], duration=40, loop=0, **save_kwargs
+        )
+    else:
+        make_image(spec.size, spec.alpha, seed).save(path, 'WEBP', **save_kwargs)
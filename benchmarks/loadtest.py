@@ -0,0 +1,116 @@
+"""Load test for the `webp2png serve` HTTP service.
+
+使い方:
+    webp2png serve --port 8080 &
+    python -m benchmarks.loadtest --url http://127.0.0.1:8080/convert --concurrency 16 --requests 2000
+"""
+import http.client
+import io
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import click
+
+from .corpus import make_image
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    """サンプルのパーセンタイル値を返す"""
+    ordered = sorted(samples)
+    index = min(int(len(ordered) * percent / 100), len(ordered) - 1)
+    return ordered[index]
+
+
+def _worker(
+    url: str,
+    body: bytes,
+    count: int,
+    latencies: List[float],
+    errors: List[str],
+    lock: threading.Lock
+) -> None:
+    """1本のkeep-alive接続でcount件のリクエストを送る"""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    local_latencies = []
+    local_errors = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers={"Content-Type": "image/webp"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors.append(f"HTTP {response.status}")
+                    if response.getheader("Connection", "").lower() == "close":
+                        conn.close()
+                        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                    continue
+            except (OSError, http.client.HTTPException) as e:
+                local_errors.append(type(e).__name__)
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                continue
+            local_latencies.append(time.perf_counter() - start)
+    finally:
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.extend(local_errors)
+
+
+@click.command()
+@click.option('--url', default='http://127.0.0.1:8080/convert', show_default=True, help='変換エンドポイントのURL')
+@click.option('-c', '--concurrency', type=click.IntRange(min=1), default=8, show_default=True, help='同時接続数')
+@click.option('-n', '--requests', 'total', type=click.IntRange(min=1), default=1000, show_default=True, help='総リクエスト数')
+@click.option('--input', 'input_path', type=click.Path(exists=True, dir_okay=False, path_type=Path), help='送信するWebPファイル（省略時は合成画像）')
+@click.option('--size', type=int, default=256, show_default=True, help='合成画像の一辺のピクセル数')
+def main(url: str, concurrency: int, total: int, input_path: Optional[Path], size: int) -> None:
+    """変換サービスに負荷をかけ、スループットとレイテンシを表示する"""
+    if input_path:
+        body = input_path.read_bytes()
+    else:
+        buf = io.BytesIO()
+        make_image((size, size), alpha=True, seed=0).save(buf, 'WEBP', quality=80)
+        body = buf.getvalue()
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    threads = [
+        threading.Thread(target=_worker, args=(url, body, count, latencies, errors, lock))
+        for count in per_worker if count
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    click.echo(f"Requests:    {total} ({len(body)} bytes each, concurrency {concurrency})")
+    click.echo(f"Succeeded:   {len(latencies)}")
+    click.echo(f"Failed:      {len(errors)}")
+    click.echo(f"Elapsed:     {elapsed:.2f} s")
+    click.echo(f"Throughput:  {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        click.echo(
+            f"Latency:     mean {statistics.mean(latencies) * 1000:.1f} ms, "
+            f"p50 {_percentile(latencies, 50) * 1000:.1f} ms, "
+            f"p95 {_percentile(latencies, 95) * 1000:.1f} ms, "
+            f"p99 {_percentile(latencies, 99) * 1000:.1f} ms"
+        )
+    if errors:
+        click.echo(f"Errors:      {', '.join(sorted(set(errors)))}", err=True)
+
+
+if __name__ == '__main__':
+    main()
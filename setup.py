@@ -16,12 +16,16 @@ setup(
     author="Your Name",
     author_email="your.email@example.com",
     url="https://github.com/yourusername/webp2png",
-    packages=find_packages(),
+    packages=find_packages(exclude=("benchmarks", "benchmarks.*", "tests", "tests.*")),
     install_requires=[
         "Pillow>=10.0.0",
         "click>=8.0.0",
         "tqdm>=4.65.0",
     ],
+    extras_require={
+        # 高い圧縮レベルでのPNGエンコードを高速化するdeflate実装
+        "fast": ["deflate", "zlib-ng"],
+    },
     python_requires=">=3.8",
     entry_points={
         "console_scripts": [
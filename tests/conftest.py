@@ -0,0 +1,19 @@
+"""Shared fixtures for the webp2png tests."""
+from pathlib import Path
+from typing import Callable, Tuple
+
+import pytest
+from PIL import Image
+
+
+def _create_test_webp(output_path: Path, size: Tuple[int, int] = (16, 16)) -> Path:
+    """テスト用の半透明のWebP画像を作成する"""
+    img = Image.new('RGBA', size, (0, 0, 255, 128))
+    img.save(output_path, 'WEBP')
+    return output_path
+
+
+@pytest.fixture
+def create_test_webp() -> Callable[..., Path]:
+    """テスト用のWebP画像を作成する関数（create_test_webp(path, size=(16, 16))）"""
+    return _create_test_webp
@@ -0,0 +1,76 @@
+"""Tests for aio module."""
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from webp2png.aio import AsyncConverter, aconvert, aiter_convert
+from webp2png.converter import ConversionError
+
+
+def test_aconvert_success_and_error(create_test_webp):
+    """変換結果を返し、失敗時はConversionErrorをそのまま送出する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        create_test_webp(input_path)
+        
+        result = asyncio.run(aconvert(input_path, Path(tmpdir) / "test.png"))
+        assert result == Path(tmpdir) / "test.png"
+        assert result.exists()
+        
+        with pytest.raises(ConversionError):
+            asyncio.run(aconvert(Path(tmpdir) / "missing.webp"))
+
+
+def test_aiter_convert_async_inputs(create_test_webp):
+    """非同期イテラブルの入力を変換し、完了したものから結果を返す"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i in range(5):
+            create_test_webp(Path(tmpdir) / f"img{i}.webp")
+        
+        async def inputs():
+            for i in range(5):
+                await asyncio.sleep(0)
+                yield Path(tmpdir) / f"img{i}.webp"
+        
+        async def run():
+            return [r async for r in aiter_convert(inputs(), jobs=2, output_dir=Path(tmpdir) / "out")]
+        
+        results = asyncio.run(run())
+        assert len(results) == 5
+        assert all(result.ok for result in results)
+
+
+def test_async_converter_cancel(create_test_webp):
+    """キャンセルしてもイベントループが止まらず、未着手の入力は変換されない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i in range(4):
+            path = Path(tmpdir) / f"img{i}.webp"
+            create_test_webp(path)
+            paths.append(path)
+        output_dir = Path(tmpdir) / "out"
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        
+        async def run():
+            async with AsyncConverter(jobs=1, executor=executor) as converter:
+                first = asyncio.Event()
+                
+                async def consume():
+                    async for _ in converter.iter_convert(paths, output_dir=output_dir):
+                        first.set()
+                
+                task = asyncio.ensure_future(consume())
+                await first.wait()
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+        
+        asyncio.run(run())
+        # 実行中だった変換（最大 jobs 件）の完了を待ってから出力を確かめる
+        executor.shutdown(wait=True)
+        # 1件目と、キャンセル時に実行中だった1件以外は変換されない
+        assert 1 <= len(list(output_dir.glob("*.png"))) <= 2
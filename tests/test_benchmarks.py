@@ -0,0 +1,20 @@
+"""Tests for benchmark helpers."""
+from benchmarks.bench import compare_results
+
+
+def test_compare_results_flags_regressions():
+    """閾値を超えて遅くなったベンチマークのみ回帰と判定する"""
+    baseline = {'results': {
+        'a': {'median': 1.0},
+        'b': {'median': 1.0},
+        'only_in_baseline': {'median': 1.0},
+    }}
+    current = {'results': {
+        'a': {'median': 1.05},
+        'b': {'median': 1.5},
+    }}
+    
+    rows = {row['name']: row for row in compare_results(baseline, current, threshold=0.10)}
+    assert set(rows) == {'a', 'b'}
+    assert rows['a']['regression'] is False
+    assert rows['b']['regression'] is True
@@ -1,4 +1,5 @@
 """Tests for converter module."""
+import io
 import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -6,17 +7,20 @@ from unittest.mock import MagicMock, patch
 import pytest
 from PIL import Image
 
-from webp2png.converter import ConversionError, convert_webp_to_png
+from webp2png.converter import (
+    ConversionError,
+    _open_webp,
+    convert_bytes,
+    convert_fileobj,
+    convert_multiple_files,
+    convert_renditions,
+    convert_webp_to_png,
+    iter_convert,
+    parse_rendition,
+)
 from webp2png.validator import is_webp_file
 
 
-def create_test_webp(output_path: Path) -> None:
-    """テスト用のWebP画像を作成"""
-    # 簡単なテスト画像を作成
-    img = Image.new('RGBA', (100, 100), (255, 0, 0, 128))
-    img.save(output_path, 'WEBP')
-
-
 def test_convert_webp_to_png_not_exists():
     """存在しないファイルの変換"""
     with pytest.raises(ConversionError):
@@ -36,13 +40,29 @@ def test_convert_webp_to_png_invalid_format():
         temp_path.unlink()
 
 
-@patch('webp2png.converter.validate_input_file')
-@patch('webp2png.converter.is_webp_file')
-def test_convert_webp_to_png_success(mock_is_webp, mock_validate):
-    """正常な変換のテスト（モック使用）"""
-    mock_validate.return_value = (True, "")
-    mock_is_webp.return_value = True
-    
+def test_output_dir_creation_failure_is_conversion_error(create_test_webp):
+    """出力ディレクトリを作成できない場合は出力エラーとして扱い、バッチは打ち切らない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        create_test_webp(input_path)
+        # 通常のファイルの下にはディレクトリを作れない
+        blocker = Path(tmpdir) / "blocker"
+        blocker.write_bytes(b"")
+        
+        with pytest.raises(ConversionError) as excinfo:
+            convert_webp_to_png(input_path, blocker / "out" / "test.png")
+        assert excinfo.value.reason == "output"
+        
+        with pytest.raises(ConversionError) as excinfo:
+            convert_renditions(input_path, [parse_rendition("full")], output_dir=blocker / "out")
+        assert excinfo.value.reason == "output"
+        
+        results = list(iter_convert([input_path, input_path], output_dir=blocker / "out"))
+        assert [result.error_class for result in results] == ["output", "output"]
+
+
+def test_convert_webp_to_png_success(create_test_webp):
+    """正常な変換のテスト"""
     with tempfile.TemporaryDirectory() as tmpdir:
         input_path = Path(tmpdir) / "test.webp"
         output_path = Path(tmpdir) / "test.png"
@@ -59,3 +79,234 @@ def test_convert_webp_to_png_success(mock_is_webp, mock_validate):
         with Image.open(output_path) as img:
             assert img.format == 'PNG'
 
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_convert_multiple_files_parallel(executor, create_test_webp):
+    """並列変換でも入力順の結果辞書と完了通知が得られる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_paths = []
+        for i in range(4):
+            input_path = Path(tmpdir) / f"img{i}.webp"
+            create_test_webp(input_path)
+            input_paths.append(input_path)
+        broken_path = Path(tmpdir) / "broken.webp"
+        broken_path.write_bytes(b"not an image")
+        input_paths.append(broken_path)
+        
+        completed = []
+        results = convert_multiple_files(
+            input_paths,
+            output_dir=Path(tmpdir) / "out",
+            jobs=3,
+            executor=executor,
+            progress_callback=lambda input_path, result_path: completed.append(input_path)
+        )
+        
+        assert list(results) == input_paths
+        assert sorted(completed) == sorted(input_paths)
+        assert results[broken_path] is None
+        for input_path in input_paths[:4]:
+            assert results[input_path] == Path(tmpdir) / "out" / f"{input_path.stem}.png"
+            assert results[input_path].exists()
+
+
+def test_iter_convert_same_names_do_not_collide(create_test_webp):
+    """同名の入力を並列で同じディレクトリに変換しても出力名が衝突しない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_paths = []
+        for i in range(6):
+            input_path = Path(tmpdir) / f"dir{i}" / "img.webp"
+            input_path.parent.mkdir()
+            create_test_webp(input_path)
+            input_paths.append(input_path)
+        output_dir = Path(tmpdir) / "out"
+        
+        results = list(iter_convert(input_paths, output_dir=output_dir, jobs=4, executor="thread"))
+        
+        assert all(r.ok for r in results)
+        assert sorted(r.output_path.name for r in results) == ["img.png"] + [f"img_{i}.png" for i in range(1, 6)]
+
+
+def test_iter_convert_lazy_inputs_bounded(create_test_webp):
+    """遅延イテラブルを受け取り、処理中の件数を制限しながら結果を返す"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i in range(6):
+            create_test_webp(Path(tmpdir) / f"img{i}.webp")
+        
+        consumed = []
+        
+        def lazy_inputs():
+            for i in range(6):
+                consumed.append(i)
+                yield Path(tmpdir) / f"img{i}.webp"
+        
+        results = iter_convert(lazy_inputs(), output_dir=Path(tmpdir) / "out", jobs=2, max_in_flight=2)
+        first = next(results)
+        # 最初の結果が出た時点で入力をすべて読み込んではいない
+        assert len(consumed) < 6
+        rest = list(results)
+        
+        all_results = [first] + rest
+        assert len(all_results) == 6
+        for result in all_results:
+            assert result.ok
+            assert result.error is None
+            assert result.elapsed >= 0
+            assert result.output_path.exists()
+
+
+def test_convert_webp_to_png_profiles(create_test_webp):
+    """エンコードプロファイルごとにPNGとして保存できる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        create_test_webp(input_path)
+        
+        for profile in ["fast", "balanced", "smallest"]:
+            output_path = Path(tmpdir) / f"{profile}.png"
+            result = convert_webp_to_png(input_path, output_path, profile=profile)
+            with Image.open(result) as img:
+                assert img.format == 'PNG'
+        
+        with pytest.raises(ConversionError):
+            convert_webp_to_png(input_path, Path(tmpdir) / "x.png", profile="unknown")
+        with pytest.raises(ConversionError):
+            convert_webp_to_png(input_path, Path(tmpdir) / "x.png", compress_level=10)
+
+
+@pytest.mark.parametrize("color, expected_mode", [
+    ((255, 0, 0, 128), 'RGBA'),
+    ((255, 0, 0, 255), 'RGB'),
+])
+def test_convert_webp_to_png_auto_mode(color, expected_mode):
+    """透明度が実際にある場合のみRGBAで保存する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        Image.new('RGBA', (32, 32), color).save(input_path, 'WEBP', lossless=True)
+        
+        result = convert_webp_to_png(input_path, Path(tmpdir) / "auto.png")
+        with Image.open(result) as img:
+            assert img.mode == expected_mode
+        
+        result = convert_webp_to_png(input_path, Path(tmpdir) / "forced.png", mode='RGBA')
+        with Image.open(result) as img:
+            assert img.mode == 'RGBA'
+
+
+def test_convert_bytes_roundtrip():
+    """メモリ上のWebPデータをPNGデータに変換できる"""
+    buf = io.BytesIO()
+    Image.new('RGBA', (20, 10), (0, 0, 255, 64)).save(buf, 'WEBP')
+    
+    for data in (buf.getvalue(), memoryview(buf.getvalue())):
+        png_data = convert_bytes(data, profile="fast")
+        with Image.open(io.BytesIO(png_data)) as img:
+            assert img.format == 'PNG'
+            assert img.size == (20, 10)
+    
+    output = io.BytesIO()
+    convert_fileobj(io.BytesIO(buf.getvalue()), output)
+    assert output.getvalue().startswith(b'\x89PNG')
+
+
+def test_convert_bytes_invalid_data():
+    """ファイルと同じ基準でデータを検証する"""
+    with pytest.raises(ConversionError, match="empty"):
+        convert_bytes(b"")
+    with pytest.raises(ConversionError, match="Not a valid WebP"):
+        convert_bytes(b"not an image at all")
+    with patch('webp2png.validator.MAX_FILE_SIZE', 8):
+        with pytest.raises(ConversionError, match="too large"):
+            convert_bytes(b'RIFF\x00\x00\x00\x00WEBP')
+
+
+def test_convert_animated_webp_to_apng():
+    """アニメーションWebPは全フレーム・表示時間・ループ回数を保ったAPNGになる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "anim.webp"
+        frames = [Image.new('RGBA', (24, 16), (i * 60, 0, 0, 255)) for i in range(4)]
+        frames[0].save(input_path, 'WEBP', save_all=True, append_images=frames[1:],
+                       duration=[100, 200, 300, 400], loop=2, lossless=True)
+        
+        result = convert_webp_to_png(input_path, Path(tmpdir) / "anim.png", profile="fast")
+        with Image.open(result) as img:
+            assert img.format == 'PNG'
+            assert img.n_frames == 4
+            assert img.info['loop'] == 2
+            durations = []
+            colors = []
+            for i in range(img.n_frames):
+                img.seek(i)
+                img.load()
+                durations.append(img.info['duration'])
+                colors.append(img.convert('RGBA').getpixel((0, 0))[0])
+            assert durations == [100, 200, 300, 400]
+            assert colors == [0, 60, 120, 180]
+        
+        # 先頭フレームのみの変換
+        result = convert_webp_to_png(input_path, Path(tmpdir) / "still.png", animation=False)
+        with Image.open(result) as img:
+            assert getattr(img, 'n_frames', 1) == 1
+
+
+def test_convert_with_max_size_and_scale():
+    """縮小オプションはアスペクト比を保って縮小し、拡大はしない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "large.webp"
+        Image.new('RGB', (400, 200), (0, 128, 255)).save(input_path, 'WEBP')
+        
+        result = convert_webp_to_png(input_path, Path(tmpdir) / "thumb.png", max_size=100, resample="lanczos")
+        with Image.open(result) as img:
+            assert img.size == (100, 50)
+        
+        result = convert_webp_to_png(input_path, Path(tmpdir) / "box.png", max_size=(1000, 20))
+        with Image.open(result) as img:
+            assert img.size == (40, 20)
+        
+        with Image.open(io.BytesIO(convert_bytes(input_path.read_bytes(), scale=0.25))) as img:
+            assert img.size == (100, 50)
+        
+        # 元のサイズより大きい指定では拡大しない
+        with Image.open(io.BytesIO(convert_bytes(input_path.read_bytes(), max_size=1000))) as img:
+            assert img.size == (400, 200)
+        
+        with pytest.raises(ConversionError, match="resample"):
+            convert_bytes(input_path.read_bytes(), max_size=10, resample="unknown")
+        
+        # アニメーションは各フレームを縮小する
+        anim_path = Path(tmpdir) / "anim.webp"
+        frames = [Image.new('RGBA', (64, 32), (i * 60, 0, 0, 255)) for i in range(3)]
+        frames[0].save(anim_path, 'WEBP', save_all=True, append_images=frames[1:], duration=100)
+        with Image.open(io.BytesIO(convert_bytes(anim_path.read_bytes(), max_size=16))) as img:
+            assert img.n_frames == 3
+            assert img.size == (16, 8)
+
+
+def test_convert_renditions_decodes_once():
+    """1回のデコードから各サイズ・プロファイル・出力名のPNGを書き出す"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "photo.webp"
+        Image.new('RGB', (800, 400), (0, 128, 255)).save(input_path, 'WEBP')
+        specs = ("full", "400:balanced", "100:fast:thumbs/{stem}_{width}x{height}.png")
+        renditions = [parse_rendition(spec) for spec in specs]
+        
+        with patch('webp2png.converter._open_webp', wraps=_open_webp) as open_webp:
+            outputs = convert_renditions(input_path, renditions, output_dir=Path(tmpdir) / "out", encode_jobs=3)
+        assert open_webp.call_count == 1
+        
+        out = Path(tmpdir) / "out"
+        assert outputs == [out / "photo.png", out / "photo_400.png", out / "thumbs" / "photo_100x50.png"]
+        sizes = []
+        for output in outputs:
+            with Image.open(output) as img:
+                sizes.append(img.size)
+        assert sizes == [(800, 400), (400, 200), (100, 50)]
+        
+        # バッチ変換でも全出力が結果に含まれる
+        results = list(iter_convert([input_path], output_dir=out, renditions=renditions[1:], jobs=1))
+        assert results[0].output_paths == [out / "photo_400_1.png", out / "thumbs" / "photo_100x50_1.png"]
+        
+        with pytest.raises(ConversionError, match="rendition size"):
+            parse_rendition("huge")
+        with pytest.raises(ConversionError, match="template"):
+            parse_rendition("full:fast:{unknown}.png")
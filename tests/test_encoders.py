@@ -0,0 +1,79 @@
+"""Tests for encoders module."""
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw
+
+from webp2png.converter import ConversionError, convert_bytes, get_encode_options
+from webp2png.encoders import (
+    ENCODER_AUTO,
+    ENCODER_PILLOW,
+    ENCODER_ZLIB,
+    PILLOW_ENCODER,
+    available_encoders,
+    get_encoder,
+    iter_chunks,
+)
+
+
+def create_test_image() -> Image.Image:
+    """フィルタの効果が出るよう、グラデーションと図形を含む画像を作成"""
+    img = Image.linear_gradient('L').resize((96, 64)).convert('RGBA')
+    ImageDraw.Draw(img).ellipse((10, 10, 60, 50), fill=(255, 0, 0, 100))
+    return img
+
+
+@pytest.mark.parametrize("name", available_encoders())
+def test_encoders_produce_identical_pixels(name):
+    """どのバックエンドでもPillowと同じ画素・チャンク構成のPNGになる"""
+    img = create_test_image()
+    img.info['icc_profile'] = b'dummy profile'
+    encode_options = get_encode_options("smallest")
+    
+    outputs = []
+    for encoder in (PILLOW_ENCODER, get_encoder(name)):
+        buf = io.BytesIO()
+        encoder.save(img, buf, encode_options)
+        outputs.append(buf.getvalue())
+    
+    chunk_types = [sorted(set(chunk_type for chunk_type, _ in iter_chunks(data))) for data in outputs]
+    assert chunk_types[0] == chunk_types[1]
+    assert b'iCCP' in chunk_types[1]
+    with Image.open(io.BytesIO(outputs[1])) as result:
+        assert result.format == 'PNG'
+        assert result.tobytes() == img.tobytes()
+
+
+def test_encoder_backend_selection():
+    """auto は高い圧縮レベルでのみ外部実装を使い、未インストールのバックエンドは拒否する"""
+    assert get_encoder(ENCODER_AUTO, get_encode_options("fast")) is PILLOW_ENCODER
+    assert get_encoder(ENCODER_PILLOW) is PILLOW_ENCODER
+    
+    with patch.dict('webp2png.encoders._encoders', {'zlib-ng': None, 'libdeflate': None}):
+        assert get_encoder(ENCODER_AUTO, get_encode_options("smallest")) is PILLOW_ENCODER
+        with pytest.raises(ValueError, match="not installed"):
+            get_encoder('libdeflate')
+    with pytest.raises(ValueError, match="Unknown encoder"):
+        get_encoder('unknown')
+
+
+def test_convert_with_encoder_backend():
+    """変換関数からバックエンドを指定でき、アニメーションの各フレームにも使われる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        anim_path = Path(tmpdir) / "anim.webp"
+        frames = [Image.new('RGBA', (32, 16), (i * 60, 0, 0, 255)) for i in range(3)]
+        frames[0].save(anim_path, 'WEBP', save_all=True, append_images=frames[1:], duration=100, lossless=True)
+        
+        with Image.open(io.BytesIO(convert_bytes(anim_path.read_bytes(), encoder=ENCODER_ZLIB))) as img:
+            assert img.n_frames == 3
+            colors = []
+            for i in range(img.n_frames):
+                img.seek(i)
+                colors.append(img.convert('RGBA').getpixel((0, 0))[0])
+            assert colors == [0, 60, 120]
+        
+        with pytest.raises(ConversionError, match="Unknown encoder"):
+            convert_bytes(anim_path.read_bytes(), encoder="unknown")
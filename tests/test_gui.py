@@ -0,0 +1,91 @@
+"""Tests for gui module (logic that does not need a display)."""
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from webp2png.converter import iter_convert
+
+gui = pytest.importorskip("webp2png.gui")
+
+
+def run_paused_batch(input_paths, finish):
+    """4件完了した時点で一時停止するバッチを実行し、finish(control) の後の結果を返す"""
+    control = gui.BatchControl()
+    results = []
+    pulled = []
+    paused = threading.Event()
+
+    def inputs():
+        for input_path in control.gate(input_paths):
+            pulled.append(input_path)
+            yield input_path
+
+    def worker():
+        for result in iter_convert(inputs(), jobs=2, max_in_flight=2, running=control.running):
+            results.append(result)
+            if len(results) == 4:
+                control.pause()
+                paused.set()
+            if control.cancelled:
+                break
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    assert paused.wait(10)
+    # 一時停止中は新しい入力を取り出さず、投入済みの変換（最大 max_in_flight 件）の結果は受け取り続ける
+    time.sleep(0.3)
+    count_while_paused = len(results)
+    time.sleep(0.3)
+    assert len(results) == count_while_paused == len(pulled) <= 4 + 2
+    finish(control)
+    thread.join(10)
+    assert not thread.is_alive()
+    assert [result.error for result in results if not result.ok] == []
+    return results
+
+
+def test_batch_control_pause_resume_cancel():
+    """一時停止中は入力を渡さず、再開で続きを渡し、中止で打ち切る"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_paths = []
+        for i in range(20):
+            input_path = Path(tmpdir) / f"img{i}.webp"
+            Image.new('RGB', (8, 8), (i, 0, 0)).save(input_path, 'WEBP')
+            input_paths.append(input_path)
+
+        results = run_paused_batch(input_paths, lambda control: control.resume())
+        assert len(results) == len(input_paths)
+
+        # 中止すると残りの入力は変換しない
+        results = run_paused_batch(input_paths, lambda control: control.cancel())
+        assert 4 <= len(results) <= 4 + 2
+
+
+def test_file_collector_streams_in_background():
+    """入力の探索は別スレッドで行い、やり直すと前回の結果を捨てて探索し直す"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "sub").mkdir()
+        Image.new('RGB', (8, 8)).save(root / "a.webp", 'WEBP')
+        Image.new('RGB', (8, 8)).save(root / "sub" / "b.webp", 'WEBP')
+        (root / "notes.txt").write_text("not an image")
+
+        collector = gui.FileCollector()
+        collector.start([root], recursive=False)
+        assert collector.wait(10)
+        assert collector.paths() == [root / "a.webp"]
+
+        collector.start([root], recursive=True)
+        assert collector.wait(10)
+        count, total_bytes = collector.stats()
+        assert count == 2
+        assert total_bytes == sum(path.stat().st_size for path in root.rglob("*.webp"))
+        assert [path for path, _ in collector.rows(1, 5)] == collector.paths()[1:]
+
+        collector.start([], recursive=True)
+        assert collector.wait(10)
+        assert collector.stats() == (0, 0)
@@ -0,0 +1,90 @@
+"""Tests for journal module."""
+import tempfile
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from webp2png.cli import main
+from webp2png.converter import iter_convert
+from webp2png.journal import JOB_DONE, JOB_FAILED, JOB_PLANNED, JOURNAL_NAME, Journal
+
+
+def test_resume_after_interruption(create_test_webp):
+    """中断したバッチを再開すると、変換済みの入力は重複させずに続きから変換する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_paths = []
+        for i in range(4):
+            input_path = Path(tmpdir) / f"img{i}.webp"
+            create_test_webp(input_path)
+            input_paths.append(input_path)
+        broken_path = Path(tmpdir) / "broken.webp"
+        broken_path.write_bytes(b"not an image")
+        input_paths.append(broken_path)
+        output_dir = Path(tmpdir) / "out"
+        journal_path = output_dir / "journal.jsonl"
+        
+        # 2件目の変換中に中断した状態を再現する
+        with Journal(journal_path) as journal:
+            planned = journal.select(input_paths)
+            for result in iter_convert([next(planned)], output_dir=output_dir):
+                journal.record(result)
+            next(planned)
+        
+        with Journal(journal_path, resume=True) as journal:
+            assert journal.state(input_paths[0]) == JOB_DONE
+            assert journal.state(input_paths[1]) == JOB_PLANNED
+            planned = list(journal.select(input_paths))
+            assert planned == input_paths[1:]
+            for result in iter_convert(planned, output_dir=output_dir):
+                journal.record(result)
+            assert journal.already_done == 1
+            assert journal.state(broken_path) == JOB_FAILED
+        
+        assert sorted(p.name for p in output_dir.glob("*.png")) == [f"img{i}.png" for i in range(4)]
+        
+        # 再開しても失敗した入力は飛ばし、--retry-failed 相当では失敗した入力のみを変換する
+        with Journal(journal_path, resume=True) as journal:
+            assert list(journal.select(input_paths)) == []
+            assert (journal.already_done, journal.already_failed) == (4, 1)
+        with Journal(journal_path, resume=True) as journal:
+            assert list(journal.select(input_paths, retry_failed=True, failed_only=True)) == [broken_path]
+
+
+def test_new_journal_replaces_previous_run(create_test_webp):
+    """再開しない場合は前回の記録を破棄する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "img.webp"
+        create_test_webp(input_path)
+        journal_path = Path(tmpdir) / "journal.jsonl"
+        
+        with Journal(journal_path) as journal:
+            for result in iter_convert(journal.select([input_path]), output_dir=Path(tmpdir)):
+                journal.record(result)
+        # 書きかけの行は無視する
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"source": "/x", "sta')
+        
+        assert Journal(journal_path, resume=True).state(input_path) == JOB_DONE
+        assert len(Journal(journal_path, resume=True)) == 1
+        assert Journal(journal_path).state(input_path) is None
+        assert not journal_path.exists()
+
+
+def test_cli_writes_journal_only_when_requested(monkeypatch, create_test_webp):
+    """ジャーナルは --resume 等の指定時のみ、カレントディレクトリではなく入力側に記録する"""
+    with tempfile.TemporaryDirectory() as tmpdir, tempfile.TemporaryDirectory() as cwd:
+        input_dir = Path(tmpdir) / "images"
+        input_dir.mkdir()
+        for i in range(2):
+            create_test_webp(input_dir / f"img{i}.webp")
+        monkeypatch.chdir(cwd)
+        runner = CliRunner()
+        
+        result = runner.invoke(main, [str(input_dir), '-q'])
+        assert result.exit_code == 0, result.output
+        assert not (input_dir / JOURNAL_NAME).exists()
+        
+        result = runner.invoke(main, [str(input_dir), '-q', '--force', '--resume'])
+        assert result.exit_code == 0, result.output
+        assert len(Journal(input_dir / JOURNAL_NAME, resume=True)) == 2
+        assert list(Path(cwd).iterdir()) == []
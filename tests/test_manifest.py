@@ -0,0 +1,108 @@
+"""Tests for manifest module."""
+import os
+import tempfile
+from pathlib import Path
+
+from click.testing import CliRunner
+from PIL import Image
+
+from webp2png.cli import main
+from webp2png.converter import STATUS_SKIPPED, STATUS_SUCCESS, iter_convert
+from webp2png.manifest import MANIFEST_NAME, Manifest
+
+
+def test_iter_convert_skips_unchanged_inputs(create_test_webp):
+    """マニフェストに記録済みで変更のない入力はスキップされる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        create_test_webp(input_path)
+        output_dir = Path(tmpdir) / "out"
+        manifest_path = output_dir / "manifest.jsonl"
+        
+        with Manifest(manifest_path) as manifest:
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest))
+        assert [r.status for r in results] == [STATUS_SUCCESS]
+        
+        # 再実行では重複ファイルを作らずにスキップする
+        with Manifest(manifest_path) as manifest:
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest))
+        assert [r.status for r in results] == [STATUS_SKIPPED]
+        assert results[0].output_path == output_dir / "test.png"
+        assert not (output_dir / "test_1.png").exists()
+        
+        # 更新された入力は再変換する
+        st = input_path.stat()
+        os.utime(input_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        with Manifest(manifest_path) as manifest:
+            assert manifest.lookup(input_path) is None
+        
+        # 変換オプションを変えた場合も再変換する
+        with Manifest(manifest_path) as manifest:
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest))
+            assert [r.status for r in results] == [STATUS_SUCCESS]
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest, profile='fast'))
+            assert [r.status for r in results] == [STATUS_SUCCESS]
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest, profile='fast'))
+            assert [r.status for r in results] == [STATUS_SKIPPED]
+
+
+def test_changed_input_replaces_previous_output(create_test_webp):
+    """更新された入力は番号付きの新しい名前を作らず、前回の出力を置き換える"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        create_test_webp(input_path)
+        output_dir = Path(tmpdir) / "out"
+        output_dir.mkdir()
+        # 別の入力の出力が先にあるため、初回は test_1.png になる
+        (output_dir / "test.png").write_bytes(b"other")
+        
+        with Manifest(output_dir / "manifest.jsonl") as manifest:
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest))
+            assert results[0].output_path == output_dir / "test_1.png"
+            
+            Image.new('RGBA', (24, 24), (255, 0, 0, 255)).save(input_path, 'WEBP')
+            st = input_path.stat()
+            os.utime(input_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            results = list(iter_convert([input_path], output_dir=output_dir, manifest=manifest, jobs=2))
+            assert [r.status for r in results] == [STATUS_SUCCESS]
+            assert results[0].output_path == output_dir / "test_1.png"
+        
+        assert sorted(p.name for p in output_dir.glob("*.png")) == ["test.png", "test_1.png"]
+        assert (output_dir / "test.png").read_bytes() == b"other"
+        with Image.open(output_dir / "test_1.png") as img:
+            assert img.size == (24, 24)
+
+
+def test_manifest_requires_existing_output(create_test_webp):
+    """出力が削除されている場合はスキップしない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        create_test_webp(input_path)
+        output_path = Path(tmpdir) / "test.png"
+        output_path.write_bytes(b"png")
+        
+        with Manifest(Path(tmpdir) / "manifest.jsonl", use_hash=True) as manifest:
+            manifest.record(input_path, output_path)
+            assert manifest.lookup(input_path) == output_path
+            output_path.unlink()
+            assert manifest.lookup(input_path) is None
+
+
+def test_cli_manifest_does_not_depend_on_working_directory(monkeypatch, create_test_webp):
+    """--output-dir がない場合、マニフェストは実行したディレクトリではなく入力側に置く"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_dir = Path(tmpdir) / "images"
+        input_dir.mkdir()
+        for i in range(2):
+            create_test_webp(input_dir / f"img{i}.webp")
+        runner = CliRunner()
+
+        for i, expected in enumerate(["Success: 2", "Skipped (unchanged): 2"]):
+            cwd = Path(tmpdir) / f"cwd{i}"
+            cwd.mkdir()
+            monkeypatch.chdir(cwd)
+            result = runner.invoke(main, [str(input_dir), '--incremental'])
+            assert result.exit_code == 0, result.output
+            assert expected in result.output
+            assert list(cwd.iterdir()) == []
+        assert (input_dir / MANIFEST_NAME).exists()
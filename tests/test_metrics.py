@@ -0,0 +1,49 @@
+"""Tests for metrics module."""
+import tempfile
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from webp2png.converter import iter_convert
+from webp2png.metrics import Histogram, Metrics
+
+
+def test_histogram_cumulative_buckets():
+    """バケットは累積件数で、境界値はそのバケットに入る"""
+    hist = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value)
+    
+    assert hist.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(3.65)
+
+
+def test_iter_convert_records_metrics():
+    """iter_convert は結果・失敗の分類・バイト数を記録し、終了時にゲージを0に戻す"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_paths = []
+        for i in range(3):
+            input_path = Path(tmpdir) / f"img{i}.webp"
+            Image.new('RGB', (32, 32), (i * 80, 0, 0)).save(input_path, 'WEBP')
+            input_paths.append(input_path)
+        broken_path = Path(tmpdir) / "broken.webp"
+        broken_path.write_bytes(b"RIFF\x00\x00\x00\x00WEBPVP8 garbage")
+        input_paths.append(broken_path)
+        
+        for jobs in (1, 2):
+            metrics = Metrics()
+            results = list(iter_convert(
+                input_paths, output_dir=Path(tmpdir) / f"out{jobs}", jobs=jobs, executor="thread", metrics=metrics
+            ))
+            snapshot = metrics.snapshot()
+            
+            assert snapshot['conversions'] == {'success': 3, 'failed': 1}
+            assert snapshot['failures'] == {'decode': 1}
+            assert snapshot['input_bytes'] == sum(p.stat().st_size for p in input_paths)
+            assert snapshot['output_bytes'] == sum(r.output_path.stat().st_size for r in results if r.ok)
+            assert snapshot['decode_seconds']['count'] == 3
+            assert snapshot['conversion_seconds']['count'] == 4
+            assert snapshot['in_flight'] == 0
+            assert snapshot['queue_depth'] == 0
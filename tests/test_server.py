@@ -0,0 +1,163 @@
+"""Tests for server module."""
+import http.client
+import io
+import socket
+import threading
+import time
+
+from PIL import Image
+
+from webp2png.server import ConversionServer
+
+
+def create_webp_bytes() -> bytes:
+    """テスト用のWebPデータを作成"""
+    buf = io.BytesIO()
+    Image.new('RGBA', (16, 16), (255, 255, 0, 128)).save(buf, 'WEBP')
+    return buf.getvalue()
+
+
+def test_server_converts_and_limits_body_size():
+    """WebPをPNGに変換して返し、上限を超えるボディは413で拒否する"""
+    body = create_webp_bytes()
+    server = ConversionServer(('127.0.0.1', 0), jobs=1, executor='thread', max_body_size=len(body))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        
+        # 同じ接続（keep-alive）で複数回変換できる
+        for _ in range(2):
+            conn.request('POST', '/convert?profile=fast', body=body)
+            response = conn.getresponse()
+            data = response.read()
+            assert response.status == 200
+            assert response.getheader('Content-Type') == 'image/png'
+            assert data.startswith(b'\x89PNG')
+        
+        conn.request('POST', '/convert', body=b'not a webp')
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 422
+        
+        conn.request('POST', '/convert', body=body + b'\x00')
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 413
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_metrics_endpoint():
+    """GET /metrics で変換結果・失敗の分類・バイト数をPrometheus形式で返す"""
+    body = create_webp_bytes()
+    server = ConversionServer(('127.0.0.1', 0), jobs=1, executor='thread')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        for data in (body, b'not a webp'):
+            conn.request('POST', '/convert', body=data)
+            conn.getresponse().read()
+        
+        conn.request('GET', '/metrics')
+        response = conn.getresponse()
+        text = response.read().decode('utf-8')
+        assert response.status == 200
+        assert response.getheader('Content-Type').startswith('text/plain; version=0.0.4')
+        assert 'webp2png_conversions_total{status="success"} 1' in text
+        assert 'webp2png_conversions_total{status="failed"} 1' in text
+        assert 'webp2png_conversion_failures_total{reason="input"} 1' in text
+        assert f'webp2png_input_bytes_total {len(body)}' in text
+        assert 'webp2png_decode_seconds_count 1' in text
+        assert 'webp2png_in_flight 0' in text
+        assert 'webp2png_queue_depth 0' in text
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def send_raw(port: int, request: bytes) -> bytes:
+    """生のリクエストを送り、サーバーが接続を閉じるまでの応答を返す"""
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+        sock.sendall(request)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def test_server_rejects_invalid_content_length():
+    """負のContent-Lengthは400、上限を超えるContent-Lengthは本文を読まずに413で拒否する"""
+    server = ConversionServer(('127.0.0.1', 0), jobs=1, executor='thread', max_body_size=1024)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        response = send_raw(port, b'POST /convert HTTP/1.1\r\nHost: x\r\nContent-Length: -1\r\n\r\n')
+        assert response.startswith(b'HTTP/1.1 400')
+        
+        # 本文を送らなくても応答が返り、接続が閉じられる
+        response = send_raw(port, b'POST /convert HTTP/1.1\r\nHost: x\r\nContent-Length: 1073741824\r\n\r\n')
+        assert response.startswith(b'HTTP/1.1 413')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_slow_upload_times_out_and_frees_slot():
+    """本文を送り終えないクライアントはタイムアウトで切断され、変換枠を解放する"""
+    body = create_webp_bytes()
+    server = ConversionServer(
+        ('127.0.0.1', 0), jobs=1, executor='thread', max_concurrency=1, request_timeout=0.5
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        start_time = time.monotonic()
+        response = send_raw(port, b'POST /convert HTTP/1.1\r\nHost: x\r\nContent-Length: 100\r\n\r\npartial')
+        assert response == b''
+        assert time.monotonic() - start_time < 5
+        
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        conn.request('POST', '/convert', body=body)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_returns_500_when_worker_pool_fails():
+    """ワーカープールが使えない場合も500を返し、想定外の失敗として記録する"""
+    body = create_webp_bytes()
+    server = ConversionServer(('127.0.0.1', 0), jobs=1, executor='thread')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # 停止したプールには投入できない（プロセスプールが壊れた場合と同じく変換の外で例外になる）
+        server.pool.shutdown(wait=True)
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        conn.request('POST', '/convert', body=body)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 500
+
+        conn.request('GET', '/metrics')
+        text = conn.getresponse().read().decode('utf-8')
+        assert 'webp2png_conversions_total{status="failed"} 1' in text
+        assert 'webp2png_conversion_failures_total{reason="unexpected"} 1' in text
+        assert 'webp2png_in_flight 0' in text
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,64 @@
+"""Tests for CLI startup cost."""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image
+
+# webp2png.cli の読み込みにかける時間の上限（マイクロ秒、-X importtime の累積時間）
+# 遅延読み込み前は約170ms、現在は約70ms。遅いCI環境でも超えない程度の余裕を持たせている
+IMPORT_BUDGET_US = 150_000
+
+# --help・--version で読み込んではいけないモジュール
+HEAVY_MODULES = ("PIL", "tqdm", "http.server", "webp2png.converter", "webp2png.server", "webp2png.watch")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_with_importtime(*args: str) -> Dict[str, int]:
+    """webp2png を -X importtime 付きで実行し、モジュール名 -> 累積読み込み時間（マイクロ秒）を返す"""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "webp2png", *args],
+        capture_output=True, text=True, env=env
+    )
+    assert proc.returncode == 0, proc.stderr
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def loaded(modules: Dict[str, int], prefixes: List[str]) -> List[str]:
+    return [name for name in modules if any(name == p or name.startswith(p + ".") for p in prefixes)]
+
+
+def test_version_and_help_do_not_load_engine():
+    """--version と --help では Pillow・tqdm・変換エンジンを読み込まない"""
+    for args in (["--version"], ["--help"], ["convert", "--help"]):
+        modules = run_with_importtime(*args)
+        assert loaded(modules, list(HEAVY_MODULES)) == [], args
+        assert modules["webp2png.cli"] < IMPORT_BUDGET_US
+
+
+def test_single_file_loads_only_what_it_needs():
+    """単一ファイルの変換ではバッチ・サーバー・監視用のモジュールを読み込まない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "test.webp"
+        Image.new('RGB', (8, 8)).save(input_path, 'WEBP')
+        modules = run_with_importtime(str(input_path), "-o", str(Path(tmpdir) / "test.png"), "-q")
+        assert "webp2png.converter" in modules
+        assert loaded(modules, ["tqdm", "http.server", "webp2png.server", "webp2png.watch", "webp2png.journal"]) == []
+
+
+def test_import_does_not_configure_logging():
+    """パッケージの読み込みでルートロガーを設定しない"""
+    code = "import logging, webp2png.utils, webp2png.converter; assert not logging.getLogger().handlers"
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
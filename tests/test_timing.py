@@ -0,0 +1,80 @@
+"""Tests for timing module."""
+import csv
+import json
+import tempfile
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from webp2png.cli import main
+from webp2png.converter import iter_convert
+from webp2png.timing import PHASES, PhaseTimer, TimingReport
+
+
+def test_phase_timer_records_exclusive_time():
+    """入れ子のフェーズは外側のフェーズから差し引かれる"""
+    timer = PhaseTimer()
+    with timer.phase("encode"):
+        with timer.phase("write"):
+            pass
+    stats = timer.as_dict()
+    assert set(PHASES) <= set(stats)
+    assert stats["encode"] >= 0 and stats["write"] >= 0
+
+
+def test_iter_convert_collects_timings_and_report(create_test_webp):
+    """計測を有効にすると結果にフェーズ別の時間と数量が入り、レポートに書き出せる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_paths = []
+        for i in range(3):
+            input_path = Path(tmpdir) / f"img{i}.webp"
+            create_test_webp(input_path, size=(32, 16))
+            input_paths.append(input_path)
+        output_dir = Path(tmpdir) / "out"
+
+        results = list(iter_convert(input_paths, output_dir=output_dir, collect_timings=True))
+        for result in results:
+            assert result.stats["pixels"] == 32 * 16
+            assert result.stats["input_bytes"] == result.input_path.stat().st_size
+            assert result.stats["output_bytes"] == result.output_path.stat().st_size
+            assert all(result.stats[phase] >= 0 for phase in PHASES)
+
+        # 計測しない場合は stats を持たない
+        assert list(iter_convert(input_paths[:1], output_dir=output_dir))[0].stats is None
+
+        csv_path = Path(tmpdir) / "report.csv"
+        jsonl_path = Path(tmpdir) / "report.jsonl"
+        for path in (csv_path, jsonl_path):
+            with TimingReport(path) as report:
+                for result in results:
+                    report.add(result)
+            assert "decode" in report.summary()
+
+        with open(csv_path, encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 3 and float(rows[0]["encode"]) >= 0
+        records = [json.loads(line) for line in jsonl_path.read_text(encoding='utf-8').splitlines()]
+        assert [r["input_path"] for r in records] == [str(r.input_path) for r in results]
+
+
+def test_cli_single_file_closes_report_on_error(monkeypatch):
+    """単一ファイルの変換に失敗した場合も計測結果のファイルを閉じる"""
+    closed = []
+    original_close = TimingReport.close
+
+    def close(self):
+        closed.append(self)
+        original_close(self)
+
+    monkeypatch.setattr(TimingReport, 'close', close)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = Path(tmpdir) / "broken.webp"
+        input_path.write_bytes(b"not an image")
+        report_path = Path(tmpdir) / "report.csv"
+
+        result = CliRunner().invoke(main, [
+            str(input_path), '-o', str(Path(tmpdir) / "out.png"), '--profile-report', str(report_path)
+        ])
+        assert result.exit_code == 1
+        assert len(closed) == 1
+        assert report_path.read_text(encoding='utf-8').startswith('input_path,')
@@ -0,0 +1,184 @@
+"""Tests for utils module."""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from webp2png.cli import main
+from webp2png.converter import iter_convert
+from webp2png.utils import (
+    OutputNameAllocator,
+    atomic_write,
+    collect_webp_files,
+    iter_webp_files,
+    open_output,
+    release_output_path,
+)
+
+
+def test_collect_webp_files_case_insensitive_and_dedupe(create_test_webp):
+    """大文字の拡張子も収集し、シンボリックリンクのループやハードリンクは重複させない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "sub").mkdir()
+        create_test_webp(root / "a.webp")
+        create_test_webp(root / "sub" / "B.WEBP")
+        (root / "note.txt").write_text("not an image")
+        os.link(root / "a.webp", root / "sub" / "a_link.webp")
+        # 親ディレクトリへのリンクでループを作る
+        (root / "sub" / "loop").symlink_to(root, target_is_directory=True)
+
+        files = collect_webp_files([root], recursive=True)
+        assert len(files) == 2
+        assert root / "sub" / "B.WEBP" in files
+        # a.webp と a_link.webp は同じinodeなので片方のみ
+        assert len({root / "a.webp", root / "sub" / "a_link.webp"} & set(files)) == 1
+        assert files == sorted(files)
+
+        # 非再帰ではサブディレクトリを探索しない
+        assert collect_webp_files([root]) == [root / "a.webp"]
+
+
+def test_iter_webp_files_patterns_and_content_detection(create_test_webp):
+    """包含・除外パターンと内容による判定"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "skip").mkdir()
+        create_test_webp(root / "keep.webp")
+        create_test_webp(root / "thumb_keep.webp")
+        create_test_webp(root / "skip" / "other.webp")
+        create_test_webp(root / "renamed.bin")
+
+        files = set(iter_webp_files([root], recursive=True, exclude=["skip", "thumb_*"]))
+        assert files == {root / "keep.webp"}
+
+        files = set(iter_webp_files([root], recursive=True, include=["thumb_*"]))
+        assert files == {root / "thumb_keep.webp"}
+
+        # 内容で判定する場合は拡張子に関係なく収集する
+        files = set(iter_webp_files([root], detect_by_content=True))
+        assert files == {root / "keep.webp", root / "thumb_keep.webp", root / "renamed.bin"}
+
+
+def test_cli_progress_total_is_known_after_lazy_discovery(create_test_webp):
+    """探索を遅延評価しても、探索が終われば総数入りのプログレスバーになる"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        for i in range(3):
+            create_test_webp(root / f"img{i}.webp")
+
+        result = CliRunner().invoke(main, [str(root), '--output-dir', str(root / "out")])
+        assert result.exit_code == 0, result.output
+        assert "100%" in result.output
+        assert "3/3" in result.output
+
+
+def test_output_name_allocator_reserves_unique_names():
+    """ディレクトリを1回走査し、既存ファイルと衝突しない名前をファイルを作らずに確保する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "img.png").write_bytes(b"existing")
+        allocator = OutputNameAllocator()
+
+        assert allocator.reserve(root / "img.png") == root / "img_1.png"
+        assert allocator.reserve(root / "img.png") == root / "img_2.png"
+        assert sorted(os.listdir(tmpdir)) == ["img.png"]
+
+        # 解放した名前は再利用される
+        allocator.release(root / "img_2.png")
+        assert allocator.reserve(root / "img.png") == root / "img_2.png"
+
+
+def test_atomic_write_never_clobbers_other_writers():
+    """上書きしない場合は完成したファイルだけを公開し、別プロセスが作成した名前は避ける"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "img.png").write_bytes(b"existing")
+        first = OutputNameAllocator()
+        # 別プロセスのアロケータに相当する（どちらも img_1.png を確保する）
+        second = OutputNameAllocator()
+
+        first_writer = atomic_write(root / "img.png", overwrite=False, name_allocator=first)
+        second_writer = atomic_write(root / "img.png", overwrite=False, name_allocator=second)
+        with first_writer as f1, second_writer as f2:
+            f1.write(b"first")
+            f2.write(b"second")
+            # 書き込み中は出力名に何も現れない
+            assert not (root / "img_1.png").exists()
+        assert first_writer.path != second_writer.path
+        assert {first_writer.path, second_writer.path} == {root / "img_1.png", root / "img_2.png"}
+        assert (root / "img.png").read_bytes() == b"existing"
+        assert first_writer.path.read_bytes() == b"first"
+        assert second_writer.path.read_bytes() == b"second"
+        assert sorted(os.listdir(tmpdir)) == ["img.png", "img_1.png", "img_2.png"]
+
+        # 直接書き込む場合も既存のファイルを置き換えない
+        f, path = open_output(root / "img.png", overwrite=False)
+        with f:
+            f.write(b"direct")
+        assert path == root / "img_3.png"
+
+        # 公開した出力の削除
+        release_output_path(path)
+        assert not path.exists()
+
+
+def test_atomic_write_replaces_only_on_success():
+    """書き込み完了時のみ出力パスを置き換え、失敗時は一時ファイルを残さない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_path = Path(tmpdir) / "out.png"
+        output_path.write_bytes(b"old")
+
+        try:
+            with atomic_write(output_path) as f:
+                f.write(b"partial")
+                raise RuntimeError("interrupted")
+        except RuntimeError:
+            pass
+        assert output_path.read_bytes() == b"old"
+        assert os.listdir(tmpdir) == ["out.png"]
+
+        with atomic_write(output_path, fsync=True) as f:
+            f.write(b"new")
+        assert output_path.read_bytes() == b"new"
+        assert os.listdir(tmpdir) == ["out.png"]
+
+
+def test_batch_durability_fsyncs_written_files_and_directories(monkeypatch, create_test_webp):
+    """batchでは書き込み中はfsyncせず、終了時に書き込んだファイルと親ディレクトリだけをfsyncする"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        input_paths = []
+        for i in range(3):
+            input_path = root / f"img{i}.webp"
+            create_test_webp(input_path)
+            input_paths.append(input_path)
+        output_dir = root / "out"
+
+        synced = []
+        real_fsync = os.fsync
+
+        def recording_fsync(fd):
+            st = os.fstat(fd)
+            synced.append((st.st_dev, st.st_ino))
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, 'fsync', recording_fsync)
+        monkeypatch.setattr(os, 'sync', lambda: pytest.fail("os.sync() must not be called"), raising=False)
+
+        results = []
+        for result in iter_convert(input_paths, output_dir=output_dir, jobs=2, durability='batch'):
+            # 変換中はfsyncしない
+            assert synced == []
+            results.append(result)
+        assert all(result.ok for result in results)
+
+        def identity(path):
+            st = os.stat(path)
+            return (st.st_dev, st.st_ino)
+
+        expected = {identity(result.output_path) for result in results} | {identity(output_dir)}
+        assert set(synced) == expected
+        assert len(synced) == len(expected)
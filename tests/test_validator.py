@@ -5,7 +5,13 @@ from unittest.mock import patch
 
 import pytest
 
-from webp2png.validator import is_webp_file, validate_input_file, validate_output_path
+from webp2png.validator import (
+    OutputDirCache,
+    is_webp_file,
+    open_input_file,
+    validate_input_file,
+    validate_output_path,
+)
 
 
 def test_is_webp_file_valid():
@@ -55,3 +61,56 @@ def test_validate_output_path_directory_creation():
         if not result:
             assert "permission" in error.lower() or "directory" in error.lower()
 
+
+
+def test_open_input_file_returns_rewound_handle():
+    """検証に成功した場合は先頭に巻き戻したファイルを返す"""
+    webp_header = b'RIFF' + b'\x00\x00\x00\x00' + b'WEBP' + b'\x00\x00'
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        temp_path = Path(tmpdir) / "test.webp"
+        temp_path.write_bytes(webp_header + b'\x00' * 100)
+        
+        f, error = open_input_file(temp_path)
+        assert error == ""
+        with f:
+            assert f.read(4) == b'RIFF'
+
+
+def test_open_input_file_error_messages():
+    """validate_input_fileと同じエラーメッセージを返す"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        empty_path = Path(tmpdir) / "empty.webp"
+        empty_path.touch()
+        invalid_path = Path(tmpdir) / "invalid.webp"
+        invalid_path.write_bytes(b'PNG' + b'\x00' * 100)
+        
+        cases = [
+            (Path(tmpdir) / "missing.webp", "does not exist"),
+            (Path(tmpdir), "Not a file"),
+            (empty_path, "File is empty"),
+            (invalid_path, "Not a valid WebP file"),
+        ]
+        for path, expected in cases:
+            f, error = open_input_file(path)
+            assert f is None
+            assert expected in error
+            assert validate_input_file(path) == (False, error)
+
+
+def test_validate_output_path_uses_dir_cache():
+    """キャッシュ済みのディレクトリは書き込みテストを繰り返さない"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dir_cache = OutputDirCache()
+        output_dir = Path(tmpdir) / "out"
+        
+        with patch('webp2png.validator.validate_output_dir', return_value=(True, "")) as mock_validate_dir:
+            for i in range(3):
+                result, error = validate_output_path(output_dir / f"{i}.png", dir_cache=dir_cache)
+                assert result is True
+            assert mock_validate_dir.call_count == 1
+            
+            # 無効化後は再検証する
+            dir_cache.invalidate(output_dir)
+            validate_output_path(output_dir / "3.png", dir_cache=dir_cache)
+            assert mock_validate_dir.call_count == 2
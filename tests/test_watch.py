@@ -0,0 +1,146 @@
+"""Tests for watch module."""
+import io
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from webp2png.manifest import MANIFEST_NAME
+from webp2png.utils import matches_filters
+from webp2png.watch import BACKEND_INOTIFY, BACKEND_POLL, Watcher
+
+
+def wait_until(condition, timeout: float = 10.0) -> bool:
+    """条件が満たされるまで待つ"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def test_matches_filters():
+    """監視中のイベントにも探索時と同じ包含・除外パターンを適用する"""
+    root = Path("/data")
+    assert matches_filters(root / "a" / "photo.webp", root)
+    assert not matches_filters(root / "cache" / "photo.webp", root, exclude=["cache"])
+    assert not matches_filters(root / "a" / "icon.webp", root, include=["photo_*"])
+    assert not matches_filters(Path("/other/photo.webp"), root)
+
+
+@pytest.mark.parametrize("backend", [BACKEND_POLL, BACKEND_INOTIFY])
+def test_watch_reconciles_and_converts_new_files(backend, create_test_webp):
+    """起動時に未変換の入力だけを変換し、書き込みが終わった新しいファイルを変換する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "in"
+        (root / "sub").mkdir(parents=True)
+        output_dir = Path(tmpdir) / "out"
+        output_dir.mkdir()
+        create_test_webp(root / "done.webp")
+        create_test_webp(root / "sub" / "todo.webp")
+        # 入力より新しい出力があるものは変換済みとみなす
+        (output_dir / "done.png").write_bytes(b"existing")
+
+        results = []
+        try:
+            watcher = Watcher(
+                root,
+                output_dir=output_dir,
+                jobs=2,
+                backend=backend,
+                debounce=0.5,
+                poll_interval=0.1,
+                on_result=results.append,
+                profile="fast"
+            )
+        except OSError:
+            pytest.skip("inotify is not available")
+        stop = threading.Event()
+        thread = threading.Thread(target=watcher.run, args=(stop,))
+        thread.start()
+        try:
+            assert wait_until(lambda: len(results) == 1)
+            assert results[0].input_path == root / "sub" / "todo.webp"
+            assert (output_dir / "done.png").read_bytes() == b"existing"
+
+            # 書きかけのファイルは書き込みが閉じられ、サイズが落ち着くまで変換しない
+            data = io.BytesIO()
+            Image.new('RGB', (64, 64), (255, 0, 0)).save(data, 'WEBP')
+            with open(root / "new.webp", 'wb') as f:
+                f.write(data.getvalue()[:20])
+                f.flush()
+                time.sleep(0.2)
+                f.write(data.getvalue()[20:])
+            assert wait_until(lambda: len(results) == 2)
+            assert results[1].ok
+            with Image.open(output_dir / "new.png") as img:
+                assert img.size == (64, 64)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert watcher.converted == 2
+        assert watcher.up_to_date == 1
+        assert (output_dir / MANIFEST_NAME).exists()
+
+        # 再起動時はマニフェストに記録された入力を変換し直さない
+        with Watcher(root, output_dir=output_dir, backend=BACKEND_POLL) as watcher:
+            watcher.start()
+            assert watcher.up_to_date == 3
+            assert not watcher._pending
+
+
+def test_watch_same_stem_inputs_keep_their_own_outputs(create_test_webp):
+    """出力名が重なる入力は既存の出力を自分のものとみなさず、更新時は自分の前回の出力だけを置き換える"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "in"
+        (root / "x").mkdir(parents=True)
+        (root / "y").mkdir()
+        output_dir = Path(tmpdir) / "out"
+        output_dir.mkdir()
+        create_test_webp(root / "x" / "img.webp")
+        create_test_webp(root / "y" / "img.webp")
+        # どちらの入力の出力か分からない既存の出力は変換済みの根拠にしない
+        (output_dir / "img.png").write_bytes(b"existing")
+
+        results = []
+        watcher = Watcher(
+            root,
+            output_dir=output_dir,
+            jobs=2,
+            backend=BACKEND_POLL,
+            debounce=0.2,
+            poll_interval=0.1,
+            on_result=results.append,
+            profile="fast"
+        )
+        stop = threading.Event()
+        thread = threading.Thread(target=watcher.run, args=(stop,))
+        thread.start()
+        try:
+            assert wait_until(lambda: len(results) == 2)
+            assert watcher.up_to_date == 0
+            assert (output_dir / "img.png").read_bytes() == b"existing"
+            outputs = {result.input_path: result.output_path for result in results}
+            assert sorted(path.name for path in outputs.values()) == ["img_1.png", "img_2.png"]
+            other_output = outputs[root / "x" / "img.webp"].read_bytes()
+
+            # 更新した入力は自分の前回の出力を置き換え、同じ名前の他の入力の出力には触れない
+            time.sleep(0.05)
+            create_test_webp(root / "y" / "img.webp", size=(24, 24))
+            assert wait_until(lambda: len(results) == 3)
+            assert results[2].ok
+            assert results[2].output_path == outputs[root / "y" / "img.webp"]
+        finally:
+            stop.set()
+            thread.join()
+
+        with Image.open(outputs[root / "y" / "img.webp"]) as img:
+            assert img.size == (24, 24)
+        assert outputs[root / "x" / "img.webp"].read_bytes() == other_output
+        assert (output_dir / "img.png").read_bytes() == b"existing"
+        assert not (output_dir / "img_3.png").exists()
@@ -0,0 +1,232 @@
+"""asyncio API for webp2png."""
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, Optional, Set, Union
+
+from .converter import (
+    DURABILITY_BATCH,
+    STATUS_SUCCESS,
+    ConversionResult,
+    _convert_one,
+    _validate_convert_options,
+    convert_webp_to_png,
+    default_jobs,
+)
+from .utils import OutputNameAllocator, sync_files
+from .validator import OutputDirCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConverter:
+    """
+    イベントループを止めずに変換を行うための非同期コンバータ
+
+    デコード・エンコードはExecutor上で実行し、同時に実行する変換数を
+    セマフォで制限する。キャンセルされた場合、未着手の変換は実行されず、
+    実行中の変換は完了を待たずに結果を破棄する。
+
+    使い方:
+        async with AsyncConverter(jobs=4) as converter:
+            output_path = await converter.convert(Path("image.webp"))
+            async for result in converter.iter_convert(paths, output_dir=Path("out")):
+                ...
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        executor: Optional[Executor] = None
+    ) -> None:
+        """
+        Args:
+            jobs: 同時に実行する変換数（Noneの場合はCPUコア数）
+            max_in_flight: iter_convert で同時に受け付ける最大ファイル数（Noneの場合はjobsの2倍）
+            executor: 変換に使うExecutor（Noneの場合はjobs数のスレッドプールを作成して管理する）
+        """
+        if jobs is None:
+            jobs = default_jobs()
+        if jobs < 1:
+            raise ValueError(f"jobs must be >= 1: {jobs}")
+        self.jobs = jobs
+        self.max_in_flight = max(max_in_flight or jobs * 2, jobs)
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="webp2png-aio")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        # close() で未着手の変換を取り消すため、投入済みのFutureを保持する
+        # （shutdown の cancel_futures は Python 3.9 以降のみ）
+        self._submitted: Set[Future] = set()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # セマフォはイベントループに紐づくため、実行中のループごとに作成する
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.jobs)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run(self, func: Any, *args: Any, **kwargs: Any) -> Any:
+        """同時実行数を制限しながらExecutor上で関数を実行する"""
+        async with self._get_semaphore():
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+            self._submitted.add(future)
+            future.add_done_callback(self._submitted.discard)
+            return await asyncio.wrap_future(future)
+
+    async def convert(self, input_path: Path, output_path: Optional[Path] = None, **kwargs: Any) -> Path:
+        """
+        WebP画像をPNGに変換する（convert_webp_to_png の非同期版）
+
+        Args:
+            input_path: 入力WebPファイルのパス
+            output_path: 出力PNGファイルのパス（Noneの場合は自動生成）
+            **kwargs: convert_webp_to_png に渡すオプション（force, profile など）
+
+        Returns:
+            実際に保存された出力ファイルのパス
+
+        Raises:
+            ConversionError: 変換に失敗した場合
+        """
+        return await self._run(convert_webp_to_png, Path(input_path), output_path, **kwargs)
+
+    async def iter_convert(
+        self,
+        inputs: Union[Iterable[Path], AsyncIterable[Path]],
+        output_dir: Optional[Path] = None,
+        force: bool = False,
+        preserve_metadata: bool = True,
+        **convert_options: Any
+    ) -> AsyncIterator[ConversionResult]:
+        """
+        複数のWebPファイルを変換し、完了したものから結果を返す（iter_convert の非同期版）
+
+        Args:
+            inputs: 入力WebPファイルのパスのイテラブル（非同期イテラブルも可）
+            output_dir: 出力ディレクトリ（Noneの場合は各入力ファイルと同じディレクトリ）
+            force: 既存ファイルを上書きするか
+            preserve_metadata: メタデータを保持するか
+            **convert_options: convert_webp_to_png に渡す追加オプション（profile, compress_level など）
+
+        Yields:
+            完了順の変換結果
+        """
+        _validate_convert_options(convert_options)
+        # プロセスプールにはロックを持つキャッシュを渡せない
+        if isinstance(self._executor, ProcessPoolExecutor):
+            dir_cache: Optional[OutputDirCache] = None
+            name_allocator: Optional[OutputNameAllocator] = None
+        else:
+            dir_cache = OutputDirCache()
+            name_allocator = OutputNameAllocator()
+
+        # batchの場合は全件の完了後に書き込んだファイルとディレクトリをまとめて同期する
+        sync_at_end = convert_options.get('durability') == DURABILITY_BATCH
+        written_files: List[Path] = []
+        
+        def completed(task: asyncio.Future) -> ConversionResult:
+            result = task.result()
+            if sync_at_end and result.status == STATUS_SUCCESS:
+                written_files.extend(result.output_paths or [result.output_path])
+            return result
+        
+        pending: Set[asyncio.Future] = set()
+        try:
+            async for input_path in _aiter(inputs):
+                pending.add(asyncio.ensure_future(self._run(
+                    _convert_one,
+                    Path(input_path), output_dir, force, preserve_metadata, dir_cache, convert_options, name_allocator
+                )))
+                if len(pending) >= self.max_in_flight:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield completed(task)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield completed(task)
+            if written_files:
+                await self._run(sync_files, written_files)
+        finally:
+            # キャンセル・打ち切り時は残りのタスクを破棄する
+            for task in pending:
+                task.cancel()
+
+    def close(self) -> None:
+        """管理しているExecutorを終了する（未着手の変換は破棄する）"""
+        if self._owns_executor:
+            for future in list(self._submitted):
+                future.cancel()
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncConverter":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+async def _aiter(inputs: Union[Iterable[Path], AsyncIterable[Path]]) -> AsyncIterator[Path]:
+    """同期・非同期どちらのイテラブルも非同期イテレータとして扱う"""
+    if hasattr(inputs, '__aiter__'):
+        async for item in inputs:
+            yield item
+    else:
+        for item in inputs:
+            yield item
+
+
+_default_converter: Optional[AsyncConverter] = None
+
+
+def _get_default_converter() -> AsyncConverter:
+    global _default_converter
+    if _default_converter is None:
+        _default_converter = AsyncConverter()
+    return _default_converter
+
+
+async def aconvert(input_path: Path, output_path: Optional[Path] = None, **kwargs: Any) -> Path:
+    """
+    WebP画像をPNGに変換する（共有の非同期コンバータを使用）
+
+    Args:
+        input_path: 入力WebPファイルのパス
+        output_path: 出力PNGファイルのパス（Noneの場合は自動生成）
+        **kwargs: convert_webp_to_png に渡すオプション（force, profile など）
+
+    Returns:
+        実際に保存された出力ファイルのパス
+
+    Raises:
+        ConversionError: 変換に失敗した場合
+    """
+    return await _get_default_converter().convert(input_path, output_path, **kwargs)
+
+
+async def aiter_convert(
+    inputs: Union[Iterable[Path], AsyncIterable[Path]],
+    jobs: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    **kwargs: Any
+) -> AsyncIterator[ConversionResult]:
+    """
+    複数のWebPファイルを変換し、完了したものから結果を返す
+
+    Args:
+        inputs: 入力WebPファイルのパスのイテラブル（非同期イテラブルも可）
+        jobs: 同時に実行する変換数（Noneの場合はCPUコア数）
+        max_in_flight: 同時に受け付ける最大ファイル数（Noneの場合はjobsの2倍）
+        **kwargs: AsyncConverter.iter_convert に渡すオプション（output_dir, force, profile など）
+
+    Yields:
+        完了順の変換結果
+    """
+    async with AsyncConverter(jobs=jobs, max_in_flight=max_in_flight) as converter:
+        async for result in converter.iter_convert(inputs, **kwargs):
+            yield result
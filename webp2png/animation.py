@@ -0,0 +1,131 @@
+"""Streaming animated WebP to APNG conversion for webp2png."""
+import io
+import logging
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .encoders import PILLOW_ENCODER, PNG_SIGNATURE, PngEncoder, iter_chunks, write_chunk
+from .timing import NULL_TIMER, PHASE_CONVERT, PHASE_DECODE, PHASE_ENCODE, PhaseTimer
+
+logger = logging.getLogger(__name__)
+
+# fcTLの dispose_op / blend_op（各フレームはキャンバス全体を置き換える）
+APNG_DISPOSE_OP_NONE = 0
+APNG_BLEND_OP_SOURCE = 0
+
+# アニメーション出力で使えるカラーモード（パレットはフレーム間で共有できないため除外）
+ANIMATION_MODES = ('RGBA', 'RGB', 'LA', 'L')
+
+
+def is_animated(img: Image.Image) -> bool:
+    """複数フレームを持つ画像かどうか"""
+    return getattr(img, 'is_animated', False) and getattr(img, 'n_frames', 1) > 1
+
+
+def _frame_delay(duration: int) -> Tuple[int, int]:
+    """表示時間（ミリ秒）をfcTLの delay_num / delay_den に変換する"""
+    if duration <= 0xffff:
+        return duration, 1000
+    # 16ビットに収まらない場合は1/100秒単位で表す
+    return min(duration // 10, 0xffff), 100
+
+
+def _encode_frame(
+    frame: Image.Image,
+    encode_options: Dict[str, Any],
+    encoder: PngEncoder = PILLOW_ENCODER
+) -> Tuple[bytes, List[bytes]]:
+    """1フレームをPNGとしてエンコードし、IHDRとIDATのデータを返す"""
+    buf = io.BytesIO()
+    encoder.save(frame, buf, encode_options)
+    ihdr = b''
+    idat = []
+    for chunk_type, data in iter_chunks(buf.getvalue()):
+        if chunk_type == b'IHDR':
+            ihdr = data
+        elif chunk_type == b'IDAT':
+            idat.append(data)
+    return ihdr, idat
+
+
+def save_apng(
+    img: Image.Image,
+    output: BinaryIO,
+    encode_options: Dict[str, Any],
+    mode: str = 'RGBA',
+    size: Optional[Tuple[int, int]] = None,
+    resample: Image.Resampling = Image.Resampling.BICUBIC,
+    reducing_gap: Optional[float] = None,
+    timer: PhaseTimer = NULL_TIMER,
+    encoder: PngEncoder = PILLOW_ENCODER
+) -> int:
+    """
+    アニメーションWebPをAPNGとして書き出す
+
+    フレームを1枚ずつデコード・エンコードして書き出すため、
+    フレーム数に関係なく保持するのは現在のフレームだけで済む。
+    各フレームの表示時間とループ回数は元のWebPの値を引き継ぐ。
+
+    Args:
+        img: 開いたアニメーションWebP画像
+        output: 書き込み先のバイナリファイルオブジェクト
+        encode_options: 各フレームのPNGエンコードオプション
+        mode: 出力カラーモード（"RGBA", "RGB", "LA", "L"）
+        size: 出力サイズ（指定時は各フレームをモード変換の前に縮小する）
+        resample: 縮小時のリサンプリングフィルタ
+        reducing_gap: Image.resize に渡す reducing_gap
+        timer: フレームごとのデコード・変換・エンコード時間を加算するタイマー
+        encoder: 各フレームのPNGエンコーダ
+
+    Returns:
+        書き出したフレーム数
+    """
+    if mode not in ANIMATION_MODES:
+        raise ValueError(f"Unsupported animation mode: {mode} (choose from {', '.join(ANIMATION_MODES)})")
+
+    n_frames = img.n_frames
+    # WebPのloopは0が無限ループで、APNGのnum_playsと同じ意味
+    loop = img.info.get('loop', 0)
+    width, height = size or img.size
+
+    output.write(PNG_SIGNATURE)
+    sequence = 0
+    for index in range(n_frames):
+        with timer.phase(PHASE_DECODE):
+            img.seek(index)
+            img.load()
+        with timer.phase(PHASE_CONVERT):
+            if size is not None and size != img.size:
+                frame = img.resize(size, resample, reducing_gap=reducing_gap).convert(mode)
+            else:
+                frame = img.convert(mode)
+        delay_num, delay_den = _frame_delay(int(img.info.get('duration', 0)))
+        with timer.phase(PHASE_ENCODE):
+            ihdr, idat = _encode_frame(frame, encode_options, encoder)
+        del frame
+
+        if index == 0:
+            write_chunk(output, b'IHDR', ihdr)
+            write_chunk(output, b'acTL', struct.pack('>II', n_frames, loop))
+
+        write_chunk(output, b'fcTL', struct.pack(
+            '>IIIIIHHBB',
+            sequence, width, height, 0, 0,
+            delay_num, delay_den,
+            APNG_DISPOSE_OP_NONE, APNG_BLEND_OP_SOURCE
+        ))
+        sequence += 1
+
+        for data in idat:
+            if index == 0:
+                # 先頭フレームはAPNG非対応のビューア向けの静止画も兼ねる
+                write_chunk(output, b'IDAT', data)
+            else:
+                write_chunk(output, b'fdAT', struct.pack('>I', sequence) + data)
+                sequence += 1
+
+    write_chunk(output, b'IEND', b'')
+    logger.debug(f"Wrote APNG with {n_frames} frames (loop={loop})")
+    return n_frames
@@ -1,22 +1,50 @@
 """Command-line interface for webp2png."""
+import itertools
 import logging
 import sys
+import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import click
-from tqdm import tqdm
 
 from . import __version__
-from .converter import ConversionError, convert_multiple_files, convert_webp_to_png
-from .utils import collect_webp_files, generate_output_path, logger
+from .constants import (
+    BACKEND_AUTO,
+    BACKEND_CHOICES,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_HOST,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_PORT,
+    DEFAULT_PROFILE,
+    DEFAULT_RESAMPLE,
+    DURABILITY_BATCH,
+    DURABILITY_CHOICES,
+    DURABILITY_FILE,
+    DURABILITY_NONE,
+    ENCODER_AUTO,
+    ENCODER_CHOICES,
+    EXECUTOR_AUTO,
+    EXECUTOR_CHOICES,
+    JOURNAL_NAME,
+    MANIFEST_NAME,
+    MODE_AUTO,
+    OUTPUT_MODES,
+    PROFILE_CHOICES,
+    RESAMPLE_CHOICES,
+)
+
+# 起動を速くするため、Pillow・tqdm などを使うモジュールは各コマンドの中で読み込む
+# （--help・--version ではどれも読み込まない）
+if TYPE_CHECKING:
+    from .converter import Rendition
 
 # ロガーの設定
 cli_logger = logging.getLogger(__name__)
 
 
 def setup_logging(verbose: bool, quiet: bool) -> None:
-    """ロギングレベルを設定する"""
+    """ロギングを設定する（コマンドの実行時のみ。ライブラリとして読み込んだ場合は設定しない）"""
     if quiet:
         level = logging.ERROR
     elif verbose:
@@ -24,29 +52,146 @@ def setup_logging(verbose: bool, quiet: bool) -> None:
     else:
         level = logging.INFO
     
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     logging.getLogger().setLevel(level)
 
 
-@click.command()
+def default_state_dir(inputs: Tuple[Path, ...], output_dir: Optional[Path]) -> Path:
+    """マニフェストとジャーナルを置く既定のディレクトリ（出力ディレクトリ、なければ最初の入力のディレクトリ）を返す"""
+    if output_dir is not None:
+        return output_dir
+    # カレントディレクトリは入力と無関係なことがあるため使わない
+    first = inputs[0]
+    return first if first.is_dir() else first.parent
+
+
+def _set_total_when_exhausted(paths: Iterable[Path], pbar: Any) -> Iterator[Path]:
+    """探索が終わった時点で総数をプログレスバーに設定し、割合と残り時間を表示できるようにする"""
+    count = 0
+    for path in paths:
+        count += 1
+        yield path
+    pbar.total = count
+    pbar.refresh()
+
+
+def parse_max_size(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """--max-size の値（"256" または "320x240"）を (幅, 高さ) に変換する"""
+    if value is None:
+        return None
+    try:
+        parts = [int(part) for part in value.lower().split('x')]
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is not N or WIDTHxHEIGHT")
+    if len(parts) == 1:
+        parts *= 2
+    if len(parts) != 2 or min(parts) < 1:
+        raise click.BadParameter(f"'{value}' is not N or WIDTHxHEIGHT")
+    return parts[0], parts[1]
+
+
+def parse_renditions(ctx: click.Context, param: click.Parameter, value: Tuple[str, ...]) -> List["Rendition"]:
+    """--rendition の値（"SIZE[:PROFILE[:TEMPLATE]]"）をレンディションに変換する"""
+    if not value:
+        return []
+    from .converter import ConversionError, parse_rendition
+    try:
+        return [parse_rendition(spec) for spec in value]
+    except ConversionError as e:
+        raise click.BadParameter(str(e))
+
+
+class DefaultCommandGroup(click.Group):
+    """サブコマンド名で始まらない引数を既定のコマンドに渡すグループ"""
+    
+    def __init__(self, *args, default_command: str, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+    
+    def parse_args(self, ctx: click.Context, args: list) -> list:
+        # `webp2png image.webp` のような従来の呼び出しを `webp2png convert image.webp` として扱う
+        if not args or (args[0] not in self.commands and args[0] not in ('--help', '--version')):
+            args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup, default_command='convert')
+@click.version_option(version=__version__, prog_name='webp2png')
+def main() -> None:
+    """
+    WebP画像をPNG形式に変換するツール
+    
+    サブコマンドを省略した場合は convert として実行します。
+    """
+
+
+@main.command(short_help='WebP画像をPNG形式に変換する（既定のコマンド）')
 @click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
 @click.option('-o', '--output', type=click.Path(path_type=Path), help='出力ファイル名（単一ファイル時）')
 @click.option('-d', '--output-dir', 'output_dir', type=click.Path(path_type=Path), help='出力ディレクトリ（複数ファイル時）')
 @click.option('-r', '--recursive', is_flag=True, help='再帰的にディレクトリを探索')
+@click.option('--include', 'include', multiple=True, metavar='PATTERN', help='ディレクトリ内でこのパターンに一致するファイルのみ変換（複数指定可能）')
+@click.option('--exclude', 'exclude', multiple=True, metavar='PATTERN', help='ディレクトリ内でこのパターンに一致するファイル・ディレクトリを除外（複数指定可能）')
+@click.option('--detect-by-content', is_flag=True, help='拡張子ではなくファイル内容（RIFF/WEBP）でWebPを判定')
+@click.option('--sort', 'sort_inputs', is_flag=True, help='探索結果をパス順にソートしてから変換（全件の収集を待つ）')
 @click.option('-f', '--force', is_flag=True, help='既存ファイルを上書き')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=None, help='並列数（デフォルト: CPUコア数）')
+@click.option('--executor', type=click.Choice(EXECUTOR_CHOICES), default=EXECUTOR_AUTO, show_default=True, help='並列実行モード')
+@click.option('--profile', type=click.Choice(PROFILE_CHOICES), default=DEFAULT_PROFILE, show_default=True, help='PNGエンコードプロファイル（速度とサイズのトレードオフ）')
+@click.option('--compress-level', type=click.IntRange(0, 9), default=None, help='zlib圧縮レベル（0-9、プロファイルの値を上書き）')
+@click.option('--mode', type=click.Choice(OUTPUT_MODES), default=MODE_AUTO, show_default=True, help='出力カラーモード（autoは透明度がある場合のみRGBA）')
+@click.option('--max-size', callback=parse_max_size, metavar='N|WxH', help='出力の最大サイズ（アスペクト比を保って縮小、拡大はしない）')
+@click.option('--scale', type=click.FloatRange(0, 1, min_open=True), default=None, help='縮小率（0より大きく1以下）')
+@click.option('--resample', type=click.Choice(RESAMPLE_CHOICES), default=DEFAULT_RESAMPLE, show_default=True, help='縮小時のリサンプリングフィルタ')
+@click.option('--rendition', 'renditions', multiple=True, callback=parse_renditions, metavar='SIZE[:PROFILE[:TEMPLATE]]', help='1回のデコードから書き出す出力（複数指定可能、例: full, 1024:balanced, 256:fast:{stem}_thumb.png）')
+@click.option('--encoder', type=click.Choice(ENCODER_CHOICES), default=ENCODER_AUTO, show_default=True, help='PNGエンコーダのバックエンド（autoは圧縮レベル9でlibdeflate/zlib-ngがあれば使用）')
+@click.option('--first-frame-only', is_flag=True, help='アニメーションWebPの先頭フレームのみを変換（デフォルトはAPNGとして全フレームを変換）')
+@click.option('--atomic/--no-atomic', default=True, show_default=True, help='一時ファイルに書き込んでからリネーム（中断時に書きかけのPNGを残さない）')
+@click.option('--durability', type=click.Choice(DURABILITY_CHOICES), default=DURABILITY_NONE, show_default=True, help='fsyncの方針（none: しない、file: ファイルごと、batch: バッチ終了時にまとめて）')
+@click.option('-i', '--incremental', is_flag=True, help='マニフェストを使い、前回から変更のない入力をスキップ')
+@click.option('--manifest', 'manifest_path', type=click.Path(dir_okay=False, path_type=Path), help=f'マニフェストのパス（デフォルト: 出力ディレクトリ、未指定時は最初の入力のディレクトリの{MANIFEST_NAME}）')
+@click.option('--hash', 'use_hash', is_flag=True, help='増分変換時に内容のSHA-256も比較')
+@click.option('--resume', is_flag=True, help='ジャーナルを読み込み、前回中断したバッチ変換を続きから再開（失敗した入力は飛ばす。初回から付けておくと中断に備えて記録する）')
+@click.option('--retry-failed', is_flag=True, help='ジャーナルに記録された失敗した入力のみを再変換（--resume と併用時は未完了の入力も変換）')
+@click.option('--journal', 'journal_path', type=click.Path(dir_okay=False, path_type=Path), help=f'ジャーナルのパス（デフォルト: 出力ディレクトリ、未指定時は最初の入力のディレクトリの{JOURNAL_NAME}）')
+@click.option('--profile-report', 'profile_report', type=click.Path(dir_okay=False, path_type=Path), help='ファイルごとのフェーズ別所要時間を書き出す（.csv はCSV、それ以外はJSON lines）')
 @click.option('-q', '--quiet', is_flag=True, help='エラー以外の出力を抑制')
 @click.option('-v', '--verbose', is_flag=True, help='詳細ログ出力')
-@click.version_option(version=__version__, prog_name='webp2png')
-def main(
+def convert(
     inputs: Tuple[Path, ...],
     output: Optional[Path],
     output_dir: Optional[Path],
     recursive: bool,
+    include: Tuple[str, ...],
+    exclude: Tuple[str, ...],
+    detect_by_content: bool,
+    sort_inputs: bool,
     force: bool,
+    jobs: Optional[int],
+    executor: str,
+    profile: str,
+    compress_level: Optional[int],
+    mode: str,
+    max_size: Optional[Tuple[int, int]],
+    scale: Optional[float],
+    resample: str,
+    renditions: List["Rendition"],
+    encoder: str,
+    first_frame_only: bool,
+    atomic: bool,
+    durability: str,
+    incremental: bool,
+    manifest_path: Optional[Path],
+    use_hash: bool,
+    resume: bool,
+    retry_failed: bool,
+    journal_path: Optional[Path],
+    profile_report: Optional[Path],
     quiet: bool,
     verbose: bool
 ) -> None:
     """
-    WebP画像をPNG形式に変換するツール
+    WebP画像をPNG形式に変換する
     
     INPUTS: WebPファイルまたはディレクトリ（複数指定可能）
     
@@ -56,74 +201,366 @@ def main(
         webp2png *.webp --output-dir ./png_output/
         
         webp2png -r ./images/ --output-dir ./converted/
+        
+        webp2png -r ./images/ --output-dir ./converted/ --jobs 8
+        
+        webp2png -r ./images/ --output-dir ./converted/ --incremental
+        
+        webp2png -r ./images/ --output-dir ./converted/ --resume
+        
+        webp2png -r ./images/ --output-dir ./thumbs/ --max-size 256 --profile fast
+        
+        webp2png -r ./images/ -d ./out/ --rendition full --rendition 1024 --rendition 256:fast
     """
     # ロギング設定
     setup_logging(verbose, quiet)
     
+    from .converter import STATUS_SUCCESS, ConversionError, ConversionResult, convert_webp_to_png
+    from .utils import collect_webp_files, iter_webp_files
+    
     # 入力ファイルの収集
-    input_paths = list(inputs)
-    webp_files = collect_webp_files(input_paths, recursive=recursive)
+    # 見つけたものから順に変換できるよう、探索は遅延評価する
+    walk_options = dict(
+        recursive=recursive,
+        detect_by_content=detect_by_content,
+        include=include,
+        exclude=exclude
+    )
+    if sort_inputs:
+        sorted_files = collect_webp_files(list(inputs), sort=True, **walk_options)
+        total: Optional[int] = len(sorted_files)
+        webp_files = iter(sorted_files)
+    else:
+        # 探索と変換を並行するため、総数は事前にわからない
+        total = None
+        webp_files = iter_webp_files(inputs, **walk_options)
+    # 単一ファイルかどうかの判定のため、先頭の2件だけ取り出しておく
+    head = list(itertools.islice(webp_files, 2))
     
-    if not webp_files:
+    if not head:
         click.echo("Error: No WebP files found.", err=True)
         sys.exit(1)
     
+    if renditions and output:
+        click.echo("Error: --output cannot be used with --rendition (use --output-dir).", err=True)
+        sys.exit(1)
+    
+    # フェーズ別の計測（指定時のみ）
+    if profile_report:
+        from .timing import PhaseTimer, TimingReport
+        report = TimingReport(profile_report)
+    else:
+        report = None
+    
     # 単一ファイルの場合はoutputオプションを使用
-    if len(webp_files) == 1 and output:
+    if len(head) == 1 and output:
+        timer = PhaseTimer() if report else None
+        start = time.perf_counter()
         try:
             output_path = convert_webp_to_png(
-                webp_files[0],
+                head[0],
                 output_path=output,
-                force=force
+                force=force,
+                profile=profile,
+                compress_level=compress_level,
+                mode=mode,
+                animation=not first_frame_only,
+                max_size=max_size,
+                scale=scale,
+                resample=resample,
+                encoder=encoder,
+                atomic=atomic,
+                # 単一ファイルではバッチ終了時の同期はファイルごとの同期と同じ
+                durability=DURABILITY_FILE if durability == DURABILITY_BATCH else durability,
+                timer=timer
             )
             if not quiet:
-                click.echo(f"Converted: {webp_files[0]} -> {output_path}")
+                click.echo(f"Converted: {head[0]} -> {output_path}")
+            if report is not None:
+                report.add(ConversionResult(
+                    input_path=head[0],
+                    output_path=output_path,
+                    status=STATUS_SUCCESS,
+                    elapsed=time.perf_counter() - start,
+                    stats=timer.as_dict()
+                ))
         except ConversionError as e:
             click.echo(f"Error: {e}", err=True)
             sys.exit(1)
+        finally:
+            # 失敗した場合も書き出し先のファイルを閉じる
+            if report is not None:
+                report.close()
+        if report is not None and not quiet:
+            click.echo(report.summary())
     else:
         # 複数ファイルの処理
+        from tqdm import tqdm
+        
+        from .converter import STATUS_SKIPPED, default_jobs, iter_convert
+        from .journal import Journal
+        from .manifest import Manifest
+        
         if output_dir:
             output_dir = Path(output_dir)
             output_dir.mkdir(parents=True, exist_ok=True)
         else:
             output_dir = None
         
-        # プログレスバー付きで変換
-        results = {}
-        with tqdm(total=len(webp_files), disable=quiet, desc="Converting") as pbar:
-            for webp_file in webp_files:
-                try:
-                    # output_dirが指定されている場合は出力パスを生成
-                    if output_dir:
-                        output_path = generate_output_path(webp_file, output_dir)
+        if jobs is None:
+            jobs = default_jobs()
+        
+        # 増分変換用のマニフェスト
+        manifest = None
+        if incremental or manifest_path:
+            if manifest_path is None:
+                manifest_path = default_state_dir(inputs, output_dir) / MANIFEST_NAME
+            manifest = Manifest(manifest_path, use_hash=use_hash)
+        
+        # 中断からの再開用のジャーナル（--resume・--retry-failed・--journal の指定時のみ記録する）
+        planned = itertools.chain(head, webp_files)
+        journal = None
+        if resume or retry_failed or journal_path:
+            if journal_path is None:
+                journal_path = default_state_dir(inputs, output_dir) / JOURNAL_NAME
+            if retry_failed and not journal_path.exists():
+                click.echo(f"Error: No journal found: {journal_path}", err=True)
+                sys.exit(1)
+            journal = Journal(journal_path, resume=resume or retry_failed)
+            planned = journal.select(
+                planned,
+                retry_failed=retry_failed,
+                failed_only=retry_failed and not resume
+            )
+        if total is not None:
+            planned_files = list(planned)
+            total = len(planned_files)
+            planned = iter(planned_files)
+        
+        convert_options: Dict[str, Any] = dict(
+            compress_level=compress_level,
+            mode=mode,
+            animation=not first_frame_only,
+            resample=resample,
+            encoder=encoder,
+            atomic=atomic,
+            durability=durability
+        )
+        if renditions:
+            # 1回のデコードから全レンディションを書き出す
+            convert_options['renditions'] = renditions
+        else:
+            convert_options.update(profile=profile, max_size=max_size, scale=scale)
+        
+        # プログレスバー付きで変換（完了順に更新）
+        success_count = 0
+        skip_count = 0
+        fail_count = 0
+        try:
+            with tqdm(total=total, disable=quiet, desc="Converting") as pbar:
+                if total is None:
+                    planned = _set_total_when_exhausted(planned, pbar)
+                for result in iter_convert(
+                    planned,
+                    output_dir=output_dir,
+                    force=force,
+                    jobs=jobs,
+                    executor=executor,
+                    manifest=manifest,
+                    collect_timings=report is not None,
+                    **convert_options
+                ):
+                    if result.status == STATUS_SKIPPED:
+                        skip_count += 1
+                    elif result.ok:
+                        success_count += 1
                     else:
-                        output_path = None  # Noneの場合は自動生成される
-                    
-                    result_path = convert_webp_to_png(
-                        webp_file,
-                        output_path=output_path,
-                        force=force
-                    )
-                    results[webp_file] = result_path
-                    pbar.update(1)
-                except ConversionError as e:
-                    cli_logger.error(f"Conversion failed for {webp_file}: {e}")
-                    results[webp_file] = None
+                        fail_count += 1
+                    if journal is not None:
+                        journal.record(result)
+                    if report is not None:
+                        report.add(result)
                     pbar.update(1)
+        finally:
+            if journal is not None:
+                journal.close()
+            if manifest is not None:
+                manifest.close()
+            if report is not None:
+                report.close()
         
         # 結果のサマリー
         if not quiet:
-            success_count = sum(1 for v in results.values() if v is not None)
-            fail_count = len(results) - success_count
-            
+            if report is not None:
+                click.echo("\n" + report.summary())
             click.echo(f"\nConversion complete:")
             click.echo(f"  Success: {success_count}")
+            if skip_count > 0:
+                click.echo(f"  Skipped (unchanged): {skip_count}")
+            already_done = journal.already_done if journal is not None else 0
+            already_failed = journal.already_failed if journal is not None else 0
+            if already_done > 0:
+                click.echo(f"  Already converted (resumed): {already_done}")
+            if already_failed > 0:
+                click.echo(f"  Previously failed (use --retry-failed): {already_failed}", err=True)
             if fail_count > 0:
                 click.echo(f"  Failed: {fail_count}", err=True)
+            if fail_count > 0 or already_failed > 0:
                 sys.exit(1)
 
 
+@main.command(short_help='ローカルHTTP変換サービスを起動する')
+@click.option('--host', default=DEFAULT_HOST, show_default=True, help='待ち受けるホスト')
+@click.option('-p', '--port', type=click.IntRange(0, 65535), default=DEFAULT_PORT, show_default=True, help='待ち受けるポート')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=None, help='ワーカー数（デフォルト: CPUコア数）')
+@click.option('--executor', type=click.Choice(EXECUTOR_CHOICES), default=EXECUTOR_AUTO, show_default=True, help='ワーカープールの種類')
+@click.option('--max-concurrency', type=click.IntRange(min=1), default=None, help='同時に変換するリクエスト数の上限（デフォルト: ワーカー数の2倍）')
+@click.option('--profile', type=click.Choice(PROFILE_CHOICES), default=DEFAULT_PROFILE, show_default=True, help='既定のPNGエンコードプロファイル')
+@click.option('-q', '--quiet', is_flag=True, help='エラー以外の出力を抑制')
+@click.option('-v', '--verbose', is_flag=True, help='詳細ログ出力')
+def serve(
+    host: str,
+    port: int,
+    jobs: Optional[int],
+    executor: str,
+    max_concurrency: Optional[int],
+    profile: str,
+    quiet: bool,
+    verbose: bool
+) -> None:
+    """
+    ローカルHTTP変換サービスを起動する
+    
+    POST /convert にWebPを送るとPNGを返します。
+    リクエストボディの上限は入力ファイルと同じ（100MB）です。
+    
+    例:
+        webp2png serve --port 8080 --jobs 8
+        
+        curl --data-binary @image.webp http://127.0.0.1:8080/convert?profile=fast -o image.png
+    """
+    setup_logging(verbose, quiet)
+    from .server import serve as run_server
+    run_server(
+        host=host,
+        port=port,
+        jobs=jobs,
+        executor=executor,
+        max_concurrency=max_concurrency,
+        profile=profile
+    )
+
+
+@main.command(short_help='ディレクトリを監視し、追加・更新されたWebPを変換する')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('-d', '--output-dir', 'output_dir', type=click.Path(path_type=Path), help='出力ディレクトリ（デフォルト: 入力ファイルと同じディレクトリ）')
+@click.option('--no-recursive', 'no_recursive', is_flag=True, help='サブディレクトリを監視しない')
+@click.option('--include', 'include', multiple=True, metavar='PATTERN', help='このパターンに一致するファイルのみ変換（複数指定可能）')
+@click.option('--exclude', 'exclude', multiple=True, metavar='PATTERN', help='このパターンに一致するファイル・ディレクトリを除外（複数指定可能）')
+@click.option('--detect-by-content', is_flag=True, help='拡張子ではなくファイル内容（RIFF/WEBP）でWebPを判定')
+@click.option('-f', '--force', is_flag=True, help='既存ファイルを上書き')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=None, help='ワーカー数（デフォルト: CPUコア数）')
+@click.option('--executor', type=click.Choice(EXECUTOR_CHOICES), default=EXECUTOR_AUTO, show_default=True, help='ワーカープールの種類')
+@click.option('--backend', type=click.Choice(BACKEND_CHOICES), default=BACKEND_AUTO, show_default=True, help='変更の検出方法（autoはinotifyが使えなければポーリング）')
+@click.option('--debounce', type=click.FloatRange(min=0), default=DEFAULT_DEBOUNCE, show_default=True, help='書き込み完了とみなすまでにサイズが変わらないことを確認する秒数')
+@click.option('--poll-interval', type=click.FloatRange(min=0, min_open=True), default=DEFAULT_POLL_INTERVAL, show_default=True, help='ポーリング時の走査間隔（秒）')
+@click.option('--profile', type=click.Choice(PROFILE_CHOICES), default=DEFAULT_PROFILE, show_default=True, help='PNGエンコードプロファイル')
+@click.option('--compress-level', type=click.IntRange(0, 9), default=None, help='zlib圧縮レベル（0-9、プロファイルの値を上書き）')
+@click.option('--mode', type=click.Choice(OUTPUT_MODES), default=MODE_AUTO, show_default=True, help='出力カラーモード')
+@click.option('--max-size', callback=parse_max_size, metavar='N|WxH', help='出力の最大サイズ（アスペクト比を保って縮小、拡大はしない）')
+@click.option('--encoder', type=click.Choice(ENCODER_CHOICES), default=ENCODER_AUTO, show_default=True, help='PNGエンコーダのバックエンド')
+@click.option('--first-frame-only', is_flag=True, help='アニメーションWebPの先頭フレームのみを変換')
+@click.option('--durability', type=click.Choice((DURABILITY_NONE, DURABILITY_FILE)), default=DURABILITY_NONE, show_default=True, help='fsyncの方針（none: しない、file: ファイルごと）')
+@click.option('--manifest', 'manifest_path', type=click.Path(dir_okay=False, path_type=Path), help=f'変換済みの入力を記録するマニフェストのパス（デフォルト: 出力ディレクトリの{MANIFEST_NAME}）')
+@click.option('-q', '--quiet', is_flag=True, help='エラー以外の出力を抑制')
+@click.option('-v', '--verbose', is_flag=True, help='詳細ログ出力')
+def watch(
+    directory: Path,
+    output_dir: Optional[Path],
+    no_recursive: bool,
+    include: Tuple[str, ...],
+    exclude: Tuple[str, ...],
+    detect_by_content: bool,
+    force: bool,
+    jobs: Optional[int],
+    executor: str,
+    backend: str,
+    debounce: float,
+    poll_interval: float,
+    profile: str,
+    compress_level: Optional[int],
+    mode: str,
+    max_size: Optional[Tuple[int, int]],
+    encoder: str,
+    first_frame_only: bool,
+    durability: str,
+    manifest_path: Optional[Path],
+    quiet: bool,
+    verbose: bool
+) -> None:
+    """
+    ディレクトリを監視し、追加・更新されたWebPをPNGに変換する
+
+    起動時に一度ディレクトリ全体を既存の出力と突き合わせ、未変換の入力を変換してから
+    監視を始めます。Ctrl+Cで終了します（実行中の変換は完了を待ちます）。
+
+    DIRECTORY: 監視するディレクトリ
+
+    例:
+        webp2png watch ./incoming/ --output-dir ./png/
+
+        webp2png watch ./incoming/ -d ./thumbs/ --max-size 256 --profile fast --jobs 4
+    """
+    setup_logging(verbose, quiet)
+    from .converter import ConversionError
+    from .manifest import Manifest
+    from .watch import Watcher
+
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(manifest_path) if manifest_path else None
+    try:
+        watcher = Watcher(
+            directory,
+            output_dir=output_dir,
+            recursive=not no_recursive,
+            force=force,
+            jobs=jobs,
+            executor=executor,
+            backend=backend,
+            debounce=debounce,
+            poll_interval=poll_interval,
+            manifest=manifest,
+            detect_by_content=detect_by_content,
+            include=include,
+            exclude=exclude,
+            profile=profile,
+            compress_level=compress_level,
+            mode=mode,
+            animation=not first_frame_only,
+            max_size=max_size,
+            encoder=encoder,
+            durability=durability
+        )
+    except (OSError, ValueError, ConversionError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    if not quiet:
+        click.echo(f"\nStopped watching {directory}:")
+        click.echo(f"  Converted: {watcher.converted}")
+        if watcher.failed > 0:
+            click.echo(f"  Failed: {watcher.failed}", err=True)
+
+
 if __name__ == '__main__':
     main()
 
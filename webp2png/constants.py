@@ -0,0 +1,66 @@
+"""Option names and defaults shared by the CLI and the conversion engine."""
+
+# CLIは起動時にこのモジュールだけを読み込んでオプションを組み立てるため、
+# Pillow・tqdm・http.server などの重いモジュールをここで読み込んではいけない
+
+# 並列実行モード
+# Pillowは WebPデコード・モード変換・zlib圧縮の各C処理中にGILを解放するため、
+# 通常はスレッドで十分にコアを使い切れる。Python側の処理が支配的な環境向けにprocessも選択可能。
+EXECUTOR_AUTO = "auto"
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+EXECUTOR_CHOICES = (EXECUTOR_AUTO, EXECUTOR_THREAD, EXECUTOR_PROCESS)
+
+# PNGエンコードプロファイル（設定値は converter.ENCODE_PROFILES）
+PROFILE_FAST = "fast"
+PROFILE_BALANCED = "balanced"
+PROFILE_SMALLEST = "smallest"
+PROFILE_CHOICES = (PROFILE_FAST, PROFILE_BALANCED, PROFILE_SMALLEST)
+# 従来の optimize=True と同じ出力になるプロファイルを既定とする
+DEFAULT_PROFILE = PROFILE_SMALLEST
+
+# 出力カラーモード（autoは透明度の有無に応じてRGBA/RGB/LA/Lを選ぶ）
+MODE_AUTO = "auto"
+OUTPUT_MODES = (MODE_AUTO, "RGBA", "RGB", "LA", "L")
+
+# 縮小時のリサンプリングフィルタ（Image.Resampling の名前の小文字）
+RESAMPLE_CHOICES = ("nearest", "box", "bilinear", "hamming", "bicubic", "lanczos")
+# Image.thumbnail と同じ既定値
+DEFAULT_RESAMPLE = "bicubic"
+
+# 書き込みの永続化ポリシー
+# none: fsyncしない、file: ファイルごとにfsync、batch: バッチ終了時にまとめて同期する
+DURABILITY_NONE = "none"
+DURABILITY_FILE = "file"
+DURABILITY_BATCH = "batch"
+DURABILITY_CHOICES = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_BATCH)
+
+# エンコーダのバックエンド
+ENCODER_AUTO = "auto"  # 高い圧縮レベルでは高速なdeflate実装があれば使い、なければPillow
+ENCODER_PILLOW = "pillow"  # Pillow内蔵のzlib（常に利用可能）
+ENCODER_ZLIB = "zlib"  # 標準ライブラリのzlibでIDATを圧縮し直す（常に利用可能、主に比較用）
+ENCODER_ZLIB_NG = "zlib-ng"  # zlib-ng（pip install zlib-ng）
+ENCODER_ISAL = "isal"  # Intel ISA-L（pip install isal）。速度優先で圧縮レベル0/1のみ使う
+ENCODER_LIBDEFLATE = "libdeflate"  # libdeflate（pip install deflate）
+ENCODER_CHOICES = (ENCODER_AUTO, ENCODER_PILLOW, ENCODER_ZLIB, ENCODER_ZLIB_NG, ENCODER_ISAL, ENCODER_LIBDEFLATE)
+
+# 出力ディレクトリに置くマニフェストのファイル名
+MANIFEST_NAME = ".webp2png-manifest.jsonl"
+
+# 出力ディレクトリに置くジャーナルのファイル名
+JOURNAL_NAME = ".webp2png-journal.jsonl"
+
+# 変換サービスの既定の待ち受けアドレス
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# 監視モードの変更の検出方法
+BACKEND_AUTO = "auto"  # inotifyが使えればinotify、なければポーリング
+BACKEND_INOTIFY = "inotify"  # Linuxのinotify（書き込みを閉じた時点で検出）
+BACKEND_POLL = "poll"  # 定期的にディレクトリを走査してサイズ・更新時刻を比較
+BACKEND_CHOICES = (BACKEND_AUTO, BACKEND_INOTIFY, BACKEND_POLL)
+
+# 最後の変更からこの秒数だけサイズが変わらなければ書き込み完了とみなす
+DEFAULT_DEBOUNCE = 1.0
+# ポーリング時の走査間隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
@@ -1,26 +1,343 @@
 """Core conversion engine for webp2png."""
+import io
 import logging
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 from PIL import Image
 
-from .validator import validate_input_file, validate_output_path
-from .utils import ensure_output_dir, handle_file_conflict, generate_output_path
+from .animation import ANIMATION_MODES, is_animated, save_apng
+from .constants import (
+    DEFAULT_PROFILE,
+    DEFAULT_RESAMPLE,
+    DURABILITY_BATCH,
+    DURABILITY_CHOICES,
+    DURABILITY_FILE,
+    DURABILITY_NONE,
+    ENCODER_AUTO,
+    EXECUTOR_AUTO,
+    EXECUTOR_CHOICES,
+    EXECUTOR_PROCESS,
+    EXECUTOR_THREAD,  # noqa: F401  従来どおり converter からも参照できるようにする
+    MODE_AUTO,
+    OUTPUT_MODES,
+    PROFILE_BALANCED,
+    PROFILE_FAST,
+    PROFILE_SMALLEST,
+    RESAMPLE_CHOICES,
+)
+from .encoders import PngEncoder, get_encoder
+from .manifest import Manifest, options_key
+from .metrics import Metrics
+from .timing import (
+    NULL_TIMER,
+    PHASE_CONVERT,
+    PHASE_DECODE,
+    PHASE_ENCODE,
+    PHASE_PROBE,
+    PHASE_VALIDATE,
+    PHASE_WRITE,
+    PhaseTimer,
+)
+from .validator import MAX_FILE_SIZE, OutputDirCache, open_input_file, validate_input_bytes, validate_output_path
+from .utils import (
+    OutputNameAllocator,
+    atomic_write,
+    ensure_output_dir,
+    fsync_directory,
+    generate_output_path,
+    open_output,
+    release_output_path,
+    sync_files,
+)
 
 logger = logging.getLogger(__name__)
 
+# PNGエンコードプロファイル（速度とサイズのトレードオフ）
+# compress_level: zlib圧縮レベル、compress_type: zlib圧縮戦略、optimize: Pillowの最適化パス
+ENCODE_PROFILES: Dict[str, Dict[str, Any]] = {
+    PROFILE_FAST: {'compress_level': 1, 'compress_type': zlib.Z_RLE, 'optimize': False},
+    PROFILE_BALANCED: {'compress_level': 6, 'compress_type': zlib.Z_FILTERED, 'optimize': False},
+    PROFILE_SMALLEST: {'compress_level': 9, 'compress_type': zlib.Z_DEFAULT_STRATEGY, 'optimize': True},
+}
+
+# 縮小時のリサンプリングフィルタ
+RESAMPLE_FILTERS: Dict[str, Image.Resampling] = {name: Image.Resampling[name.upper()] for name in RESAMPLE_CHOICES}
+# reduce() で整数分の1に縮小し、目標サイズの2倍以内にしてからリサンプリングする
+REDUCING_GAP = 2.0
+
+# レンディションの出力名テンプレート（{stem}, {size}, {width}, {height}, {profile} が使える）
+RENDITION_FULL = "full"
+DEFAULT_RENDITION_TEMPLATE = "{stem}.png"
+DEFAULT_SIZED_RENDITION_TEMPLATE = "{stem}_{size}.png"
+
+# 変換エラーの分類（メトリクスの集計単位）
+ERROR_OPTIONS = "options"  # 不正な変換オプション
+ERROR_INPUT = "input"  # 入力の検証に失敗（存在しない、WebPでない、大きすぎる等）
+ERROR_OUTPUT = "output"  # 出力先の検証・作成・書き込みに失敗
+ERROR_DECODE = "decode"  # デコード中のエラー（破損したWebP等）
+ERROR_UNEXPECTED = "unexpected"  # 想定外のエラー
+ERROR_REASONS = (ERROR_OPTIONS, ERROR_INPUT, ERROR_OUTPUT, ERROR_DECODE, ERROR_UNEXPECTED)
+
+# 変換結果のステータス
+STATUS_SUCCESS = "success"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
 
 class ConversionError(Exception):
     """変換エラー用のカスタム例外"""
-    pass
+    
+    def __init__(self, message: str, reason: str = ERROR_UNEXPECTED) -> None:
+        """
+        Args:
+            message: エラーメッセージ
+            reason: エラーの分類（"options", "input", "output", "decode", "unexpected"）
+        """
+        super().__init__(message)
+        self.reason = reason
+    
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # プロセスワーカーから受け取った場合も分類を保つ
+        return type(self), (str(self), self.reason)
+
+
+def select_output_mode(img: Image.Image, mode: str = MODE_AUTO) -> str:
+    """
+    出力するカラーモードを決定する
+    
+    Args:
+        img: デコード済みの画像
+        mode: 出力モード（"auto"の場合は透明度が実際に存在するときのみアルファ付きにする）
+        
+    Returns:
+        PNGとして保存するカラーモード
+        
+    Raises:
+        ConversionError: 不明なモードの場合
+    """
+    if mode not in OUTPUT_MODES:
+        raise ConversionError(f"Unknown output mode: {mode} (choose from {', '.join(OUTPUT_MODES)})", ERROR_OPTIONS)
+    if mode != MODE_AUTO:
+        return mode
+    
+    if img.mode in ('RGBA', 'LA'):
+        # アルファが全画素不透明なら、アルファなしのモードで十分
+        if img.getchannel('A').getextrema() == (255, 255):
+            return img.mode[:-1]
+        return img.mode
+    if img.mode in ('RGB', 'L'):
+        return img.mode
+    if img.mode == 'P' and 'transparency' in img.info:
+        return 'RGBA'
+    return 'RGB'
+
+
+def get_encode_options(profile: str = DEFAULT_PROFILE, compress_level: Optional[int] = None) -> Dict[str, Any]:
+    """
+    エンコードプロファイルからPNG保存オプションを生成する
+    
+    Args:
+        profile: エンコードプロファイル名（"fast", "balanced", "smallest"）
+        compress_level: zlib圧縮レベル（0-9、指定時はプロファイルの値を上書き）
+        
+    Returns:
+        Image.save に渡すPNG保存オプション
+        
+    Raises:
+        ConversionError: 不明なプロファイルまたは範囲外の圧縮レベルの場合
+    """
+    if profile not in ENCODE_PROFILES:
+        raise ConversionError(f"Unknown encode profile: {profile} (choose from {', '.join(ENCODE_PROFILES)})", ERROR_OPTIONS)
+    
+    options = dict(ENCODE_PROFILES[profile])
+    if compress_level is not None:
+        if not 0 <= compress_level <= 9:
+            raise ConversionError(f"compress_level must be between 0 and 9: {compress_level}", ERROR_OPTIONS)
+        options['compress_level'] = compress_level
+        # optimizeは圧縮レベル9を強制するため、明示的なレベル指定時は無効にする
+        options['optimize'] = False
+    return options
+
+
+def get_resize_options(
+    max_size: Optional[Union[int, Tuple[int, int]]] = None,
+    scale: Optional[float] = None,
+    resample: str = DEFAULT_RESAMPLE
+) -> Optional[Dict[str, Any]]:
+    """
+    縮小オプションを検証して正規化する
+    
+    Args:
+        max_size: 出力の最大サイズ（一辺の長さ、または (幅, 高さ)。アスペクト比は維持する）
+        scale: 縮小率（0より大きく1以下）
+        resample: リサンプリングフィルタ名（"nearest", "box", "bilinear", "hamming", "bicubic", "lanczos"）
+        
+    Returns:
+        縮小オプション（縮小しない場合はNone）
+        
+    Raises:
+        ConversionError: 不正な値の場合
+    """
+    if resample not in RESAMPLE_FILTERS:
+        raise ConversionError(f"Unknown resample filter: {resample} (choose from {', '.join(RESAMPLE_FILTERS)})", ERROR_OPTIONS)
+    if max_size is None and scale is None:
+        return None
+    
+    if isinstance(max_size, int):
+        max_size = (max_size, max_size)
+    if max_size is not None:
+        max_size = tuple(max_size)
+        if len(max_size) != 2 or any(value < 1 for value in max_size):
+            raise ConversionError(f"max_size must be positive: {max_size}", ERROR_OPTIONS)
+    if scale is not None and not 0 < scale <= 1:
+        raise ConversionError(f"scale must be greater than 0 and at most 1: {scale}", ERROR_OPTIONS)
+    return {'max_size': max_size, 'scale': scale, 'resample': RESAMPLE_FILTERS[resample]}
+
+
+def get_target_size(size: Tuple[int, int], resize_options: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    縮小後のサイズを求める（拡大はしない）
+    
+    Args:
+        size: 元の画像サイズ
+        resize_options: get_resize_options() の戻り値
+        
+    Returns:
+        出力する画像サイズ
+    """
+    if resize_options is None:
+        return size
+    width, height = size
+    ratio = 1.0
+    if resize_options['scale'] is not None:
+        ratio = resize_options['scale']
+    if resize_options['max_size'] is not None:
+        max_width, max_height = resize_options['max_size']
+        ratio = min(ratio, max_width / width, max_height / height)
+    if ratio >= 1.0:
+        return size
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """1つの入力から作る出力（サイズ・エンコードプロファイル・出力名）の仕様"""
+    max_size: Optional[Tuple[int, int]] = None  # 最大サイズ（Noneの場合は元のサイズ）
+    profile: str = DEFAULT_PROFILE
+    template: Optional[str] = None  # 出力名のテンプレート（Noneの場合はサイズに応じた既定値）
+    
+    @property
+    def label(self) -> str:
+        """サイズの表記（"full", "1024", "320x240"）"""
+        if self.max_size is None:
+            return RENDITION_FULL
+        width, height = self.max_size
+        return str(width) if width == height else f"{width}x{height}"
+    
+    def output_name(self, input_path: Path, size: Tuple[int, int]) -> str:
+        """
+        出力ファイル名を返す
+        
+        Args:
+            input_path: 入力ファイルのパス
+            size: 出力する画像サイズ
+            
+        Raises:
+            ConversionError: テンプレートに不明な項目がある場合
+        """
+        if self.template is not None:
+            template = self.template
+        elif self.max_size is None:
+            template = DEFAULT_RENDITION_TEMPLATE
+        else:
+            template = DEFAULT_SIZED_RENDITION_TEMPLATE
+        try:
+            return template.format(
+                stem=input_path.stem, size=self.label, width=size[0], height=size[1], profile=self.profile
+            )
+        except (KeyError, IndexError, ValueError) as e:
+            raise ConversionError(f"Invalid rendition template {template!r}: {e}", ERROR_OPTIONS)
+
+
+def parse_rendition(spec: str) -> Rendition:
+    """
+    "SIZE[:PROFILE[:TEMPLATE]]" 形式の文字列からレンディションを作る
+    
+    SIZE は "full"、一辺の長さ（"1024"）、または "幅x高さ"（"320x240"）。
+    
+    例:
+        parse_rendition("full")
+        parse_rendition("1024:balanced")
+        parse_rendition("256:fast:thumbs/{stem}.png")
+    
+    Raises:
+        ConversionError: 不正な指定の場合
+    """
+    size, _, rest = spec.partition(':')
+    profile, _, template = rest.partition(':')
+    max_size = None
+    if size.lower() != RENDITION_FULL:
+        try:
+            parts = [int(part) for part in size.lower().split('x')]
+        except ValueError:
+            parts = []
+        if len(parts) == 1:
+            parts *= 2
+        if len(parts) != 2 or min(parts) < 1:
+            raise ConversionError(f"Invalid rendition size {size!r} (use full, N or WIDTHxHEIGHT)", ERROR_OPTIONS)
+        max_size = (parts[0], parts[1])
+    rendition = Rendition(max_size, profile or DEFAULT_PROFILE, template or None)
+    get_encode_options(rendition.profile)
+    # テンプレートの誤りは変換を始める前に検出する
+    rendition.output_name(Path("image.webp"), (1, 1))
+    return rendition
+
+
+@dataclass
+class ConversionResult:
+    """1ファイル分の変換結果"""
+    input_path: Path
+    output_path: Optional[Path]
+    status: str
+    error: Optional[str] = None
+    started_at: float = 0.0  # 変換開始時刻（UNIX時間）
+    elapsed: float = 0.0  # 変換にかかった秒数
+    stats: Optional[Dict[str, Any]] = None  # フェーズごとの秒数とバイト数・画素数（計測時のみ）
+    error_class: Optional[str] = None  # 失敗時のエラー分類（ConversionError.reason）
+    output_paths: Optional[List[Path]] = None  # レンディション変換時の全出力（output_path は先頭）
+    
+    @property
+    def ok(self) -> bool:
+        """出力が得られたか（変換成功、または変更がなくスキップした場合）"""
+        return self.status in (STATUS_SUCCESS, STATUS_SKIPPED)
 
 
 def convert_webp_to_png(
     input_path: Path,
     output_path: Optional[Path] = None,
     force: bool = False,
-    preserve_metadata: bool = True
+    preserve_metadata: bool = True,
+    dir_cache: Optional[OutputDirCache] = None,
+    profile: str = DEFAULT_PROFILE,
+    compress_level: Optional[int] = None,
+    mode: str = MODE_AUTO,
+    animation: bool = True,
+    name_allocator: Optional[OutputNameAllocator] = None,
+    atomic: bool = True,
+    durability: str = DURABILITY_NONE,
+    max_size: Optional[Union[int, Tuple[int, int]]] = None,
+    scale: Optional[float] = None,
+    resample: str = DEFAULT_RESAMPLE,
+    encoder: str = ENCODER_AUTO,
+    timer: Optional[PhaseTimer] = None
 ) -> Path:
     """
     WebP画像をPNGに変換する
@@ -30,6 +347,19 @@ def convert_webp_to_png(
         output_path: 出力PNGファイルのパス（Noneの場合は自動生成）
         force: 既存ファイルを上書きするか
         preserve_metadata: メタデータを保持するか
+        dir_cache: 検証済み出力ディレクトリのキャッシュ（バッチ変換時に共有する）
+        profile: PNGエンコードプロファイル（"fast", "balanced", "smallest"）
+        compress_level: zlib圧縮レベル（0-9、指定時はプロファイルの値を上書き）
+        mode: 出力カラーモード（"auto"の場合は透明度があるときのみRGBAにする）
+        animation: アニメーションWebPを全フレームのAPNGとして保存するか（Falseの場合は先頭フレームのみ）
+        name_allocator: 出力ファイル名のアロケータ（バッチ変換時に共有する）
+        atomic: 一時ファイルに書き込んでからリネームするか（中断時に書きかけのPNGを残さない）
+        durability: 永続化ポリシー（"none", "file", "batch"。"batch"の同期は iter_convert が行う）
+        max_size: 出力の最大サイズ（一辺の長さ、または (幅, 高さ)。指定時はアスペクト比を保って縮小する）
+        scale: 縮小率（0より大きく1以下）
+        resample: 縮小時のリサンプリングフィルタ（"nearest", "box", "bilinear", "hamming", "bicubic", "lanczos"）
+        encoder: PNGエンコーダのバックエンド（"auto", "pillow", "zlib", "zlib-ng", "isal", "libdeflate"）
+        timer: フェーズごとの所要時間を記録するタイマー（Noneの場合は計測しない）
         
     Returns:
         実際に保存された出力ファイルのパス
@@ -37,88 +367,853 @@ def convert_webp_to_png(
     Raises:
         ConversionError: 変換に失敗した場合
     """
-    # 入力ファイルの検証
-    is_valid, error_msg = validate_input_file(input_path)
-    if not is_valid:
-        raise ConversionError(error_msg)
+    encode_options = get_encode_options(profile, compress_level)
+    resize_options = get_resize_options(max_size, scale, resample)
+    png_encoder = _get_encoder(encoder, encode_options)
+    _check_durability(durability)
+    if timer is None:
+        timer = NULL_TIMER
+    
+    # 入力ファイルの検証（検証で開いたファイルをそのままデコードに使う）
+    with timer.phase(PHASE_PROBE):
+        input_file, error_msg = open_input_file(input_path)
+    if input_file is None:
+        raise ConversionError(error_msg, ERROR_INPUT)
+    
+    with input_file:
+        if timer.enabled:
+            timer.input_bytes = os.fstat(input_file.fileno()).st_size
+        
+        with timer.phase(PHASE_VALIDATE):
+            # 出力パスの生成
+            if output_path is None:
+                output_path = generate_output_path(input_path)
+            else:
+                output_path = Path(output_path)
+            
+            # 出力ディレクトリの確保
+            try:
+                ensure_output_dir(output_path, dir_cache)
+            except OSError as e:
+                raise ConversionError(f"Cannot create output directory {output_path.parent}: {e}", ERROR_OUTPUT)
+            
+            # 出力パスの検証（既存ファイルとの競合は保存時に番号を付けて解決するため、ここでは上書きを許可する）
+            is_valid, error_msg = validate_output_path(output_path, True, dir_cache)
+        if not is_valid:
+            raise ConversionError(error_msg, ERROR_OUTPUT)
+        
+        try:
+            # WebP画像を読み込み
+            logger.debug(f"Opening WebP file: {input_path}")
+            with timer.phase(PHASE_DECODE):
+                img = _open_webp(input_file)
+            with img:
+                # アニメーションの2フレーム目以降は書き出し時にデコードする
+                with timer.phase(PHASE_DECODE):
+                    img.load()
+                # PNGとして保存（上書きしない場合、完成したファイルだけを空いている名前で公開する）
+                logger.debug(f"Saving PNG file: {output_path}")
+                try:
+                    output_path = _save_png(
+                        img, output_path, encode_options, mode, preserve_metadata, animation,
+                        resize_options, atomic, durability == DURABILITY_FILE, png_encoder, timer,
+                        force, name_allocator
+                    )
+                except OSError as e:
+                    # 書き込みに失敗したディレクトリは次回あらためて検証する
+                    if dir_cache is not None:
+                        dir_cache.invalidate(output_path.parent)
+                    raise ConversionError(f"IO error while processing {input_path}: {e}", ERROR_OUTPUT)
+                logger.info(f"Successfully converted: {input_path} -> {output_path}")
+                
+                return output_path
+                
+        except ConversionError:
+            raise
+        except IOError as e:
+            raise ConversionError(f"IO error while processing {input_path}: {e}", ERROR_DECODE)
+        except Exception as e:
+            raise ConversionError(f"Unexpected error while converting {input_path}: {e}")
+
+
+def convert_renditions(
+    input_path: Path,
+    renditions: Sequence[Rendition],
+    output_dir: Optional[Path] = None,
+    force: bool = False,
+    preserve_metadata: bool = True,
+    dir_cache: Optional[OutputDirCache] = None,
+    compress_level: Optional[int] = None,
+    mode: str = MODE_AUTO,
+    animation: bool = True,
+    name_allocator: Optional[OutputNameAllocator] = None,
+    atomic: bool = True,
+    durability: str = DURABILITY_NONE,
+    resample: str = DEFAULT_RESAMPLE,
+    encoder: str = ENCODER_AUTO,
+    encode_jobs: Optional[int] = None,
+    timer: Optional[PhaseTimer] = None,
+    replace: Sequence[Path] = ()
+) -> List[Path]:
+    """
+    1回のデコードから複数のサイズ・プロファイルのPNGを書き出す
+    
+    縮小は大きいサイズから順に行い、小さいサイズは縮小済みの画像から作る。
+    同じサイズの出力は縮小・モード変換の結果を共有し、エンコードはスレッドで並列に行う。
+    アニメーションWebPはフレームを順に読み直す必要があるため、出力ごとに逐次書き出す。
+    いずれかの出力に失敗した場合は、この呼び出しで公開した出力をすべて削除する（force時を除く）。
     
-    # 出力パスの生成
-    if output_path is None:
-        output_path = generate_output_path(input_path)
+    Args:
+        input_path: 入力WebPファイルのパス
+        renditions: 出力の仕様
+        output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じディレクトリ）
+        force: 既存ファイルを上書きするか
+        preserve_metadata: メタデータを保持するか
+        dir_cache: 検証済み出力ディレクトリのキャッシュ（バッチ変換時に共有する）
+        compress_level: zlib圧縮レベル（0-9、指定時は各プロファイルの値を上書き）
+        mode: 出力カラーモード（"auto"の場合は透明度があるときのみRGBAにする）
+        animation: アニメーションWebPを全フレームのAPNGとして保存するか（Falseの場合は先頭フレームのみ）
+        name_allocator: 出力ファイル名のアロケータ（バッチ変換時に共有する）
+        atomic: 一時ファイルに書き込んでからリネームするか
+        durability: 永続化ポリシー（"none", "file", "batch"。"batch"の同期は iter_convert が行う）
+        resample: 縮小時のリサンプリングフィルタ（"nearest", "box", "bilinear", "hamming", "bicubic", "lanczos"）
+        encoder: PNGエンコーダのバックエンド（"auto", "pillow", "zlib", "zlib-ng", "isal", "libdeflate"）
+        encode_jobs: 並列にエンコードする数（Noneの場合は出力数とCPUコア数の小さい方）
+        timer: フェーズごとの所要時間を記録するタイマー（並列エンコードの時間は合計される）
+        replace: 前回の出力（同じ出力名、またはその番号付きの名前に当たる場合は新しい名前を作らず置き換える）
+        
+    Returns:
+        出力ファイルのパス（renditions と同じ順）
+        
+    Raises:
+        ConversionError: 変換に失敗した場合
+    """
+    plans = _plan_renditions(renditions, compress_level, resample, encoder)
+    _check_durability(durability)
+    if timer is None:
+        timer = NULL_TIMER
+    fsync = durability == DURABILITY_FILE
+    
+    with timer.phase(PHASE_PROBE):
+        input_file, error_msg = open_input_file(input_path)
+    if input_file is None:
+        raise ConversionError(error_msg, ERROR_INPUT)
+    
+    output_paths: List[Path] = []
+    # 出力ごとに既存ファイルを上書きするか（force、または前回の出力を置き換える場合）
+    overwrite: List[bool] = []
+    # 新しく公開した出力（失敗時に削除する。並列エンコードのスレッドから追加される）
+    published: List[Path] = []
+    replaceable = list(replace)
+    with input_file:
+        if timer.enabled:
+            timer.input_bytes = os.fstat(input_file.fileno()).st_size
+        try:
+            try:
+                logger.debug(f"Opening WebP file: {input_path}")
+                with timer.phase(PHASE_DECODE):
+                    img = _open_webp(input_file)
+                with img:
+                    with timer.phase(PHASE_DECODE):
+                        img.load()
+                    sizes = [get_target_size(img.size, resize_options) for _, _, resize_options in plans]
+                    
+                    # 出力パスの検証（既存ファイルとの競合は保存時に番号を付けて解決する）
+                    with timer.phase(PHASE_VALIDATE):
+                        base_dir = output_dir or input_path.parent
+                        for rendition, size in zip(renditions, sizes):
+                            output_path = base_dir / rendition.output_name(input_path, size)
+                            previous = _previous_output_for(output_path, replaceable)
+                            if previous is not None:
+                                replaceable.remove(previous)
+                                output_path = previous
+                            try:
+                                ensure_output_dir(output_path, dir_cache)
+                            except OSError as e:
+                                raise ConversionError(
+                                    f"Cannot create output directory {output_path.parent}: {e}", ERROR_OUTPUT
+                                )
+                            output_paths.append(output_path)
+                            overwrite.append(force or previous is not None)
+                            is_valid, error_msg = validate_output_path(output_path, True, dir_cache)
+                            if not is_valid:
+                                raise ConversionError(error_msg, ERROR_OUTPUT)
+                    
+                    try:
+                        if animation and is_animated(img):
+                            for index, (encode_options, png_encoder, resize_options) in enumerate(plans):
+                                output_paths[index] = _save_png(
+                                    img, output_paths[index], encode_options, mode, preserve_metadata, True,
+                                    resize_options, atomic, fsync, png_encoder, timer, overwrite[index], name_allocator
+                                )
+                                if not overwrite[index]:
+                                    published.append(output_paths[index])
+                        else:
+                            _save_renditions(
+                                img, plans, sizes, output_paths, overwrite, published, mode, preserve_metadata,
+                                RESAMPLE_FILTERS[resample], atomic, fsync, encode_jobs, timer, name_allocator
+                            )
+                    except OSError as e:
+                        if dir_cache is not None:
+                            for output_path in output_paths:
+                                dir_cache.invalidate(output_path.parent)
+                        raise ConversionError(f"IO error while processing {input_path}: {e}", ERROR_OUTPUT)
+            except ConversionError:
+                raise
+            except IOError as e:
+                raise ConversionError(f"IO error while processing {input_path}: {e}", ERROR_DECODE)
+            except Exception as e:
+                raise ConversionError(f"Unexpected error while converting {input_path}: {e}")
+        except BaseException:
+            # 一部の出力だけが残らないよう、新しく公開した出力をすべて削除する
+            for output_path in published:
+                release_output_path(output_path, name_allocator)
+            raise
+    
+    logger.info(f"Successfully converted: {input_path} -> {', '.join(str(path) for path in output_paths)}")
+    return output_paths
+
+
+def _plan_renditions(
+    renditions: Sequence[Rendition],
+    compress_level: Optional[int],
+    resample: str,
+    encoder: str
+) -> List[Tuple[Dict[str, Any], PngEncoder, Optional[Dict[str, Any]]]]:
+    """レンディションごとのエンコードオプション・エンコーダ・縮小オプションを検証して返す"""
+    if not renditions:
+        raise ConversionError("At least one rendition is required", ERROR_OPTIONS)
+    plans = []
+    for rendition in renditions:
+        encode_options = get_encode_options(rendition.profile, compress_level)
+        resize_options = get_resize_options(rendition.max_size, None, resample)
+        plans.append((encode_options, _get_encoder(encoder, encode_options), resize_options))
+    return plans
+
+
+def _save_renditions(
+    img: Image.Image,
+    plans: List[Tuple[Dict[str, Any], PngEncoder, Optional[Dict[str, Any]]]],
+    sizes: List[Tuple[int, int]],
+    output_paths: List[Path],
+    overwrite: List[bool],
+    published: List[Path],
+    mode: str,
+    preserve_metadata: bool,
+    resample: Image.Resampling,
+    atomic: bool,
+    fsync: bool,
+    encode_jobs: Optional[int],
+    timer: PhaseTimer,
+    name_allocator: Optional[OutputNameAllocator] = None
+) -> None:
+    """
+    静止画を縮小・モード変換を共有しながら各サイズに書き出す
+    
+    output_paths は実際に保存したパスに置き換え、新しく作成した出力を保存した順に published に追加する。
+    """
+    timer.pixels = img.size[0] * img.size[1]
+    
+    # 大きいサイズから順に、目標以上で最も小さい縮小済みの画像から縮小する
+    with timer.phase(PHASE_CONVERT):
+        resized = {img.size: img}
+        for size in sorted(set(sizes), key=lambda s: s[0] * s[1], reverse=True):
+            if size in resized:
+                continue
+            source = min(
+                (image for image_size, image in resized.items() if image_size[0] >= size[0] and image_size[1] >= size[1]),
+                key=lambda image: image.size[0] * image.size[1]
+            )
+            resized[size] = _resize_image(source, size, resample)
+        prepared = {size: _prepare_image(resized[size], mode, preserve_metadata) for size in set(sizes)}
+        del resized
+    
+    tasks = []
+    used = set()
+    for index, ((encode_options, png_encoder, _), size) in enumerate(zip(plans, sizes)):
+        image = prepared[size]
+        # 保存時に画像の encoderinfo が書き換わるため、同じ画像を並列に保存しない
+        if size in used:
+            image = image.copy()
+        used.add(size)
+        tasks.append((image, index, encode_options, png_encoder))
+    del prepared
+    
+    def save(image: Image.Image, index: int, encode_options: Dict[str, Any], png_encoder: PngEncoder,
+             task_timer: PhaseTimer) -> None:
+        # モード変換は済んでいるため、画像のモードをそのまま指定する
+        output_paths[index] = _save_png(
+            image, output_paths[index], encode_options, image.mode, preserve_metadata, False,
+            None, atomic, fsync, png_encoder, task_timer, overwrite[index], name_allocator
+        )
+        if not overwrite[index]:
+            published.append(output_paths[index])
+    
+    # PhaseTimerはスレッド間で共有できないため、出力ごとに計測して合算する
+    task_timers = [PhaseTimer() if timer.enabled else NULL_TIMER for _ in tasks]
+    workers = min(len(tasks), encode_jobs or default_jobs())
+    if workers <= 1:
+        for task, task_timer in zip(tasks, task_timers):
+            save(*task, task_timer)
     else:
-        output_path = Path(output_path)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(save, *task, task_timer) for task, task_timer in zip(tasks, task_timers)]
+            for future in futures:
+                future.result()
+    for task_timer in task_timers:
+        timer.merge(task_timer)
+
+
+def convert_bytes(
+    data: Union[bytes, bytearray, memoryview],
+    preserve_metadata: bool = True,
+    profile: str = DEFAULT_PROFILE,
+    compress_level: Optional[int] = None,
+    mode: str = MODE_AUTO,
+    animation: bool = True,
+    max_size: Optional[Union[int, Tuple[int, int]]] = None,
+    scale: Optional[float] = None,
+    resample: str = DEFAULT_RESAMPLE,
+    encoder: str = ENCODER_AUTO,
+    timer: Optional[PhaseTimer] = None
+) -> bytes:
+    """
+    メモリ上のWebPデータをPNGデータに変換する（一時ファイルを使わない）
     
-    # 出力ディレクトリの確保
-    ensure_output_dir(output_path)
+    Args:
+        data: WebPデータ
+        preserve_metadata: メタデータを保持するか
+        profile: PNGエンコードプロファイル（"fast", "balanced", "smallest"）
+        compress_level: zlib圧縮レベル（0-9、指定時はプロファイルの値を上書き）
+        mode: 出力カラーモード（"auto"の場合は透明度があるときのみRGBAにする）
+        animation: アニメーションWebPを全フレームのAPNGとして保存するか（Falseの場合は先頭フレームのみ）
+        max_size: 出力の最大サイズ（一辺の長さ、または (幅, 高さ)。指定時はアスペクト比を保って縮小する）
+        scale: 縮小率（0より大きく1以下）
+        resample: 縮小時のリサンプリングフィルタ（"nearest", "box", "bilinear", "hamming", "bicubic", "lanczos"）
+        encoder: PNGエンコーダのバックエンド（"auto", "pillow", "zlib", "zlib-ng", "isal", "libdeflate"）
+        timer: フェーズごとの所要時間を記録するタイマー（Noneの場合は計測しない）
+        
+    Returns:
+        PNGデータ
+        
+    Raises:
+        ConversionError: 変換に失敗した場合
+    """
+    output = io.BytesIO()
+    resize_options = get_resize_options(max_size, scale, resample)
+    _convert_buffer(
+        data, output, preserve_metadata, profile, compress_level, mode, animation, resize_options, encoder, timer
+    )
+    return output.getvalue()
+
+
+def convert_fileobj(
+    input_file: BinaryIO,
+    output_file: BinaryIO,
+    preserve_metadata: bool = True,
+    profile: str = DEFAULT_PROFILE,
+    compress_level: Optional[int] = None,
+    mode: str = MODE_AUTO,
+    animation: bool = True,
+    max_size: Optional[Union[int, Tuple[int, int]]] = None,
+    scale: Optional[float] = None,
+    resample: str = DEFAULT_RESAMPLE,
+    encoder: str = ENCODER_AUTO,
+    timer: Optional[PhaseTimer] = None
+) -> None:
+    """
+    ファイルオブジェクトから読み込んだWebPデータをPNGとして書き出す
+    
+    入力はサイズ上限までしか読み込まないため、上限を超えるストリームも安全に拒否できる。
     
-    # ファイル競合の処理
-    output_path = handle_file_conflict(output_path, force)
+    Args:
+        input_file: WebPデータを読み込むバイナリファイルオブジェクト
+        output_file: PNGデータを書き込むバイナリファイルオブジェクト
+        preserve_metadata: メタデータを保持するか
+        profile: PNGエンコードプロファイル（"fast", "balanced", "smallest"）
+        compress_level: zlib圧縮レベル（0-9、指定時はプロファイルの値を上書き）
+        mode: 出力カラーモード（"auto"の場合は透明度があるときのみRGBAにする）
+        animation: アニメーションWebPを全フレームのAPNGとして保存するか（Falseの場合は先頭フレームのみ）
+        max_size: 出力の最大サイズ（一辺の長さ、または (幅, 高さ)。指定時はアスペクト比を保って縮小する）
+        scale: 縮小率（0より大きく1以下）
+        resample: 縮小時のリサンプリングフィルタ（"nearest", "box", "bilinear", "hamming", "bicubic", "lanczos"）
+        encoder: PNGエンコーダのバックエンド（"auto", "pillow", "zlib", "zlib-ng", "isal", "libdeflate"）
+        timer: フェーズごとの所要時間を記録するタイマー（Noneの場合は計測しない）
+        
+    Raises:
+        ConversionError: 変換に失敗した場合
+    """
+    resize_options = get_resize_options(max_size, scale, resample)
+    data = input_file.read(MAX_FILE_SIZE + 1)
+    _convert_buffer(
+        data, output_file, preserve_metadata, profile, compress_level, mode, animation, resize_options, encoder, timer
+    )
+
+
+def _convert_buffer(
+    data: Union[bytes, bytearray, memoryview],
+    output_file: BinaryIO,
+    preserve_metadata: bool,
+    profile: str,
+    compress_level: Optional[int],
+    mode: str,
+    animation: bool,
+    resize_options: Optional[Dict[str, Any]] = None,
+    encoder: str = ENCODER_AUTO,
+    timer: Optional[PhaseTimer] = None
+) -> None:
+    """メモリ上のWebPデータを検証・変換し、出力先に書き込む"""
+    encode_options = get_encode_options(profile, compress_level)
+    png_encoder = _get_encoder(encoder, encode_options)
+    if timer is None:
+        timer = NULL_TIMER
     
-    # 出力パスの検証
-    is_valid, error_msg = validate_output_path(output_path, force)
+    # 入力データの検証（ファイルと同じ基準）
+    with timer.phase(PHASE_PROBE):
+        is_valid, error_msg = validate_input_bytes(data)
     if not is_valid:
-        raise ConversionError(error_msg)
+        raise ConversionError(error_msg, ERROR_INPUT)
+    timer.input_bytes = len(data)
     
     try:
-        # WebP画像を読み込み
-        logger.debug(f"Opening WebP file: {input_path}")
-        with Image.open(input_path) as img:
-            # 画像形式を確認
-            if img.format != 'WEBP':
-                raise ConversionError(f"Image format is not WebP: {img.format}")
-            
-            # RGBAモードに変換（透明度を保持）
-            if img.mode != 'RGBA':
-                logger.debug(f"Converting mode from {img.mode} to RGBA")
-                img = img.convert('RGBA')
-            
-            # メタデータを取得（EXIF等）
-            metadata = {}
-            if preserve_metadata:
-                # EXIFデータがある場合は保持
-                if hasattr(img, '_getexif') and img._getexif():
-                    metadata['exif'] = img._getexif()
-                # その他のメタデータ
-                if hasattr(img, 'info'):
-                    # PNG形式では保持できない一部の情報を除外
-                    for key in ['icc_profile', 'webp', 'compression']:
-                        if key in img.info:
-                            metadata[key] = img.info[key]
-            
-            # PNGとして保存
-            logger.debug(f"Saving PNG file: {output_path}")
-            save_kwargs = {
-                'format': 'PNG',
-                'optimize': True,
-            }
-            
-            # メタデータがある場合は追加
-            if metadata:
-                # PNG形式ではexifは直接保存できないため、infoに追加
-                if 'exif' in metadata:
-                    try:
-                        # PillowのPNG形式ではEXIFは限定的にサポート
-                        # 可能な場合はinfoに追加
-                        pass  # EXIFのPNG保存は複雑なため、ここでは省略
-                    except Exception as e:
-                        logger.warning(f"Could not preserve EXIF data: {e}")
-            
-            img.save(output_path, **save_kwargs)
-            logger.info(f"Successfully converted: {input_path} -> {output_path}")
-            
-            return output_path
-            
+        with timer.phase(PHASE_DECODE):
+            img = _open_webp(io.BytesIO(data))
+        with img:
+            with timer.phase(PHASE_DECODE):
+                img.load()
+            _write_png(
+                img, output_file, encode_options, mode, preserve_metadata, animation, resize_options, png_encoder, timer
+            )
+            logger.debug(f"Converted {len(data)} bytes of WebP data")
+    except ConversionError:
+        raise
     except IOError as e:
-        raise ConversionError(f"IO error while processing {input_path}: {e}")
+        raise ConversionError(f"IO error while processing WebP data: {e}", ERROR_DECODE)
     except Exception as e:
-        raise ConversionError(f"Unexpected error while converting {input_path}: {e}")
+        raise ConversionError(f"Unexpected error while converting WebP data: {e}")
+
+
+def _open_webp(input_file: BinaryIO) -> Image.Image:
+    """WebP画像を開く（WebP以外の形式は受け付けない）"""
+    img = Image.open(input_file, formats=['WEBP'])
+    # 画像形式を確認
+    if img.format != 'WEBP':
+        img.close()
+        raise ConversionError(f"Image format is not WebP: {img.format}", ERROR_INPUT)
+    return img
+
+
+def _write_png(
+    img: Image.Image,
+    output: BinaryIO,
+    encode_options: Dict[str, Any],
+    mode: str,
+    preserve_metadata: bool,
+    animation: bool,
+    resize_options: Optional[Dict[str, Any]] = None,
+    png_encoder: Optional[PngEncoder] = None,
+    timer: PhaseTimer = NULL_TIMER
+) -> None:
+    """デコードした画像をPNG（アニメーションの場合はAPNG）として書き出す"""
+    if png_encoder is None:
+        png_encoder = get_encoder(ENCODER_AUTO, encode_options)
+    target_size = get_target_size(img.size, resize_options)
+    if animation and is_animated(img):
+        # アニメーションはフレームごとに書き出すため、全フレームをメモリに展開しない
+        if mode == MODE_AUTO:
+            target_mode = img.mode if img.mode in ANIMATION_MODES else 'RGBA'
+        else:
+            target_mode = select_output_mode(img, mode)
+        logger.debug(f"Writing {img.n_frames} frames as APNG")
+        timer.pixels = img.size[0] * img.size[1] * img.n_frames
+        apng_options: Dict[str, Any] = {}
+        if target_size != img.size:
+            apng_options = {
+                'size': target_size,
+                'resample': resize_options['resample'],
+                'reducing_gap': REDUCING_GAP,
+            }
+        save_apng(
+            img, timer.wrap_writer(output), encode_options, target_mode, timer=timer, encoder=png_encoder, **apng_options
+        )
+        return
+    
+    timer.pixels = img.size[0] * img.size[1]
+    with timer.phase(PHASE_CONVERT):
+        if target_size != img.size:
+            # モード変換より前に縮小し、以降の処理を小さい画像で行う
+            img = _resize_image(img, target_size, resize_options['resample'])
+        img = _prepare_image(img, mode, preserve_metadata)
+    with timer.phase(PHASE_ENCODE):
+        png_encoder.save(img, timer.wrap_writer(output), encode_options)
+
+
+def _resize_image(img: Image.Image, size: Tuple[int, int], resample: Image.Resampling) -> Image.Image:
+    """
+    画像を縮小する
+    
+    WebPプラグインは draft() によるデコード時の縮小に対応していないため、
+    デコード直後に reduce() で整数分の1に縮小してから目標サイズにリサンプリングする。
+    """
+    logger.debug(f"Resizing from {img.size[0]}x{img.size[1]} to {size[0]}x{size[1]}")
+    return img.resize(size, resample, reducing_gap=REDUCING_GAP)
+
+
+def _save_png(
+    img: Image.Image,
+    output_path: Path,
+    encode_options: Dict[str, Any],
+    mode: str,
+    preserve_metadata: bool,
+    animation: bool,
+    resize_options: Optional[Dict[str, Any]],
+    atomic: bool,
+    fsync: bool,
+    png_encoder: Optional[PngEncoder] = None,
+    timer: PhaseTimer = NULL_TIMER,
+    force: bool = True,
+    name_allocator: Optional[OutputNameAllocator] = None
+) -> Path:
+    """
+    PNGをファイルに保存し、保存したパスを返す（atomicの場合は一時ファイル経由）
+    
+    上書きしない場合は既存のファイルを置き換えず、番号を付与した名前で保存する。
+    """
+    if atomic:
+        # 一時ファイルの作成・公開・fsyncも書き込み時間に含める
+        writer = atomic_write(output_path, fsync, force, name_allocator)
+        with timer.phase(PHASE_WRITE), writer as f:
+            _write_png(img, f, encode_options, mode, preserve_metadata, animation, resize_options, png_encoder, timer)
+        return writer.path
+    
+    with timer.phase(PHASE_WRITE):
+        f, output_path = open_output(output_path, force, name_allocator)
+    try:
+        with f:
+            _write_png(img, f, encode_options, mode, preserve_metadata, animation, resize_options, png_encoder, timer)
+            if fsync:
+                with timer.phase(PHASE_WRITE):
+                    f.flush()
+                    os.fsync(f.fileno())
+    except BaseException:
+        # 作成したファイルに書きかけの内容を残さない（上書きした既存ファイルは元に戻せないため残す）
+        if not force:
+            release_output_path(output_path, name_allocator)
+        raise
+    if fsync:
+        with timer.phase(PHASE_WRITE):
+            fsync_directory(output_path.parent)
+    return output_path
+
+
+def _prepare_image(img: Image.Image, mode: str, preserve_metadata: bool) -> Image.Image:
+    """デコードした画像をPNG保存用に整える"""
+    # 出力モードに変換（透明度がある場合のみアルファを保持）
+    target_mode = select_output_mode(img, mode)
+    if img.mode != target_mode:
+        logger.debug(f"Converting mode from {img.mode} to {target_mode}")
+        img = img.convert(target_mode)
+    
+    # メタデータを取得（EXIF等）
+    metadata = {}
+    if preserve_metadata:
+        # EXIFデータがある場合は保持
+        if hasattr(img, '_getexif') and img._getexif():
+            metadata['exif'] = img._getexif()
+        # その他のメタデータ
+        if hasattr(img, 'info'):
+            # PNG形式では保持できない一部の情報を除外
+            for key in ['icc_profile', 'webp', 'compression']:
+                if key in img.info:
+                    metadata[key] = img.info[key]
+    
+    # メタデータがある場合は追加
+    if metadata:
+        # PNG形式ではexifは直接保存できないため、infoに追加
+        if 'exif' in metadata:
+            try:
+                # PillowのPNG形式ではEXIFは限定的にサポート
+                # 可能な場合はinfoに追加
+                pass  # EXIFのPNG保存は複雑なため、ここでは省略
+            except Exception as e:
+                logger.warning(f"Could not preserve EXIF data: {e}")
+    
+    return img
+
+
+def _validate_convert_options(convert_options: Dict[str, Any]) -> None:
+    """バッチ変換に渡された変換オプションを検証する"""
+    if 'renditions' in convert_options:
+        _plan_renditions(
+            convert_options['renditions'],
+            convert_options.get('compress_level'),
+            convert_options.get('resample', DEFAULT_RESAMPLE),
+            convert_options.get('encoder', ENCODER_AUTO)
+        )
+    else:
+        encode_options = get_encode_options(
+            convert_options.get('profile', DEFAULT_PROFILE),
+            convert_options.get('compress_level')
+        )
+        _get_encoder(convert_options.get('encoder', ENCODER_AUTO), encode_options)
+        get_resize_options(
+            convert_options.get('max_size'),
+            convert_options.get('scale'),
+            convert_options.get('resample', DEFAULT_RESAMPLE)
+        )
+    mode = convert_options.get('mode', MODE_AUTO)
+    if mode not in OUTPUT_MODES:
+        raise ConversionError(f"Unknown output mode: {mode} (choose from {', '.join(OUTPUT_MODES)})", ERROR_OPTIONS)
+    _check_durability(convert_options.get('durability', DURABILITY_NONE))
+
+
+def _get_encoder(encoder: str, encode_options: Dict[str, Any]) -> PngEncoder:
+    """エンコーダのバックエンドを選ぶ"""
+    try:
+        return get_encoder(encoder, encode_options)
+    except ValueError as e:
+        raise ConversionError(str(e), ERROR_OPTIONS)
+
+
+def _check_durability(durability: str) -> None:
+    """永続化ポリシーを検証する"""
+    if durability not in DURABILITY_CHOICES:
+        raise ConversionError(
+            f"Unknown durability: {durability} (choose from {', '.join(DURABILITY_CHOICES)})",
+            ERROR_OPTIONS
+        )
+
+
+# プロセスワーカー内で共有する出力ディレクトリキャッシュとファイル名アロケータ（プールの寿命＝バッチの寿命）
+_worker_dir_cache: Optional[OutputDirCache] = None
+_worker_name_allocator: Optional[OutputNameAllocator] = None
+
+
+def _init_process_worker() -> None:
+    """プロセスワーカーの初期化"""
+    global _worker_dir_cache, _worker_name_allocator
+    _worker_dir_cache = OutputDirCache()
+    _worker_name_allocator = OutputNameAllocator()
+
+
+def default_jobs() -> int:
+    """デフォルトの並列数（CPUコア数）を返す"""
+    return os.cpu_count() or 1
+
+
+def _create_executor(jobs: int, executor: str) -> Executor:
+    """並列実行用のExecutorを生成する"""
+    if executor not in EXECUTOR_CHOICES:
+        raise ValueError(f"Unknown executor: {executor} (choose from {', '.join(EXECUTOR_CHOICES)})")
+    if executor == EXECUTOR_PROCESS:
+        return ProcessPoolExecutor(max_workers=jobs, initializer=_init_process_worker)
+    # autoはGILを解放するPillowの処理に合わせてスレッドを選ぶ
+    return ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="webp2png")
+
+
+# 一時停止中に投入済みの変換の完了と再開を待つ間隔（秒）
+PAUSE_POLL_INTERVAL = 0.1
+
+
+def _paused_inputs(inputs: Iterable[Path], running: Optional[threading.Event]) -> Iterator[Path]:
+    """逐次実行用: 一時停止中は次の入力を取り出さずに待つ"""
+    input_iter = iter(inputs)
+    while True:
+        if running is not None:
+            running.wait()
+        try:
+            yield next(input_iter)
+        except StopIteration:
+            return
+
+
+def iter_convert(
+    inputs: Iterable[Path],
+    output_dir: Optional[Path] = None,
+    force: bool = False,
+    preserve_metadata: bool = True,
+    jobs: Optional[int] = 1,
+    executor: str = EXECUTOR_AUTO,
+    max_in_flight: Optional[int] = None,
+    manifest: Optional[Manifest] = None,
+    collect_timings: bool = False,
+    metrics: Optional[Metrics] = None,
+    running: Optional[threading.Event] = None,
+    **convert_options: Any
+) -> Iterator[ConversionResult]:
+    """
+    WebPファイルを順次変換し、完了したものから結果をyieldする
+    
+    inputsは遅延イテラブルでもよく、同時に処理中となるファイル数は
+    max_in_flightで制限されるため、入力全体をメモリに展開しない。
+    
+    Args:
+        inputs: 入力WebPファイルのパスのイテラブル
+        output_dir: 出力ディレクトリ（Noneの場合は各入力ファイルと同じディレクトリ）
+        force: 既存ファイルを上書きするか
+        preserve_metadata: メタデータを保持するか
+        jobs: 並列数（Noneの場合はCPUコア数、1の場合は逐次実行）
+        executor: 並列実行モード（"auto", "thread", "process"）
+        max_in_flight: 同時に投入する最大ファイル数（Noneの場合はjobsの2倍）
+        manifest: 増分変換用のマニフェスト（指定時は変更のない入力をデコードせずにスキップする）
+        collect_timings: フェーズごとの所要時間を計測し、結果の stats に格納するか
+        metrics: 結果・バイト数・レイテンシ・実行中の件数を記録するレジストリ（指定時は計測も有効になる）
+        running: 一時停止用のイベント（クリアされている間は新しい入力を取り出さず、投入済みの変換の結果だけをyieldする）
+        **convert_options: convert_webp_to_png に渡す追加オプション（profile, compress_level, durability など）
+        
+    Yields:
+        完了順の変換結果（durability="batch" の場合、同期は全件の完了後に行う）
+    """
+    if jobs is None:
+        jobs = default_jobs()
+    if jobs < 1:
+        raise ValueError(f"jobs must be >= 1: {jobs}")
+    if max_in_flight is None:
+        max_in_flight = jobs * 2
+    max_in_flight = max(max_in_flight, jobs)
+    
+    # 不正なオプションはワーカーに投入する前に検出する
+    _validate_convert_options(convert_options)
+    
+    # 出力ディレクトリの作成・書き込み確認と走査はバッチ内で1ディレクトリ1回に抑える
+    # （プロセスワーカーはキャッシュを共有できないため、ワーカーごとのキャッシュを使う）
+    if executor != EXECUTOR_PROCESS or jobs == 1:
+        dir_cache: Optional[OutputDirCache] = OutputDirCache()
+        name_allocator: Optional[OutputNameAllocator] = OutputNameAllocator()
+    else:
+        dir_cache = name_allocator = None
+    
+    # batchの場合は書き込み中にfsyncせず、バッチ終了時に書き込んだファイルとディレクトリをまとめて同期する
+    sync_at_end = convert_options.get('durability') == DURABILITY_BATCH
+    written_files: List[Path] = []
+    
+    # 変換オプションを変えた場合は変更のない入力も変換し直す
+    manifest_options = options_key(convert_options, preserve_metadata) if manifest is not None else None
+    
+    # メトリクスのレイテンシとバイト数はフェーズ計測の結果から得る
+    if metrics is not None:
+        collect_timings = True
+    # このバッチがゲージに加算している値（同じレジストリを複数のバッチで共有できるよう差分で更新する）
+    reported = [0, 0]
+    
+    def track(running: int, queued: int) -> None:
+        if metrics is None:
+            return
+        metrics.add_in_flight(running - reported[0])
+        metrics.add_queued(queued - reported[1])
+        reported[:] = [running, queued]
+    
+    def sync_written() -> None:
+        if written_files:
+            logger.debug(f"Syncing {len(written_files)} output files")
+            sync_files(written_files)
+            written_files.clear()
+    
+    def completed(result: ConversionResult) -> ConversionResult:
+        if metrics is not None:
+            metrics.observe_result(result)
+        if sync_at_end and result.status == STATUS_SUCCESS:
+            written_files.extend(result.output_paths or [result.output_path])
+        if manifest is not None and result.status == STATUS_SUCCESS:
+            try:
+                manifest.record(result.input_path, result.output_path, manifest_options, result.output_paths)
+            except OSError as e:
+                logger.warning(f"Could not record {result.input_path} in manifest: {e}")
+        return result
+    
+    def previous_outputs(input_path: Path) -> List[Path]:
+        # 記録のある入力の再変換では前回の出力を置き換える
+        if manifest is None or force:
+            return []
+        return manifest.previous_outputs(input_path)
+    
+    def skipped(input_path: Path) -> Optional[ConversionResult]:
+        if manifest is None:
+            return None
+        previous = manifest.lookup(input_path, manifest_options)
+        if previous is None:
+            return None
+        logger.debug(f"Skipping unchanged file: {input_path}")
+        if metrics is not None:
+            metrics.record(STATUS_SKIPPED)
+        return ConversionResult(input_path=input_path, output_path=previous, status=STATUS_SKIPPED)
+    
+    if jobs == 1:
+        try:
+            for input_path in _paused_inputs(inputs, running):
+                input_path = Path(input_path)
+                result = skipped(input_path)
+                if result is None:
+                    track(1, 0)
+                    result = _convert_one(
+                        input_path, output_dir, force, preserve_metadata, dir_cache, convert_options, name_allocator,
+                        collect_timings, previous_outputs(input_path)
+                    )
+                    track(0, 0)
+                    result = completed(result)
+                yield result
+        finally:
+            track(0, 0)
+            sync_written()
+        return
+    
+    pool = _create_executor(jobs, executor)
+    pending: Set[Future] = set()
+    input_iter = iter(inputs)
+    try:
+        while True:
+            if running is not None and not running.is_set() and pending:
+                # 一時停止中は新しい入力を取り出さず、投入済みの変換の結果だけを返す
+                done, pending = wait(pending, timeout=PAUSE_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                track(min(len(pending), jobs), max(len(pending) - jobs, 0))
+                for future in done:
+                    yield completed(future.result())
+                continue
+            if running is not None:
+                running.wait()
+            try:
+                input_path = Path(next(input_iter))
+            except StopIteration:
+                break
+            result = skipped(input_path)
+            if result is not None:
+                yield result
+                continue
+            
+            pending.add(pool.submit(
+                _convert_one,
+                input_path, output_dir, force, preserve_metadata, dir_cache, convert_options, name_allocator,
+                collect_timings, previous_outputs(input_path)
+            ))
+            track(min(len(pending), jobs), max(len(pending) - jobs, 0))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                track(min(len(pending), jobs), max(len(pending) - jobs, 0))
+                for future in done:
+                    yield completed(future.result())
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            track(min(len(pending), jobs), max(len(pending) - jobs, 0))
+            for future in done:
+                yield completed(future.result())
+    finally:
+        # 途中で打ち切られた場合は未着手のタスクを破棄する
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        track(0, 0)
+        sync_written()
 
 
 def convert_multiple_files(
-    input_paths: list[Path],
+    input_paths: List[Path],
     output_dir: Optional[Path] = None,
     force: bool = False,
-    preserve_metadata: bool = True
+    preserve_metadata: bool = True,
+    jobs: Optional[int] = 1,
+    executor: str = EXECUTOR_AUTO,
+    progress_callback: Optional[Callable[[Path, Optional[Path]], None]] = None,
+    **convert_options: Any
 ) -> Dict[Path, Optional[Path]]:
     """
     複数のWebPファイルをPNGに変換する
@@ -128,30 +1223,117 @@ def convert_multiple_files(
         output_dir: 出力ディレクトリ（Noneの場合は各入力ファイルと同じディレクトリ）
         force: 既存ファイルを上書きするか
         preserve_metadata: メタデータを保持するか
+        jobs: 並列数（Noneの場合はCPUコア数、1の場合は逐次実行）
+        executor: 並列実行モード（"auto", "thread", "process"）
+        progress_callback: 1ファイル完了ごとに完了順で呼ばれるコールバック（入力パス, 出力パス or None）
+        **convert_options: iter_convert / convert_webp_to_png に渡す追加オプション（manifest, profile など）
         
     Returns:
         変換結果の辞書 {入力パス: 出力パス or None（失敗時）}
     """
-    results = {}
+    # 結果の順序は入力順を維持する
+    results: Dict[Path, Optional[Path]] = {Path(input_path): None for input_path in input_paths}
     
-    for input_path in input_paths:
-        try:
+    for result in iter_convert(
+        results,
+        output_dir=output_dir,
+        force=force,
+        preserve_metadata=preserve_metadata,
+        jobs=jobs,
+        executor=executor,
+        **convert_options
+    ):
+        results[result.input_path] = result.output_path
+        if progress_callback is not None:
+            progress_callback(result.input_path, result.output_path)
+    
+    return results
+
+
+def _previous_output_for(output_path: Path, previous_outputs: Sequence[Path]) -> Optional[Path]:
+    """前回の出力のうち、出力パスと同じ名前、またはその番号付きの名前（_1 など）のものを返す"""
+    if not previous_outputs:
+        return None
+    directory = os.path.abspath(output_path.parent)
+    pattern = re.compile(re.escape(output_path.stem) + r"(?:_\d+)?" + re.escape(output_path.suffix))
+    for previous in previous_outputs:
+        if os.path.abspath(previous.parent) == directory and pattern.fullmatch(previous.name):
+            return previous
+    return None
+
+
+def _convert_one(
+    input_path: Path,
+    output_dir: Optional[Path],
+    force: bool,
+    preserve_metadata: bool,
+    dir_cache: Optional[OutputDirCache] = None,
+    convert_options: Optional[Dict[str, Any]] = None,
+    name_allocator: Optional[OutputNameAllocator] = None,
+    collect_timings: bool = False,
+    previous_outputs: Sequence[Path] = ()
+) -> ConversionResult:
+    """1ファイルを変換する（ワーカー用。失敗は結果として返す。previous_outputs に当たる出力は置き換える）"""
+    if dir_cache is None:
+        dir_cache = _worker_dir_cache
+    if name_allocator is None:
+        name_allocator = _worker_name_allocator
+    timer = PhaseTimer() if collect_timings else None
+    started_at = time.time()
+    start = time.perf_counter()
+    options = dict(convert_options or {})
+    renditions = options.pop('renditions', None)
+    output_paths = None
+    try:
+        if renditions:
+            # 1回のデコードから複数の出力を作る
+            output_paths = convert_renditions(
+                input_path,
+                renditions,
+                output_dir=output_dir,
+                force=force,
+                preserve_metadata=preserve_metadata,
+                dir_cache=dir_cache,
+                name_allocator=name_allocator,
+                timer=timer,
+                replace=previous_outputs,
+                **options
+            )
+            result_path = output_paths[0]
+        else:
             # output_dirが指定されている場合は、そこに出力パスを生成
-            if output_dir:
-                output_path = generate_output_path(input_path, output_dir)
-            else:
-                output_path = None  # Noneの場合は自動生成される
+            output_path = generate_output_path(input_path, output_dir)
+            # 更新された入力は番号付きの新しい名前を作らず、前回の出力を置き換える
+            previous = _previous_output_for(output_path, previous_outputs)
             
             result_path = convert_webp_to_png(
                 input_path,
-                output_path=output_path,
-                force=force,
-                preserve_metadata=preserve_metadata
+                output_path=previous or output_path,
+                force=force or previous is not None,
+                preserve_metadata=preserve_metadata,
+                dir_cache=dir_cache,
+                name_allocator=name_allocator,
+                timer=timer,
+                **options
             )
-            results[input_path] = result_path
-        except ConversionError as e:
-            logger.error(f"Conversion failed for {input_path}: {e}")
-            results[input_path] = None
-    
-    return results
-
+        return ConversionResult(
+            input_path=input_path,
+            output_path=result_path,
+            status=STATUS_SUCCESS,
+            started_at=started_at,
+            elapsed=time.perf_counter() - start,
+            stats=timer.as_dict() if timer else None,
+            output_paths=output_paths
+        )
+    except ConversionError as e:
+        logger.error(f"Conversion failed for {input_path}: {e}")
+        return ConversionResult(
+            input_path=input_path,
+            output_path=None,
+            status=STATUS_FAILED,
+            error=str(e),
+            error_class=e.reason,
+            started_at=started_at,
+            elapsed=time.perf_counter() - start,
+            stats=timer.as_dict() if timer else None
+        )
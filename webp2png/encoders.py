@@ -0,0 +1,208 @@
+"""Pluggable PNG encoder backends for webp2png."""
+import io
+import logging
+import struct
+import zlib
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from .constants import (
+    ENCODER_AUTO,
+    ENCODER_CHOICES,
+    ENCODER_ISAL,
+    ENCODER_LIBDEFLATE,
+    ENCODER_PILLOW,
+    ENCODER_ZLIB,
+    ENCODER_ZLIB_NG,
+)
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# auto で外部のdeflate実装に切り替える最小の圧縮レベル
+# （フィルタ済みデータを作り直す分のコストがあるため、低いレベルではPillowの1パスの方が速い）
+AUTO_MIN_LEVEL = 9
+# auto で優先する順（圧縮率がPillowと同等以上のもの）
+AUTO_PREFERENCE = (ENCODER_LIBDEFLATE, ENCODER_ZLIB_NG)
+
+# 圧縮し直したIDATを分割する大きさ
+IDAT_CHUNK_SIZE = 1024 * 1024
+
+# 圧縮し直す場合にPillowへ渡さないオプション
+_DEFLATE_OPTIONS = ('compress_level', 'compress_type', 'optimize')
+
+
+def write_chunk(fp: BinaryIO, chunk_type: bytes, data: bytes) -> None:
+    """PNGチャンクを書き込む"""
+    fp.write(struct.pack('>I', len(data)))
+    fp.write(chunk_type)
+    fp.write(data)
+    fp.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+
+def iter_chunks(png_data: bytes) -> Iterator[Tuple[bytes, bytes]]:
+    """PNGデータからチャンク（種別, データ）を順に取り出す"""
+    pos = len(PNG_SIGNATURE)
+    while pos < len(png_data):
+        length, = struct.unpack('>I', png_data[pos:pos + 4])
+        chunk_type = png_data[pos + 4:pos + 8]
+        yield chunk_type, png_data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+
+class PngEncoder:
+    """PillowでPNGを書き出すエンコーダ（全バックエンドの基底クラス）"""
+
+    name = ENCODER_PILLOW
+
+    def save(self, img: Image.Image, output: BinaryIO, encode_options: Dict[str, Any]) -> None:
+        """
+        画像をPNGとして書き出す
+
+        Args:
+            img: 保存する画像
+            output: 書き込み先のバイナリファイルオブジェクト
+            encode_options: PNGエンコードオプション（get_encode_options の戻り値）
+        """
+        img.save(output, format='PNG', **encode_options)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class DeflateEncoder(PngEncoder):
+    """
+    IDATを別のdeflate実装で圧縮するエンコーダ
+
+    行ごとのフィルタ選択とメタデータのチャンクはPillowに任せ、無圧縮（レベル0）で
+    書き出したIDATを展開して指定のdeflate実装で圧縮し直す。
+    圧縮以外はPillowの出力と同じPNGになる。
+    """
+
+    def __init__(self, name: str, compress: Callable[[bytes, int, int], bytes]) -> None:
+        """
+        Args:
+            name: バックエンド名
+            compress: (データ, 圧縮レベル, 圧縮戦略) を受け取りzlib形式のデータを返す関数
+        """
+        self.name = name
+        self._compress = compress
+
+    def save(self, img: Image.Image, output: BinaryIO, encode_options: Dict[str, Any]) -> None:
+        # Pillowの optimize は圧縮レベル9を意味する
+        level = 9 if encode_options.get('optimize') else encode_options.get('compress_level', 6)
+        strategy = encode_options.get('compress_type', zlib.Z_DEFAULT_STRATEGY)
+        options = {key: value for key, value in encode_options.items() if key not in _DEFLATE_OPTIONS}
+
+        buf = io.BytesIO()
+        img.save(buf, format='PNG', compress_level=0, **options)
+        idat: List[bytes] = []
+        output.write(PNG_SIGNATURE)
+        for chunk_type, data in iter_chunks(buf.getvalue()):
+            if chunk_type == b'IDAT':
+                idat.append(data)
+                continue
+            if idat:
+                # IDATは連続しているため、最後のIDATの直後でまとめて書き出す
+                compressed = self._compress(zlib.decompress(b''.join(idat)), level, strategy)
+                idat = []
+                for pos in range(0, len(compressed), IDAT_CHUNK_SIZE):
+                    write_chunk(output, b'IDAT', compressed[pos:pos + IDAT_CHUNK_SIZE])
+            write_chunk(output, chunk_type, data)
+
+
+def _compress_zlib(data: bytes, level: int, strategy: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _load_zlib_ng() -> Callable[[bytes, int, int], bytes]:
+    from zlib_ng import zlib_ng
+
+    def compress(data: bytes, level: int, strategy: int) -> bytes:
+        compressor = zlib_ng.compressobj(level, zlib_ng.DEFLATED, zlib_ng.MAX_WBITS, 9, strategy)
+        return compressor.compress(data) + compressor.flush()
+    return compress
+
+
+def _load_isal() -> Callable[[bytes, int, int], bytes]:
+    from isal import isal_zlib
+
+    def compress(data: bytes, level: int, strategy: int) -> bytes:
+        # ISA-Lのレベル2以上は圧縮率がほとんど変わらず遅くなる
+        return isal_zlib.compress(data, min(level, 1))
+    return compress
+
+
+def _load_libdeflate() -> Callable[[bytes, int, int], bytes]:
+    import deflate
+
+    def compress(data: bytes, level: int, strategy: int) -> bytes:
+        # libdeflateのレベル10以上は桁違いに遅いため、zlibと同じ1-9の範囲で使う
+        return deflate.zlib_compress(data, max(level, 1))
+    return compress
+
+
+# 外部のdeflate実装（読み込みに失敗した場合は利用不可）
+_BACKEND_LOADERS: Dict[str, Callable[[], Callable[[bytes, int, int], bytes]]] = {
+    ENCODER_ZLIB_NG: _load_zlib_ng,
+    ENCODER_ISAL: _load_isal,
+    ENCODER_LIBDEFLATE: _load_libdeflate,
+}
+
+PILLOW_ENCODER = PngEncoder()
+
+# 読み込み済みのエンコーダ（利用できないバックエンドはNone）
+_encoders: Dict[str, Optional[PngEncoder]] = {
+    ENCODER_PILLOW: PILLOW_ENCODER,
+    ENCODER_ZLIB: DeflateEncoder(ENCODER_ZLIB, _compress_zlib),
+}
+
+
+def _load_encoder(name: str) -> Optional[PngEncoder]:
+    """バックエンドを読み込む（インストールされていない場合はNone）"""
+    if name not in _encoders:
+        try:
+            _encoders[name] = DeflateEncoder(name, _BACKEND_LOADERS[name]())
+        except ImportError:
+            logger.debug(f"Encoder backend not available: {name}")
+            _encoders[name] = None
+    return _encoders[name]
+
+
+def available_encoders() -> List[str]:
+    """利用できるバックエンド名の一覧を返す（auto を除く）"""
+    return [name for name in ENCODER_CHOICES if name != ENCODER_AUTO and _load_encoder(name) is not None]
+
+
+def get_encoder(name: str = ENCODER_AUTO, encode_options: Optional[Dict[str, Any]] = None) -> PngEncoder:
+    """
+    バックエンド名からエンコーダを返す
+
+    Args:
+        name: バックエンド名（"auto" の場合は圧縮レベルと利用可能なバックエンドから選ぶ）
+        encode_options: PNGエンコードオプション（auto の選択に使う）
+
+    Returns:
+        エンコーダ
+
+    Raises:
+        ValueError: 不明なバックエンド、またはインストールされていない場合
+    """
+    if name == ENCODER_AUTO:
+        options = encode_options or {}
+        level = 9 if options.get('optimize') else options.get('compress_level', 6)
+        if level >= AUTO_MIN_LEVEL:
+            for candidate in AUTO_PREFERENCE:
+                encoder = _load_encoder(candidate)
+                if encoder is not None:
+                    return encoder
+        return PILLOW_ENCODER
+    if name not in ENCODER_CHOICES:
+        raise ValueError(f"Unknown encoder backend: {name} (choose from {', '.join(ENCODER_CHOICES)})")
+    encoder = _load_encoder(name)
+    if encoder is None:
+        raise ValueError(f"Encoder backend is not installed: {name}")
+    return encoder
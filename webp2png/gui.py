@@ -3,19 +3,224 @@ import logging
 import queue
 import threading
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from .converter import ConversionError, convert_webp_to_png
-from .utils import collect_webp_files, generate_output_path
+from .converter import DEFAULT_PROFILE, DEFAULT_RESAMPLE, ENCODE_PROFILES, RESAMPLE_FILTERS, default_jobs, iter_convert
+from .utils import iter_webp_files
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+
+# ワーカースレッドからUIスレッドへ送るイベントの種類
+EVENT_LOG = "log"  # ログ1行
+EVENT_PROGRESS = "progress"  # (成功件数, 失敗件数)
+EVENT_DONE = "done"  # (成功件数, 失敗件数, 中止されたか)
+
+# イベントキューを確認する間隔（ミリ秒）
+POLL_INTERVAL_MS = 100
+# 1回の確認で処理するイベントの上限（大量の完了通知でUIが止まらないようにする）
+MAX_EVENTS_PER_POLL = 20000
+# ログ欄に残す行数
+MAX_LOG_LINES = 2000
+# 入力一覧の表示行数
+INPUT_LIST_ROWS = 8
+
+
+class BatchControl:
+    """UIスレッドからワーカースレッドのバッチ変換を一時停止・中止する"""
+
+    def __init__(self) -> None:
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def pause(self) -> None:
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        # 一時停止中でも待機を解いて終了させる
+        self._running.set()
+
+    @property
+    def running(self) -> threading.Event:
+        """
+        iter_convert の running に渡すイベント
+
+        一時停止中は新しい入力の投入だけを止め、投入済みの変換の結果は受け取り続ける。
+        """
+        return self._running
+
+    def gate(self, paths: Iterable[Path]) -> Iterator[Path]:
+        """中止されたら以降の入力を打ち切る"""
+        for path in paths:
+            if self._cancelled.is_set():
+                return
+            yield path
+
+
+class FileCollector:
+    """
+    入力パスからWebPファイルをバックグラウンドで探索し、見つけた順に蓄積する
+
+    UIスレッドは stats() と rows() で途中経過を読み出す。探索をやり直す場合は
+    実行中の探索を打ち切ってから最初から探索する。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (パス, バイト数)
+        self._entries: List[Tuple[Path, int]] = []
+        self._total_bytes = 0
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+
+    def start(self, paths: Sequence[Path], recursive: bool) -> None:
+        """探索を始める（実行中の探索は打ち切り、これまでの結果は捨てる）"""
+        self._cancel.set()
+        cancel = threading.Event()
+        done = threading.Event()
+        with self._lock:
+            self._entries = []
+            self._total_bytes = 0
+            self._cancel = cancel
+            self._done = done
+        threading.Thread(target=self._scan, args=(list(paths), recursive, cancel, done), daemon=True).start()
+
+    def _scan(self, paths: List[Path], recursive: bool, cancel: threading.Event, done: threading.Event) -> None:
+        try:
+            for path in iter_webp_files(paths, recursive=recursive):
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    size = 0
+                with self._lock:
+                    # 打ち切られた探索の結果は新しい探索の一覧に混ぜない
+                    if cancel.is_set():
+                        return
+                    self._entries.append((path, size))
+                    self._total_bytes += size
+        except Exception:
+            logger.exception("File scan failed")
+        finally:
+            done.set()
+
+    @property
+    def scanning(self) -> bool:
+        return not self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """探索の完了を待つ（完了した場合はTrue）"""
+        return self._done.wait(timeout)
+
+    def stats(self) -> Tuple[int, int]:
+        """(ファイル数, 合計バイト数) を返す"""
+        with self._lock:
+            return len(self._entries), self._total_bytes
+
+    def rows(self, start: int, stop: int) -> List[Tuple[Path, int]]:
+        """見つけた順で start から stop の手前までの (パス, バイト数) を返す"""
+        with self._lock:
+            return self._entries[start:stop]
+
+    def paths(self) -> List[Path]:
+        """見つかったファイルのパスを返す"""
+        with self._lock:
+            return [path for path, _ in self._entries]
+
+
+class VirtualList(ttk.Frame):
+    """
+    表示中の行だけを描画するリスト
+
+    件数が多くてもListboxには表示行数分の項目しか入れず、スクロールバーの位置から
+    表示する範囲を決めて get_rows で取り出す。
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        get_count: Callable[[], int],
+        get_rows: Callable[[int, int], List[str]],
+        rows: int = INPUT_LIST_ROWS,
+    ) -> None:
+        super().__init__(master)
+        self._get_count = get_count
+        self._get_rows = get_rows
+        self._rows = rows
+        self._first = 0
+        self._shown: Tuple[int, int] = (-1, -1)
+
+        self._listbox = tk.Listbox(self, height=rows, activestyle="none")
+        self._scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self._listbox.pack(side="left", fill="both", expand=True)
+        self._scrollbar.pack(side="right", fill="y")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self._listbox.bind(sequence, self._on_wheel)
+        self._listbox.bind("<Up>", lambda event: self._scroll_by(-1))
+        self._listbox.bind("<Down>", lambda event: self._scroll_by(1))
+        self._listbox.bind("<Prior>", lambda event: self._scroll_by(-self._rows))
+        self._listbox.bind("<Next>", lambda event: self._scroll_by(self._rows))
+
+    def _on_scrollbar(self, action: str, *args: str) -> None:
+        count = self._get_count()
+        if action == "moveto":
+            self._first = int(float(args[0]) * count)
+        elif action == "scroll":
+            step = self._rows if args[1] == "pages" else 1
+            self._first += int(args[0]) * step
+        self.refresh()
+
+    def _on_wheel(self, event: tk.Event) -> str:
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_by(-3)
+        else:
+            self._scroll_by(3)
+        return "break"
+
+    def _scroll_by(self, rows: int) -> str:
+        self._first += rows
+        self.refresh()
+        return "break"
+
+    def refresh(self) -> None:
+        """表示範囲を描き直す（表示中の行と件数が変わっていない場合は何もしない）"""
+        count = self._get_count()
+        self._first = max(0, min(self._first, count - self._rows))
+        if self._shown == (self._first, count):
+            return
+        self._shown = (self._first, count)
+        self._listbox.delete(0, tk.END)
+        rows = self._get_rows(self._first, self._first + self._rows)
+        if rows:
+            self._listbox.insert(tk.END, *rows)
+        if count:
+            self._scrollbar.set(self._first / count, min(self._first + self._rows, count) / count)
+        else:
+            self._scrollbar.set(0, 1)
+
+
+def format_bytes(size: float) -> str:
+    """バイト数を読みやすい単位で表す"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
 
 
 class Webp2PngApp(tk.Tk):
@@ -24,16 +229,29 @@ class Webp2PngApp(tk.Tk):
     def __init__(self) -> None:
         super().__init__()
         self.title("WebP to PNG Converter")
-        self.geometry("640x480")
+        self.geometry("640x600")
 
         self.input_paths: List[Path] = []
         self.output_dir: Path | None = None
         self.recursive = tk.BooleanVar(value=False)
         self.force = tk.BooleanVar(value=False)
         self.verbose = tk.BooleanVar(value=False)
-
-        self._log_queue: queue.Queue[str] = queue.Queue()
+        self.profile = tk.StringVar(value=DEFAULT_PROFILE)
+        self.max_size = tk.IntVar(value=0)
+        self.resample = tk.StringVar(value=DEFAULT_RESAMPLE)
+        self.jobs = tk.IntVar(value=default_jobs())
+        self.status = tk.StringVar()
+
+        # ワーカースレッドからのイベント（Tkの操作はすべてUIスレッドの _poll_log_queue で行う）
+        self._log_queue: queue.Queue[tuple] = queue.Queue()
+        self._control: Optional[BatchControl] = None
+        self._total = 0
+        # 入力の探索はバックグラウンドで行い、結果は _poll_log_queue で画面に反映する
+        self._collector = FileCollector()
+        self.input_summary = tk.StringVar(value="0 ファイル")
         self._create_widgets()
+        self.recursive.trace_add("write", lambda *args: self._rescan())
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self._poll_log_queue()
 
     def _create_widgets(self) -> None:
@@ -41,15 +259,24 @@ class Webp2PngApp(tk.Tk):
         input_frame = ttk.LabelFrame(self, text="入力")
         input_frame.pack(fill="x", padx=10, pady=8)
 
-        btn_add_files = ttk.Button(input_frame, text="ファイル追加", command=self.add_files)
-        btn_add_dir = ttk.Button(input_frame, text="ディレクトリ追加", command=self.add_directory)
-        btn_clear = ttk.Button(input_frame, text="クリア", command=self.clear_inputs)
+        button_row = ttk.Frame(input_frame)
+        button_row.pack(fill="x")
+        btn_add_files = ttk.Button(button_row, text="ファイル追加", command=self.add_files)
+        btn_add_dir = ttk.Button(button_row, text="ディレクトリ追加", command=self.add_directory)
+        btn_clear = ttk.Button(button_row, text="クリア", command=self.clear_inputs)
         btn_add_files.pack(side="left", padx=4, pady=4)
         btn_add_dir.pack(side="left", padx=4, pady=4)
         btn_clear.pack(side="left", padx=4, pady=4)
-
-        self.listbox = tk.Listbox(input_frame, height=6)
-        self.listbox.pack(fill="x", padx=4, pady=4)
+        ttk.Label(button_row, textvariable=self.input_summary).pack(side="right", padx=4)
+
+        self.input_list = VirtualList(
+            input_frame,
+            get_count=lambda: self._collector.stats()[0],
+            get_rows=lambda start, stop: [
+                f"{path}  ({format_bytes(size)})" for path, size in self._collector.rows(start, stop)
+            ],
+        )
+        self.input_list.pack(fill="x", padx=4, pady=4)
 
         # Options
         option_frame = ttk.LabelFrame(self, text="オプション")
@@ -57,6 +284,37 @@ class Webp2PngApp(tk.Tk):
         ttk.Checkbutton(option_frame, text="再帰的に探索", variable=self.recursive).pack(side="left", padx=4)
         ttk.Checkbutton(option_frame, text="既存ファイルを上書き", variable=self.force).pack(side="left", padx=4)
         ttk.Checkbutton(option_frame, text="詳細ログ", variable=self.verbose).pack(side="left", padx=4)
+        ttk.Label(option_frame, text="圧縮").pack(side="left", padx=(12, 2))
+        ttk.Combobox(
+            option_frame,
+            textvariable=self.profile,
+            values=list(ENCODE_PROFILES),
+            state="readonly",
+            width=9,
+        ).pack(side="left", padx=4)
+        ttk.Label(option_frame, text="並列数").pack(side="left", padx=(12, 2))
+        ttk.Spinbox(option_frame, textvariable=self.jobs, from_=1, to=256, width=4).pack(side="left", padx=4)
+
+        # Resize
+        resize_frame = ttk.LabelFrame(self, text="縮小")
+        resize_frame.pack(fill="x", padx=10, pady=8)
+        ttk.Label(resize_frame, text="最大サイズ (px, 0=元のサイズ)").pack(side="left", padx=4)
+        ttk.Spinbox(
+            resize_frame,
+            textvariable=self.max_size,
+            from_=0,
+            to=100000,
+            increment=64,
+            width=8,
+        ).pack(side="left", padx=4)
+        ttk.Label(resize_frame, text="フィルタ").pack(side="left", padx=(12, 2))
+        ttk.Combobox(
+            resize_frame,
+            textvariable=self.resample,
+            values=list(RESAMPLE_FILTERS),
+            state="readonly",
+            width=9,
+        ).pack(side="left", padx=4)
 
         # Output directory
         output_frame = ttk.LabelFrame(self, text="出力ディレクトリ")
@@ -72,6 +330,7 @@ class Webp2PngApp(tk.Tk):
         progress_frame.pack(fill="x", padx=10, pady=8)
         self.progress = ttk.Progressbar(progress_frame, mode="determinate")
         self.progress.pack(fill="x", padx=4, pady=4)
+        ttk.Label(progress_frame, textvariable=self.status).pack(anchor="w", padx=4)
 
         # Log
         log_frame = ttk.LabelFrame(self, text="ログ")
@@ -84,17 +343,20 @@ class Webp2PngApp(tk.Tk):
         action_frame.pack(fill="x", padx=10, pady=8)
         self.run_button = ttk.Button(action_frame, text="変換を実行", command=self.run_conversion)
         self.run_button.pack(side="right", padx=4)
+        self.cancel_button = ttk.Button(action_frame, text="中止", command=self.cancel_conversion, state="disabled")
+        self.cancel_button.pack(side="right", padx=4)
+        self.pause_button = ttk.Button(action_frame, text="一時停止", command=self.toggle_pause, state="disabled")
+        self.pause_button.pack(side="right", padx=4)
 
     def add_files(self) -> None:
         files = filedialog.askopenfilenames(
             title="WebPファイルを選択",
             filetypes=[("WebP files", "*.webp"), ("All files", "*.*")],
         )
-        for f in files:
-            path = Path(f)
-            if path not in self.input_paths:
-                self.input_paths.append(path)
-                self.listbox.insert(tk.END, str(path))
+        added = [Path(f) for f in files if Path(f) not in self.input_paths]
+        if added:
+            self.input_paths.extend(added)
+            self._rescan()
 
     def add_directory(self) -> None:
         directory = filedialog.askdirectory(title="ディレクトリを選択")
@@ -102,11 +364,24 @@ class Webp2PngApp(tk.Tk):
             path = Path(directory)
             if path not in self.input_paths:
                 self.input_paths.append(path)
-                self.listbox.insert(tk.END, str(path))
+                self._rescan()
 
     def clear_inputs(self) -> None:
         self.input_paths.clear()
-        self.listbox.delete(0, tk.END)
+        self._rescan()
+
+    def _rescan(self) -> None:
+        """入力パスを探索し直す（入力や再帰の設定が変わった場合）"""
+        self._collector.start(self.input_paths, self.recursive.get())
+        self._refresh_inputs()
+
+    def _refresh_inputs(self) -> None:
+        count, total_bytes = self._collector.stats()
+        summary = f"{count:,} ファイル、{format_bytes(total_bytes)}"
+        if self._collector.scanning:
+            summary += "（探索中…）"
+        self.input_summary.set(summary)
+        self.input_list.refresh()
 
     def choose_output_dir(self) -> None:
         directory = filedialog.askdirectory(title="出力ディレクトリを選択")
@@ -115,27 +390,103 @@ class Webp2PngApp(tk.Tk):
             self.output_dir_var.set(str(self.output_dir))
 
     def _append_log(self, message: str) -> None:
-        self._log_queue.put(message)
+        self._log_queue.put((EVENT_LOG, message))
 
     def _poll_log_queue(self) -> None:
+        """ワーカーからのイベントをまとめてUIに反映する（ログは1回の挿入、進捗は最新の値のみ）"""
+        lines: List[str] = []
+        progress = None
+        done = None
         try:
-            while True:
-                msg = self._log_queue.get_nowait()
-                self.log_text.configure(state="normal")
-                self.log_text.insert(tk.END, msg + "\n")
-                self.log_text.see(tk.END)
-                self.log_text.configure(state="disabled")
+            for _ in range(MAX_EVENTS_PER_POLL):
+                kind, payload = self._log_queue.get_nowait()
+                if kind == EVENT_LOG:
+                    lines.append(payload)
+                elif kind == EVENT_PROGRESS:
+                    progress = payload
+                elif kind == EVENT_DONE:
+                    done = payload
         except queue.Empty:
             pass
-        self.after(100, self._poll_log_queue)
+        if lines:
+            self._write_log(lines)
+        if progress is not None:
+            self._show_progress(*progress)
+        if done is not None:
+            self._finish_batch(*done)
+        self._refresh_inputs()
+        self.after(POLL_INTERVAL_MS, self._poll_log_queue)
+
+    def _write_log(self, lines: List[str]) -> None:
+        self.log_text.configure(state="normal")
+        self.log_text.insert(tk.END, "\n".join(lines[-MAX_LOG_LINES:]) + "\n")
+        # 古い行を捨てて、ログ欄が際限なく大きくならないようにする
+        self.log_text.delete("1.0", f"end-{MAX_LOG_LINES + 1}l")
+        self.log_text.see(tk.END)
+        self.log_text.configure(state="disabled")
+
+    def _show_progress(self, success: int, failed: int) -> None:
+        self.progress.config(value=success + failed)
+        self.status.set(f"{success + failed} / {self._total} 件（成功 {success}、失敗 {failed}）")
+
+    def _finish_batch(self, success: int, failed: int, cancelled: bool) -> None:
+        self._show_progress(success, failed)
+        self._control = None
+        self.run_button.config(state="normal")
+        self.pause_button.config(state="disabled", text="一時停止")
+        self.cancel_button.config(state="disabled")
+        self._write_log(["変換を中止しました" if cancelled else "変換完了"])
+
+    def toggle_pause(self) -> None:
+        if self._control is None:
+            return
+        if self._control.paused:
+            self._control.resume()
+            self.pause_button.config(text="一時停止")
+            self._append_log("再開")
+        else:
+            self._control.pause()
+            self.pause_button.config(text="再開")
+            self._append_log("一時停止（実行中の変換は完了まで続きます）")
+
+    def cancel_conversion(self) -> None:
+        if self._control is None:
+            return
+        self._control.cancel()
+        self.pause_button.config(state="disabled")
+        self.cancel_button.config(state="disabled")
+        self._append_log("中止しています（実行中の変換の完了を待っています）")
+
+    def _on_close(self) -> None:
+        if self._control is not None:
+            self._control.cancel()
+        self.destroy()
 
     def run_conversion(self) -> None:
         if not self.input_paths:
             messagebox.showerror("エラー", "入力ファイルまたはディレクトリを選択してください。")
             return
 
-        # 収集
-        webp_files = collect_webp_files(self.input_paths, recursive=self.recursive.get())
+        try:
+            max_size = self.max_size.get()
+        except tk.TclError:
+            max_size = -1
+        if max_size < 0:
+            messagebox.showerror("エラー", "最大サイズには0以上の整数を指定してください。")
+            return
+        try:
+            jobs = self.jobs.get()
+        except tk.TclError:
+            jobs = 0
+        if jobs < 1:
+            messagebox.showerror("エラー", "並列数には1以上の整数を指定してください。")
+            return
+
+        # 収集（バックグラウンドの探索結果を使う）
+        if self._collector.scanning:
+            messagebox.showinfo("探索中", "ファイルの探索が終わってから実行してください。")
+            return
+        webp_files = self._collector.paths()
         if not webp_files:
             messagebox.showerror("エラー", "WebPファイルが見つかりません。")
             return
@@ -148,40 +499,66 @@ class Webp2PngApp(tk.Tk):
 
         # UIロック
         self.run_button.config(state="disabled")
-        self.progress.config(maximum=len(webp_files), value=0)
-        self._append_log(f"変換開始: {len(webp_files)} 件")
-
+        self.pause_button.config(state="normal", text="一時停止")
+        self.cancel_button.config(state="normal")
+        self._total = len(webp_files)
+        self.progress.config(maximum=self._total, value=0)
+        self.status.set(f"0 / {self._total} 件")
+        self._append_log(f"変換開始: {self._total} 件（並列数 {jobs}）")
+
+        # Tkの変数はワーカースレッドから読まず、ここで値を確定して渡す
+        options: Dict[str, Any] = dict(
+            output_dir=self.output_dir,
+            force=self.force.get(),
+            preserve_metadata=True,
+            jobs=jobs,
+            profile=self.profile.get(),
+            max_size=max_size or None,
+            resample=self.resample.get(),
+        )
+        self._control = BatchControl()
         threading.Thread(
             target=self._convert_batch,
-            args=(webp_files,),
+            args=(webp_files, self._control, self.verbose.get(), options),
             daemon=True,
         ).start()
 
-    def _convert_batch(self, webp_files: List[Path]) -> None:
+    def _convert_batch(
+        self,
+        webp_files: List[Path],
+        control: BatchControl,
+        verbose: bool,
+        options: Dict[str, Any],
+    ) -> None:
+        """ワーカースレッドで変換する（Tkには触れず、イベントキューにだけ書き込む）"""
+        success = 0
+        failed = 0
         try:
-            for idx, webp_file in enumerate(webp_files, start=1):
-                try:
-                    if self.output_dir:
-                        out_path = generate_output_path(webp_file, self.output_dir)
-                    else:
-                        out_path = None
-                    result = convert_webp_to_png(
-                        webp_file,
-                        output_path=out_path,
-                        force=self.force.get(),
-                        preserve_metadata=True,
-                    )
-                    self._append_log(f"成功: {webp_file} -> {result}")
-                except ConversionError as e:
-                    self._append_log(f"失敗: {webp_file} ({e})")
-                finally:
-                    self.progress.config(value=idx)
+            for result in iter_convert(control.gate(webp_files), running=control.running, **options):
+                if result.ok:
+                    success += 1
+                    # 成功は件数が多いため、詳細ログの場合のみ1件ずつ出す
+                    if verbose:
+                        self._append_log(f"成功: {result.input_path} -> {result.output_path}")
+                else:
+                    failed += 1
+                    self._append_log(f"失敗: {result.input_path} ({result.error})")
+                self._log_queue.put((EVENT_PROGRESS, (success, failed)))
+                if control.cancelled:
+                    # 未着手の変換は破棄し、実行中の変換の完了だけを待つ
+                    break
+        except Exception as e:
+            logger.exception("Batch conversion failed")
+            self._append_log(f"エラー: {e}")
         finally:
-            self.run_button.config(state="normal")
-            self._append_log("変換完了")
+            self._log_queue.put((EVENT_DONE, (success, failed, control.cancelled)))
 
 
 def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
     app = Webp2PngApp()
     app.mainloop()
 
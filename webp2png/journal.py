@@ -0,0 +1,163 @@
+"""Resumable job journal for webp2png batch conversions."""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from .constants import JOURNAL_NAME  # noqa: F401  従来どおり journal からも参照できるようにする
+
+logger = logging.getLogger(__name__)
+
+# ジョブの状態
+JOB_PLANNED = "planned"  # 変換対象として受け付けたが結果が記録されていない
+JOB_DONE = "done"  # 変換済み（増分変換でスキップしたものを含む）
+JOB_FAILED = "failed"  # 変換に失敗した
+JOB_STATES = (JOB_PLANNED, JOB_DONE, JOB_FAILED)
+
+
+class Journal:
+    """
+    バッチ変換の進行状況を記録するジャーナル（追記専用のJSON Lines形式）
+
+    変換対象として受け付けた時点で planned を、結果が出た時点で done/failed を
+    1行ずつ追記してフラッシュする。プロセスが途中で終了しても記録済みの行は残るため、
+    次回は変換済みの入力を飛ばして続きから再開できる。書きかけの最終行は読み込み時に無視する。
+
+    使い方:
+        with Journal(path, resume=True) as journal:
+            for result in iter_convert(journal.select(paths), output_dir=output_dir):
+                journal.record(result)
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        """
+        Args:
+            path: ジャーナルファイルのパス
+            resume: 既存のジャーナルを読み込んで追記するか（Falseの場合は新しく書き始める）
+        """
+        self.path = Path(path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        # select() で変換対象から外した件数
+        self.already_done = 0
+        self.already_failed = 0
+        if resume:
+            self._load()
+        elif self.path.exists():
+            logger.info(f"Starting a new journal: {self.path}")
+            self.path.unlink()
+
+    def _load(self) -> None:
+        """既存のジャーナルを読み込む（同じ入力は後の行が優先）"""
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    key = entry['source']
+                    if entry['state'] not in JOB_STATES:
+                        raise ValueError(entry['state'])
+                except (ValueError, KeyError, TypeError):
+                    # 中断時の書きかけの行などは無視する
+                    logger.warning(f"Ignoring malformed journal line {line_no}: {self.path}")
+                    continue
+                self._entries[key] = entry
+        logger.debug(f"Loaded {len(self._entries)} journal entries: {self.path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def state(self, source: Path) -> Optional[str]:
+        """
+        入力の最新の状態を返す
+
+        Args:
+            source: 入力ファイルのパス
+
+        Returns:
+            "planned", "done", "failed" のいずれか（記録がない場合はNone）
+        """
+        entry = self._entries.get(os.path.abspath(source))
+        return entry['state'] if entry is not None else None
+
+    def select(
+        self,
+        paths: Iterable[Path],
+        retry_failed: bool = False,
+        failed_only: bool = False
+    ) -> Iterator[Path]:
+        """
+        変換が必要な入力だけを返し、planned として記録する
+
+        変換済みで出力が残っている入力は飛ばす。中断時に変換中だった入力は変換し直す
+        （出力は完成してから公開されるため、中断した変換の出力は残っていない）。
+
+        Args:
+            paths: 入力ファイルのパス（遅延イテラブル可）
+            retry_failed: 失敗した入力を再変換するか
+            failed_only: 失敗した入力のみを変換するか
+
+        Yields:
+            変換する入力ファイルのパス
+        """
+        for path in paths:
+            entry = self._entries.get(os.path.abspath(path))
+            state = entry['state'] if entry is not None else None
+            if failed_only and state != JOB_FAILED:
+                continue
+            if state == JOB_DONE and entry.get('output') and os.path.exists(entry['output']):
+                self.already_done += 1
+                continue
+            if state == JOB_FAILED and not retry_failed:
+                self.already_failed += 1
+                continue
+            self.plan(path)
+            yield path
+
+    def plan(self, source: Path) -> None:
+        """入力を変換対象として記録する"""
+        self._append({'source': os.path.abspath(source), 'state': JOB_PLANNED})
+
+    def record(self, result: Any) -> None:
+        """
+        変換結果を記録する
+
+        Args:
+            result: iter_convert が返した ConversionResult
+        """
+        entry: Dict[str, Any] = {
+            'source': os.path.abspath(result.input_path),
+            'state': JOB_DONE if result.ok else JOB_FAILED,
+        }
+        if result.ok:
+            entry['output'] = os.path.abspath(result.output_path)
+        else:
+            entry['error'] = result.error
+        self._append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._entries[entry['source']] = entry
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """ジャーナルを閉じる（内容はディスクに同期する）"""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,219 @@
+"""Incremental conversion manifest for webp2png."""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .constants import MANIFEST_NAME  # noqa: F401  従来どおり manifest からも参照できるようにする
+
+logger = logging.getLogger(__name__)
+
+# ハッシュ計算時の読み込み単位
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 出力の内容に影響しない（書き込み方法だけを決める）変換オプション
+_WRITE_OPTIONS = ('atomic', 'durability', 'encode_jobs')
+
+
+def _source_key(source: Path) -> str:
+    """マニフェストのキー（絶対パス。シンボリックリンクは解決しない）"""
+    return os.path.abspath(source)
+
+
+def options_key(convert_options: Dict[str, Any], preserve_metadata: bool = True) -> str:
+    """
+    出力に影響する変換オプションを比較用の文字列にする
+
+    プロファイル・出力モード・縮小などを変えて実行した場合に、前回の出力をスキップしないために使う。
+
+    Args:
+        convert_options: convert_webp_to_png に渡す変換オプション
+        preserve_metadata: メタデータを保持するか
+
+    Returns:
+        オプションのハッシュ（16進数）
+    """
+    options = {
+        key: value for key, value in convert_options.items()
+        if key not in _WRITE_OPTIONS and value is not None
+    }
+    options['preserve_metadata'] = preserve_metadata
+    # Rendition などのオブジェクトは repr で表す
+    text = json.dumps(options, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def file_sha256(file_path: Path) -> str:
+    """ファイル内容のSHA-256を計算する"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    変換元と出力の対応を記録するマニフェスト（JSON Lines形式）
+
+    変換元のパス・サイズ・更新時刻（任意でSHA-256）と変換オプションをキーに出力パスを記録し、
+    変更のない入力を再デコードせずにスキップできるようにする。
+    記録は1件ごとに追記するため、途中で中断しても変換済みの分は失われない。
+    """
+
+    def __init__(self, path: Path, use_hash: bool = False) -> None:
+        """
+        Args:
+            path: マニフェストファイルのパス
+            use_hash: サイズ・更新時刻に加えて内容のSHA-256も比較するか
+        """
+        self.path = Path(path)
+        self.use_hash = use_hash
+        self._entries: Dict[str, dict] = {}
+        self._stale_lines = 0
+        self._file = None
+        self._load()
+
+    def _load(self) -> None:
+        """既存のマニフェストを読み込む（同じ変換元は後の行が優先）"""
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    key = entry['source']
+                except (ValueError, KeyError, TypeError):
+                    # 中断時の書きかけの行などは無視する
+                    logger.warning(f"Ignoring malformed manifest line {line_no}: {self.path}")
+                    self._stale_lines += 1
+                    continue
+                if key in self._entries:
+                    self._stale_lines += 1
+                self._entries[key] = entry
+        logger.debug(f"Loaded {len(self._entries)} manifest entries: {self.path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, source: Path) -> bool:
+        """変換元の記録があるか（変換元が変わっているかは問わない）"""
+        return _source_key(source) in self._entries
+
+    def lookup(self, source: Path, options: Optional[str] = None) -> Optional[Path]:
+        """
+        変換元と変換オプションが前回から変わっておらず、出力も残っている場合にその出力パスを返す
+
+        Args:
+            source: 変換元のパス
+            options: 変換オプションのキー（options_key の値）
+
+        Returns:
+            前回の出力パス（再変換が必要な場合はNone）
+        """
+        entry = self._entries.get(_source_key(source))
+        if entry is None or entry.get('options') != options:
+            return None
+
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        if st.st_size != entry.get('size') or st.st_mtime_ns != entry.get('mtime_ns'):
+            return None
+
+        output = Path(entry['output'])
+        if not output.exists():
+            return None
+
+        if self.use_hash and entry.get('sha256') != file_sha256(source):
+            return None
+
+        return output
+
+    def previous_outputs(self, source: Path) -> List[Path]:
+        """
+        変換元について前回記録した出力のうち、残っているものを返す（変換元が変わっているかは問わない）
+
+        変更された入力を再変換する際に、番号付きの新しい名前を作らず前回の出力を置き換えるために使う。
+        """
+        entry = self._entries.get(_source_key(source))
+        if entry is None:
+            return []
+        outputs = [Path(output) for output in entry.get('outputs', [entry['output']])]
+        return [output for output in outputs if output.exists()]
+
+    def record(
+        self,
+        source: Path,
+        output: Path,
+        options: Optional[str] = None,
+        outputs: Optional[Sequence[Path]] = None
+    ) -> None:
+        """
+        変換結果を記録する
+
+        Args:
+            source: 変換元のパス
+            output: 出力ファイルのパス
+            options: 変換オプションのキー（options_key の値）
+            outputs: 1回の変換で書き出したすべての出力（レンディション）
+        """
+        st = os.stat(source)
+        entry: Dict[str, Any] = {
+            'source': _source_key(source),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'output': os.path.abspath(output),
+        }
+        if outputs and len(outputs) > 1:
+            entry['outputs'] = [os.path.abspath(path) for path in outputs]
+        if options is not None:
+            entry['options'] = options
+        if self.use_hash:
+            entry['sha256'] = file_sha256(source)
+
+        key = entry['source']
+        if key in self._entries:
+            self._stale_lines += 1
+        self._entries[key] = entry
+
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def compact(self) -> None:
+        """古い行を取り除いてマニフェストを書き直す"""
+        self._close_file()
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._stale_lines = 0
+        logger.debug(f"Compacted manifest: {self.path}")
+
+    def close(self) -> None:
+        """マニフェストを閉じる（古い行が有効な行より多い場合は書き直す）"""
+        if self._stale_lines > len(self._entries):
+            self.compact()
+        self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,196 @@
+"""Operational metrics for long-running webp2png workers."""
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# レイテンシのヒストグラムの境界（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheusのテキスト形式のContent-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """累積バケット付きのヒストグラム（ロックは Metrics 側で取る）"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # 各バケットに入った件数（最後は +Inf）
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """値を1件記録する"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(上限, 累積件数) の一覧を返す（Prometheusの le ラベルと同じ形式）"""
+        result = []
+        total = 0
+        for bound, count in zip([*map(_format_float, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """
+    変換のカウンタ・ヒストグラム・ゲージを保持するスレッドセーフなレジストリ
+
+    iter_convert(metrics=...) や ConversionServer が更新し、
+    snapshot() で辞書として、render_prometheus() でPrometheusのテキスト形式として読み出せる。
+
+    使い方:
+        metrics = Metrics()
+        for result in iter_convert(paths, jobs=4, metrics=metrics):
+            ...
+        print(metrics.snapshot()["conversions"])
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        Args:
+            buckets: レイテンシのヒストグラムの境界（秒）
+        """
+        self._lock = threading.Lock()
+        self.conversions: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.decode_seconds = Histogram(buckets)
+        self.encode_seconds = Histogram(buckets)
+        self.conversion_seconds = Histogram(buckets)
+        self.in_flight = 0
+        self.queue_depth = 0
+
+    def record(
+        self,
+        status: str,
+        elapsed: Optional[float] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        error_class: Optional[str] = None
+    ) -> None:
+        """
+        変換1件の結果を記録する
+
+        Args:
+            status: 変換結果のステータス（"success", "skipped", "failed"）
+            elapsed: 変換全体の秒数
+            stats: フェーズごとの秒数とバイト数（PhaseTimer.as_dict() の戻り値）
+            error_class: 失敗時のエラー分類
+        """
+        with self._lock:
+            self.conversions[status] = self.conversions.get(status, 0) + 1
+            if error_class is not None:
+                self.failures[error_class] = self.failures.get(error_class, 0) + 1
+            if elapsed is not None:
+                self.conversion_seconds.observe(elapsed)
+            if stats is not None:
+                self.input_bytes += stats['input_bytes']
+                self.output_bytes += stats['output_bytes']
+                # 失敗した変換はデコード・エンコードまで到達していない場合がある
+                if error_class is None:
+                    self.decode_seconds.observe(stats['decode'])
+                    self.encode_seconds.observe(stats['encode'])
+
+    def observe_result(self, result: Any) -> None:
+        """ConversionResult を記録する"""
+        self.record(
+            result.status,
+            elapsed=result.elapsed if result.stats is not None else None,
+            stats=result.stats,
+            error_class=result.error_class
+        )
+
+    def set_in_flight(self, in_flight: int, queue_depth: int = 0) -> None:
+        """実行中の変換数と待ち行列の長さを設定する"""
+        with self._lock:
+            self.in_flight = in_flight
+            self.queue_depth = queue_depth
+
+    def add_in_flight(self, delta: int) -> None:
+        """実行中の変換数を増減する"""
+        with self._lock:
+            self.in_flight += delta
+
+    def add_queued(self, delta: int) -> None:
+        """待ち行列の長さを増減する"""
+        with self._lock:
+            self.queue_depth += delta
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        現在の値を辞書として返す
+
+        Returns:
+            conversions, failures, input_bytes, output_bytes, in_flight, queue_depth と
+            各ヒストグラム（count, sum, buckets）の辞書
+        """
+        with self._lock:
+            return {
+                'conversions': dict(self.conversions),
+                'failures': dict(self.failures),
+                'input_bytes': self.input_bytes,
+                'output_bytes': self.output_bytes,
+                'in_flight': self.in_flight,
+                'queue_depth': self.queue_depth,
+                **{
+                    name: {'count': hist.count, 'sum': hist.sum, 'buckets': dict(hist.cumulative())}
+                    for name, hist in self._histograms()
+                },
+            }
+
+    def render_prometheus(self, prefix: str = "webp2png") -> str:
+        """
+        Prometheusのテキスト形式（0.0.4）で出力する
+
+        Args:
+            prefix: メトリクス名の接頭辞
+
+        Returns:
+            エクスポート用のテキスト
+        """
+        lines: List[str] = []
+        with self._lock:
+            lines += _metric(f"{prefix}_conversions_total", "counter", "Conversions by result status")
+            for status, count in sorted(self.conversions.items()):
+                lines.append(f'{prefix}_conversions_total{{status="{status}"}} {count}')
+            lines += _metric(f"{prefix}_conversion_failures_total", "counter", "Failed conversions by error class")
+            for reason, count in sorted(self.failures.items()):
+                lines.append(f'{prefix}_conversion_failures_total{{reason="{reason}"}} {count}')
+            lines += _metric(f"{prefix}_input_bytes_total", "counter", "WebP bytes read")
+            lines.append(f"{prefix}_input_bytes_total {self.input_bytes}")
+            lines += _metric(f"{prefix}_output_bytes_total", "counter", "PNG bytes written")
+            lines.append(f"{prefix}_output_bytes_total {self.output_bytes}")
+            for name, hist in self._histograms():
+                metric = f"{prefix}_{name}"
+                lines += _metric(metric, "histogram", f"{name.replace('_', ' ').capitalize()}")
+                for bound, count in hist.cumulative():
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{metric}_sum {_format_float(hist.sum)}")
+                lines.append(f"{metric}_count {hist.count}")
+            lines += _metric(f"{prefix}_in_flight", "gauge", "Conversions currently running")
+            lines.append(f"{prefix}_in_flight {self.in_flight}")
+            lines += _metric(f"{prefix}_queue_depth", "gauge", "Conversions waiting for a worker")
+            lines.append(f"{prefix}_queue_depth {self.queue_depth}")
+        return "\n".join(lines) + "\n"
+
+    def _histograms(self) -> List[Tuple[str, Histogram]]:
+        return [
+            ('decode_seconds', self.decode_seconds),
+            ('encode_seconds', self.encode_seconds),
+            ('conversion_seconds', self.conversion_seconds),
+        ]
+
+
+def _metric(name: str, metric_type: str, help_text: str) -> List[str]:
+    """HELP行とTYPE行を返す"""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+
+
+def _format_float(value: float) -> str:
+    """Prometheusの数値表記（整数値も小数で表す）"""
+    return repr(float(value))
@@ -0,0 +1,272 @@
+"""Local HTTP conversion service for webp2png."""
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import __version__
+from .constants import DEFAULT_HOST, DEFAULT_PORT
+from .converter import (
+    DEFAULT_PROFILE,
+    ENCODE_PROFILES,
+    ERROR_UNEXPECTED,
+    EXECUTOR_AUTO,
+    MODE_AUTO,
+    OUTPUT_MODES,
+    STATUS_FAILED,
+    STATUS_SUCCESS,
+    ConversionError,
+    _create_executor,
+    convert_bytes,
+    default_jobs,
+)
+from .metrics import PROMETHEUS_CONTENT_TYPE, Metrics
+from .timing import PhaseTimer
+from .validator import MAX_FILE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 変換枠が空くまで待つ最大秒数（超えた場合は503を返す）
+DEFAULT_QUEUE_TIMEOUT = 30.0
+# 接続ごとのソケットの読み書きの最大待ち秒数（遅いクライアントが変換枠を占有し続けないようにする）
+DEFAULT_REQUEST_TIMEOUT = 60.0
+
+
+def _warm_up() -> None:
+    """ワーカーでPillowのWebP/PNGプラグインを読み込んでおく"""
+    from PIL import Image, PngImagePlugin, WebPImagePlugin  # noqa: F401
+    Image.init()
+
+
+def _convert_timed(data: bytes, **options: Any) -> Tuple[bytes, Dict[str, Any]]:
+    """ワーカーで変換し、PNGデータとフェーズごとの計測結果を返す"""
+    timer = PhaseTimer()
+    png_data = convert_bytes(data, timer=timer, **options)
+    return png_data, timer.as_dict()
+
+
+class ConversionServer(ThreadingHTTPServer):
+    """
+    WebPを受け取りPNGを返すHTTPサーバー
+
+    変換は起動時に立ち上げたワーカープールで実行するため、
+    リクエストごとのプロセス起動やPillowの読み込みは発生しない。
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        jobs: Optional[int] = None,
+        executor: str = EXECUTOR_AUTO,
+        max_concurrency: Optional[int] = None,
+        max_body_size: int = MAX_FILE_SIZE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+        request_timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+        profile: str = DEFAULT_PROFILE
+    ) -> None:
+        """
+        Args:
+            address: 待ち受けるアドレス（ホスト, ポート）
+            jobs: ワーカー数（Noneの場合はCPUコア数）
+            executor: ワーカープールの種類（"auto", "thread", "process"）
+            max_concurrency: 同時に変換するリクエスト数の上限（Noneの場合はjobsの2倍）
+            max_body_size: 受け付けるリクエストボディの最大バイト数
+            queue_timeout: 変換枠が空くまで待つ最大秒数
+            request_timeout: 接続ごとのソケットの読み書きの最大待ち秒数（Noneの場合は無制限）
+            profile: リクエストで指定がない場合のエンコードプロファイル
+        """
+        super().__init__(address, ConversionRequestHandler)
+        self.jobs = jobs or default_jobs()
+        self.max_body_size = max_body_size
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.profile = profile
+        self.slots = threading.BoundedSemaphore(max_concurrency or self.jobs * 2)
+        self.metrics = Metrics()
+        self.pool: Executor = _create_executor(self.jobs, executor)
+        self._warm_pool()
+
+    def _warm_pool(self) -> None:
+        """全ワーカーを起動してプラグインを読み込ませる"""
+        futures = [self.pool.submit(_warm_up) for _ in range(self.jobs)]
+        for future in futures:
+            future.result()
+        logger.debug(f"Warmed up {self.jobs} workers")
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /convert でWebPを受け取りPNGを返す
+
+    クエリパラメータ profile, compress_level, mode で変換オプションを指定できる。
+    GET /healthz は死活確認用、GET /metrics はPrometheus形式のメトリクス。
+    """
+
+    # keep-aliveを有効にする
+    protocol_version = "HTTP/1.1"
+    server_version = f"webp2png/{__version__}"
+    server: ConversionServer
+
+    def setup(self) -> None:
+        # StreamRequestHandler は timeout をソケットに設定する
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path == "/healthz":
+            self._send(HTTPStatus.OK, b"ok\n", "text/plain; charset=utf-8")
+        elif path == "/metrics":
+            self._send(HTTPStatus.OK, self.server.metrics.render_prometheus().encode("utf-8"), PROMETHEUS_CONTENT_TYPE)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found")
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/convert":
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found", close=True)
+            return
+
+        try:
+            options = self._parse_options(url.query)
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e), close=True)
+            return
+
+        length_header = self.headers.get("Content-Length")
+        if length_header is None:
+            self._send_error(HTTPStatus.LENGTH_REQUIRED, "Content-Length is required", close=True)
+            return
+        try:
+            length = int(length_header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_error(HTTPStatus.BAD_REQUEST, "Invalid Content-Length", close=True)
+            return
+        if length > self.server.max_body_size:
+            # 本文を読まずに返すため、接続は閉じる
+            self._send_error(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"Request body too large ({length} > {self.server.max_body_size} bytes)",
+                close=True
+            )
+            return
+
+        # 本文を読む前に変換枠を確保し、同時に保持するボディの合計を max_concurrency 件分までに抑える
+        metrics = self.server.metrics
+        metrics.add_queued(1)
+        try:
+            acquired = self.server.slots.acquire(timeout=self.server.queue_timeout)
+        finally:
+            metrics.add_queued(-1)
+        if not acquired:
+            # 本文を読まずに返すため、接続は閉じる
+            self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, "Server is busy", close=True, headers={"Retry-After": "1"})
+            return
+        metrics.add_in_flight(1)
+        body = None
+        start_time = time.perf_counter()
+        try:
+            body = self.rfile.read(length)
+            if len(body) < length:
+                self._send_error(HTTPStatus.BAD_REQUEST, "Incomplete request body", close=True)
+                return
+            start_time = time.perf_counter()
+            png_data, stats = self.server.pool.submit(_convert_timed, body, **options).result()
+        except ConversionError as e:
+            metrics.record(STATUS_FAILED, time.perf_counter() - start_time, error_class=e.reason)
+            self._send_error(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            return
+        except Exception as e:
+            if body is None:
+                # 本文の受信中のタイムアウト・切断は応答を返せないため、接続ごと破棄する
+                raise
+            # ワーカープールの停止やメモリ不足など、変換処理の外で起きたエラー
+            logger.exception(f"Unexpected error while converting request: {e}")
+            metrics.record(STATUS_FAILED, time.perf_counter() - start_time, error_class=ERROR_UNEXPECTED)
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal server error")
+            return
+        finally:
+            metrics.add_in_flight(-1)
+            self.server.slots.release()
+        metrics.record(STATUS_SUCCESS, time.perf_counter() - start_time, stats)
+
+        self._send(HTTPStatus.OK, png_data, "image/png")
+
+    def _parse_options(self, query: str) -> Dict[str, Any]:
+        """クエリパラメータから変換オプションを取り出す"""
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        options: Dict[str, Any] = {'profile': params.get('profile', self.server.profile)}
+        if options['profile'] not in ENCODE_PROFILES:
+            raise ValueError(f"Unknown encode profile: {options['profile']}")
+        if 'compress_level' in params:
+            options['compress_level'] = int(params['compress_level'])
+            if not 0 <= options['compress_level'] <= 9:
+                raise ValueError(f"compress_level must be between 0 and 9: {options['compress_level']}")
+        options['mode'] = params.get('mode', MODE_AUTO)
+        if options['mode'] not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {options['mode']}")
+        return options
+
+    def _send(
+        self,
+        status: HTTPStatus,
+        body: bytes,
+        content_type: str,
+        close: bool = False,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(
+        self,
+        status: HTTPStatus,
+        message: str,
+        close: bool = False,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self._send(status, (message + "\n").encode("utf-8"), "text/plain; charset=utf-8", close, headers)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    **server_options: Any
+) -> None:
+    """
+    変換サービスを起動し、停止されるまで待ち受ける
+
+    Args:
+        host: 待ち受けるホスト
+        port: 待ち受けるポート
+        **server_options: ConversionServer に渡すオプション（jobs, max_concurrency など）
+    """
+    with ConversionServer((host, port), **server_options) as server:
+        logger.info(f"Serving on http://{host}:{server.server_address[1]}/convert ({server.jobs} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
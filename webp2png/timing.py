@@ -0,0 +1,235 @@
+"""Per-phase timing instrumentation for webp2png."""
+import csv
+import json
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, TextIO
+
+# 計測するフェーズ
+PHASE_PROBE = "probe"  # 入力のstat・オープン・シグネチャ確認
+PHASE_VALIDATE = "validate"  # 出力パスの生成・ディレクトリ確認・名前の確保
+PHASE_DECODE = "decode"  # WebPのデコード
+PHASE_CONVERT = "convert"  # 縮小・カラーモード変換
+PHASE_ENCODE = "encode"  # PNGエンコード（書き込み時間を除く）
+PHASE_WRITE = "write"  # ファイルへの書き込み・リネーム・fsync
+PHASES = (PHASE_PROBE, PHASE_VALIDATE, PHASE_DECODE, PHASE_CONVERT, PHASE_ENCODE, PHASE_WRITE)
+
+# 数量の項目
+COUNTERS = ("input_bytes", "output_bytes", "pixels")
+
+# サマリーに表示するパーセンタイル
+PERCENTILES = (50, 90, 99)
+
+
+class PhaseTimer:
+    """
+    1ファイル分のフェーズごとの所要時間を記録する
+
+    フェーズは入れ子にでき、外側のフェーズには内側のフェーズを除いた時間
+    （排他時間）が加算される。同じフェーズの時間は合計される。
+    1ファイルにつき1つ作り、スレッド間で共有しない。
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.pixels = 0
+        # 実行中のフェーズの内側で消費された時間
+        self._nested = 0.0
+
+    def phase(self, name: str) -> "_Phase":
+        """フェーズの所要時間を計測するコンテキストマネージャを返す"""
+        return _Phase(self, name)
+
+    def wrap_writer(self, output: BinaryIO) -> BinaryIO:
+        """書き込み時間と出力バイト数を記録するラッパーを返す"""
+        return _TimedWriter(output, self)
+
+    def merge(self, other: "PhaseTimer") -> None:
+        """別のタイマーのフェーズ時間と出力バイト数を加算する（並列に計測した分の合算用）"""
+        for name, elapsed in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+        self.output_bytes += other.output_bytes
+
+    def as_dict(self) -> Dict[str, Any]:
+        """計測結果を辞書として返す（未計測のフェーズは0）"""
+        stats: Dict[str, Any] = {phase: self.timings.get(phase, 0.0) for phase in PHASES}
+        stats.update(input_bytes=self.input_bytes, output_bytes=self.output_bytes, pixels=self.pixels)
+        return stats
+
+
+class _Phase:
+    __slots__ = ('_timer', '_name', '_start', '_outer_nested')
+
+    def __init__(self, timer: PhaseTimer, name: str) -> None:
+        self._timer = timer
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._outer_nested = self._timer._nested
+        self._timer._nested = 0.0
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        elapsed = time.perf_counter() - self._start
+        timer = self._timer
+        timer.timings[self._name] = timer.timings.get(self._name, 0.0) + elapsed - timer._nested
+        timer._nested = self._outer_nested + elapsed
+
+
+class _TimedWriter:
+    """write() の時間を write フェーズとして記録するファイルラッパー"""
+
+    def __init__(self, output: BinaryIO, timer: PhaseTimer) -> None:
+        self._output = output
+        self._timer = timer
+
+    def write(self, data: bytes) -> int:
+        with self._timer.phase(PHASE_WRITE):
+            written = self._output.write(data)
+        self._timer.output_bytes += len(data)
+        return written
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._output, name)
+
+
+class _NullTimer(PhaseTimer):
+    """計測しない場合のタイマー（呼び出しのコストをほぼゼロにする）"""
+
+    enabled = False
+    input_bytes = output_bytes = pixels = 0
+    _context = nullcontext()
+
+    def __init__(self) -> None:
+        pass
+
+    def phase(self, name: str) -> nullcontext:  # type: ignore[override]
+        return self._context
+
+    def wrap_writer(self, output: BinaryIO) -> BinaryIO:
+        return output
+
+    def merge(self, other: PhaseTimer) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # 数量の記録は無視する
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class TimingReport:
+    """
+    ファイルごとの計測結果をJSON lines/CSVに書き出し、サマリーを集計する
+
+    使い方:
+        with TimingReport(Path("report.csv")) as report:
+            for result in iter_convert(paths, collect_timings=True):
+                report.add(result)
+        print(report.summary())
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        """
+        Args:
+            path: 出力先（拡張子が .csv の場合はCSV、それ以外はJSON lines。Noneの場合は集計のみ）
+        """
+        self.path = path
+        self._samples: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        self._totals: Dict[str, int] = {counter: 0 for counter in COUNTERS}
+        self._elapsed: List[float] = []
+        self._file: Optional[TextIO] = None
+        self._csv: Optional[Any] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            if path.suffix.lower() == '.csv':
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(['input_path', 'output_path', 'status', 'elapsed', *PHASES, *COUNTERS])
+
+    def add(self, result: Any) -> None:
+        """
+        変換結果を1件追加する
+
+        Args:
+            result: stats を持つ ConversionResult（計測していない結果は無視する）
+        """
+        stats = result.stats
+        if stats is None:
+            return
+        for phase in PHASES:
+            self._samples[phase].append(stats[phase])
+        for counter in COUNTERS:
+            self._totals[counter] += stats[counter]
+        self._elapsed.append(result.elapsed)
+
+        if self._file is None:
+            return
+        output_path = str(result.output_path) if result.output_path else ''
+        if self._csv is not None:
+            self._csv.writerow([
+                str(result.input_path), output_path, result.status, f"{result.elapsed:.6f}",
+                *(f"{stats[phase]:.6f}" for phase in PHASES),
+                *(stats[counter] for counter in COUNTERS),
+            ])
+        else:
+            record = {
+                'input_path': str(result.input_path),
+                'output_path': output_path,
+                'status': result.status,
+                'elapsed': result.elapsed,
+                **stats,
+            }
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def summary(self) -> str:
+        """フェーズごとの合計・割合・パーセンタイルを表形式の文字列で返す"""
+        count = len(self._elapsed)
+        if count == 0:
+            return "No timing samples"
+        phase_total = sum(sum(samples) for samples in self._samples.values()) or 1.0
+        header = f"{'phase':<10}{'total s':>10}{'share':>8}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+        lines = [f"Timing summary ({count} files)", header]
+        for phase in PHASES:
+            samples = sorted(self._samples[phase])
+            total = sum(samples)
+            line = f"{phase:<10}{total:>10.3f}{total / phase_total:>8.1%}"
+            line += "".join(f"{_percentile(samples, p) * 1000:>10.2f}" for p in PERCENTILES)
+            lines.append(line)
+        elapsed = sorted(self._elapsed)
+        lines.append(
+            f"{'per file':<10}{sum(elapsed):>10.3f}{'':>8}"
+            + "".join(f"{_percentile(elapsed, p) * 1000:>10.2f}" for p in PERCENTILES)
+        )
+        lines.append(
+            f"input {self._totals['input_bytes']} bytes, output {self._totals['output_bytes']} bytes, "
+            f"{self._totals['pixels'] / 1e6:.1f} MP"
+        )
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        """出力ファイルを閉じる"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "TimingReport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    """ソート済みサンプルのパーセンタイル値を返す（最近傍法）"""
+    if not ordered:
+        return 0.0
+    index = min(int(len(ordered) * percent / 100), len(ordered) - 1)
+    return ordered[index]
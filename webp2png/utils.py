@@ -1,51 +1,214 @@
 """Utility functions for webp2png."""
+import errno
+import fnmatch
+import itertools
 import logging
+import os
+import stat
+import threading
+import uuid
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .validator import WEBP_HEADER_SIZE, OutputDirCache, has_webp_signature
 
-# ロギング設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
-def collect_webp_files(paths: List[Path], recursive: bool = False) -> List[Path]:
+def iter_webp_files(
+    paths: Iterable[Path],
+    recursive: bool = False,
+    detect_by_content: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None
+) -> Iterator[Path]:
     """
-    WebPファイルを収集する
+    WebPファイルを見つけた順に返す（os.scandir によるストリーミング探索）
+    
+    拡張子は大文字小文字を区別せずに判定する。シンボリックリンクのループは
+    ディレクトリのinodeで検出し、同じファイル（ハードリンク・リンク経由）は
+    (デバイス, inode) で重複を除く。
     
     Args:
-        paths: 検索対象のパスリスト（ファイルまたはディレクトリ）
+        paths: 検索対象のパス（ファイルまたはディレクトリ）
         recursive: 再帰的にディレクトリを探索するか
+        detect_by_content: 拡張子ではなくRIFF/WEBPのマジックナンバーで判定するか
+        include: ディレクトリ内のファイルに適用する包含パターン（fnmatch形式、いずれかに一致したもののみ）
+        exclude: ディレクトリ内のファイル・サブディレクトリに適用する除外パターン（fnmatch形式）
         
-    Returns:
-        WebPファイルのパスリスト
+    Yields:
+        WebPファイルのパス（探索順、ソートはしない）
     """
-    webp_files = []
+    seen_files: Set[Tuple[int, int]] = set()
+    seen_dirs: Set[Tuple[int, int]] = set()
     
     for path in paths:
         path = Path(path)
         
-        if not path.exists():
+        try:
+            st = path.stat()
+        except OSError:
             logger.warning(f"Path does not exist: {path}")
             continue
-            
-        if path.is_file():
-            if path.suffix.lower() == '.webp':
-                webp_files.append(path)
+        
+        if stat.S_ISDIR(st.st_mode):
+            yield from _walk_dir(path, st, recursive, detect_by_content, include, exclude, seen_files, seen_dirs)
+        elif stat.S_ISREG(st.st_mode):
+            key = (st.st_dev, st.st_ino)
+            if key in seen_files:
+                continue
+            if _is_webp_candidate(path.name, str(path), detect_by_content):
+                seen_files.add(key)
+                yield path
             else:
                 logger.warning(f"Not a WebP file: {path}")
-        elif path.is_dir():
-            pattern = "**/*.webp" if recursive else "*.webp"
-            webp_files.extend(path.glob(pattern))
+
+
+def _walk_dir(
+    root: Path,
+    root_stat: os.stat_result,
+    recursive: bool,
+    detect_by_content: bool,
+    include: Optional[Sequence[str]],
+    exclude: Optional[Sequence[str]],
+    seen_files: Set[Tuple[int, int]],
+    seen_dirs: Set[Tuple[int, int]]
+) -> Iterator[Path]:
+    """ディレクトリを深さ優先で探索する（スタックを使い、再帰呼び出しはしない）"""
+    root_key = (root_stat.st_dev, root_stat.st_ino)
+    if root_key in seen_dirs:
+        return
+    seen_dirs.add(root_key)
+    
+    # (ディレクトリのパス, デバイス番号, ルートからの相対パス)
+    stack = [(str(root), root_stat.st_dev, "")]
+    while stack:
+        directory, dev, rel_dir = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            logger.warning(f"Cannot read directory {directory}: {e}")
+            continue
+        
+        subdirs = []
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}{entry.name}"
+                try:
+                    if entry.is_dir():
+                        if not recursive or _matches_any(entry.name, rel_path, exclude):
+                            continue
+                        sub_stat = entry.stat()
+                        key = (sub_stat.st_dev, sub_stat.st_ino)
+                        if key in seen_dirs:
+                            logger.debug(f"Skipping already visited directory: {entry.path}")
+                            continue
+                        seen_dirs.add(key)
+                        subdirs.append((entry.path, sub_stat.st_dev, f"{rel_path}/"))
+                    elif entry.is_file():
+                        if include and not _matches_any(entry.name, rel_path, include):
+                            continue
+                        if _matches_any(entry.name, rel_path, exclude):
+                            continue
+                        if not _is_webp_candidate(entry.name, entry.path, detect_by_content):
+                            continue
+                        # リンクでなければreaddirで得たinodeを使い、statを省く
+                        if entry.is_symlink():
+                            file_stat = entry.stat()
+                            key = (file_stat.st_dev, file_stat.st_ino)
+                        else:
+                            key = (dev, entry.inode())
+                        if key in seen_files:
+                            continue
+                        seen_files.add(key)
+                        yield Path(entry.path)
+                except OSError as e:
+                    logger.debug(f"Skipping {entry.path}: {e}")
+        
+        # 見つけた順に探索するよう、逆順に積む
+        stack.extend(reversed(subdirs))
+
+
+def _matches_any(name: str, rel_path: str, patterns: Optional[Sequence[str]]) -> bool:
+    """ファイル名または相対パスがいずれかのパターンに一致するか"""
+    if not patterns:
+        return False
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern) for pattern in patterns)
+
+
+def _is_webp_candidate(name: str, path: str, detect_by_content: bool) -> bool:
+    """拡張子（大文字小文字を区別しない）またはマジックナンバーでWebPか判定する"""
+    if not detect_by_content:
+        return name.lower().endswith('.webp')
+    try:
+        with open(path, 'rb') as f:
+            return has_webp_signature(f.read(WEBP_HEADER_SIZE))
+    except OSError:
+        return False
+
+
+def matches_filters(
+    path: Path,
+    root: Path,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None
+) -> bool:
+    """
+    ディレクトリ配下のファイルが探索時と同じ包含・除外パターンを満たすか判定する
+
+    iter_webp_files と同じく、除外パターンは途中のサブディレクトリにも適用する。
+
+    Args:
+        path: 判定するファイルのパス
+        root: 探索の起点のディレクトリ
+        include: 包含パターン（fnmatch形式）
+        exclude: 除外パターン（fnmatch形式）
+
+    Returns:
+        変換対象に含まれる場合はTrue（root の外のパスはFalse）
+    """
+    try:
+        parts = Path(path).relative_to(root).parts
+    except ValueError:
+        return False
+    for i in range(len(parts) - 1):
+        if _matches_any(parts[i], "/".join(parts[:i + 1]), exclude):
+            return False
+    rel_path = "/".join(parts)
+    if include and not _matches_any(parts[-1], rel_path, include):
+        return False
+    return not _matches_any(parts[-1], rel_path, exclude)
+
+
+def collect_webp_files(
+    paths: List[Path],
+    recursive: bool = False,
+    sort: bool = True,
+    **walk_options: Any
+) -> List[Path]:
+    """
+    WebPファイルを収集する
     
-    return sorted(set(webp_files))
+    Args:
+        paths: 検索対象のパスリスト（ファイルまたはディレクトリ）
+        recursive: 再帰的にディレクトリを探索するか
+        sort: パス順にソートするか（Falseの場合は探索順）
+        **walk_options: iter_webp_files に渡すオプション（detect_by_content, include, exclude）
+        
+    Returns:
+        WebPファイルのパスリスト
+    """
+    webp_files = list(iter_webp_files(paths, recursive=recursive, **walk_options))
+    if sort:
+        webp_files.sort()
+    return webp_files
 
 
-def ensure_output_dir(output_path: Path) -> None:
-    """出力ディレクトリが存在しない場合は作成する"""
+def ensure_output_dir(output_path: Path, dir_cache: Optional[OutputDirCache] = None) -> None:
+    """出力ディレクトリが存在しない場合は作成する（キャッシュで検証済みの場合は何もしない）"""
     output_dir = output_path.parent
+    if dir_cache is not None and dir_cache.is_verified(output_dir):
+        return
     if not output_dir.exists():
         output_dir.mkdir(parents=True, exist_ok=True)
         logger.debug(f"Created output directory: {output_dir}")
@@ -70,33 +233,342 @@ def generate_output_path(input_path: Path, output_dir: Optional[Path] = None) ->
     return output_path
 
 
-def handle_file_conflict(output_path: Path, force: bool = False) -> Path:
+class OutputNameAllocator:
+    """
+    出力ファイル名をディレクトリ単位で割り当てるアロケータ
+    
+    ディレクトリは最初の割り当て時に1回だけ走査して使用済みの名前を記録し、
+    以降は番号の候補をメモリ上で判定する。確保はメモリ上だけで行い、ファイルは作成しない。
+    別プロセスとの衝突は、公開時に既存のファイルを置き換えないことで防ぐ（publish_output）。
+    1回のバッチ実行の間だけ使う。
+    """
+    
+    def __init__(self) -> None:
+        self._taken: Dict[Path, Set[str]] = {}
+        # (ディレクトリ, 語幹, 拡張子) ごとに次に試す番号
+        self._next_counter: Dict[Tuple[Path, str, str], int] = {}
+        self._lock = threading.Lock()
+    
+    def reserve(self, output_path: Path) -> Path:
+        """
+        出力パス、または番号を付与したパスをメモリ上で確保する
+        
+        Args:
+            output_path: 希望する出力パス
+            
+        Returns:
+            確保したパス（ファイルは作成しない）
+        """
+        directory = output_path.parent
+        key = (directory, output_path.stem, output_path.suffix)
+        with self._lock:
+            taken = self._taken.get(directory)
+            if taken is None:
+                taken = self._taken[directory] = _scan_names(directory)
+            counter = self._next_counter.get(key, 0)
+            while True:
+                name = _numbered_name(output_path, counter)
+                counter += 1
+                if name not in taken:
+                    break
+            taken.add(name)
+            self._next_counter[key] = counter
+            return directory / name
+    
+    def release(self, output_path: Path) -> None:
+        """確保した名前を解放する"""
+        directory = output_path.parent
+        with self._lock:
+            taken = self._taken.get(directory)
+            if taken is not None:
+                taken.discard(output_path.name)
+            # 解放した番号も再利用できるよう、候補を先頭から探し直させる（失敗時のみなので頻度は低い）
+            self._next_counter.clear()
+
+
+def _scan_names(directory: Path) -> Set[str]:
+    """ディレクトリ内の名前を1回の走査で取得する"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
+
+
+def _numbered_name(output_path: Path, counter: int) -> str:
+    """番号付きのファイル名を返す（0の場合は元の名前）"""
+    if counter == 0:
+        return output_path.name
+    return f"{output_path.stem}_{counter}{output_path.suffix}"
+
+
+def _candidate_paths(output_path: Path, name_allocator: Optional[OutputNameAllocator]) -> Iterator[Path]:
+    """上書きしない場合に試す出力パスを順に返す（元の名前、_1、_2、…）"""
+    if name_allocator is not None:
+        while True:
+            yield name_allocator.reserve(output_path)
+    else:
+        for counter in itertools.count():
+            yield output_path.parent / _numbered_name(output_path, counter)
+
+
+# ハードリンクに対応しないファイルシステムで os.link が返すエラー
+_LINK_UNSUPPORTED = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL}
+
+
+def _link_no_clobber(source: Path, path: Path) -> None:
+    """
+    source を path に移す（path が既に存在する場合は FileExistsError）
+    
+    ハードリンクを作ってから source を削除するため、path には完成したファイルだけが現れる。
+    """
+    try:
+        os.link(source, path)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in _LINK_UNSUPPORTED:
+            raise
+        # ハードリンクを作れない場合は、空ファイルで名前を確保してから置き換える
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        try:
+            os.replace(source, path)
+        except BaseException:
+            path.unlink()
+            raise
+        return
+    os.unlink(source)
+
+
+def publish_output(
+    temp_path: Path,
+    output_path: Path,
+    overwrite: bool = True,
+    name_allocator: Optional[OutputNameAllocator] = None
+) -> Path:
     """
-    ファイル競合を処理する
+    書き込みを終えた一時ファイルを出力パスに公開する
+    
+    上書きしない場合は既存のファイルを置き換えず、番号を付与した名前で公開する。
+    名前の確認と公開は1回のリンクで行うため、並列ワーカーや別プロセスと衝突しない。
     
     Args:
-        output_path: 出力ファイルのパス
-        force: 既存ファイルを上書きするか
+        temp_path: 書き込み済みの一時ファイル（出力パスと同じディレクトリ）
+        output_path: 希望する出力パス
+        overwrite: 既存ファイルを上書きするか
+        name_allocator: バッチ内で共有するファイル名アロケータ（Noneの場合は都度確認する）
         
     Returns:
-        実際に使用する出力パス
+        実際に公開した出力パス
+        
+    Raises:
+        OSError: 公開できない場合
     """
-    if not output_path.exists():
+    if overwrite:
+        if output_path.exists():
+            logger.info(f"Overwriting existing file: {output_path}")
+        os.replace(temp_path, output_path)
         return output_path
     
-    if force:
-        logger.info(f"Overwriting existing file: {output_path}")
-        return output_path
-    else:
-        # 番号を付与して新しいファイル名を生成
-        counter = 1
-        base_path = output_path.parent / output_path.stem
-        extension = output_path.suffix
+    candidates = _candidate_paths(output_path, name_allocator)
+    while True:
+        candidate = next(candidates)
+        try:
+            _link_no_clobber(temp_path, candidate)
+        except FileExistsError:
+            # 既に存在する（アロケータの走査後に別のプロセスが作成した場合を含む）ため次の番号を試す
+            continue
+        except BaseException:
+            if name_allocator is not None:
+                name_allocator.release(candidate)
+            raise
+        if candidate != output_path:
+            logger.info(f"File exists, using: {candidate}")
+        return candidate
+
+
+def open_output(
+    output_path: Path,
+    overwrite: bool = True,
+    name_allocator: Optional[OutputNameAllocator] = None
+) -> Tuple[BinaryIO, Path]:
+    """
+    出力パスに直接書き込むファイルを開く（一時ファイルを使わない場合）
+    
+    上書きしない場合は既存のファイルを置き換えず、番号を付与した名前で作成する。
+    
+    Args:
+        output_path: 希望する出力パス
+        overwrite: 既存ファイルを上書きするか
+        name_allocator: バッチ内で共有するファイル名アロケータ（Noneの場合は都度確認する）
         
+    Returns:
+        書き込み用のファイルと、実際に作成した出力パス
+        
+    Raises:
+        OSError: ファイルを作成できない場合
+    """
+    if overwrite:
+        if output_path.exists():
+            logger.info(f"Overwriting existing file: {output_path}")
+        return open(output_path, 'wb'), output_path
+    
+    candidates = _candidate_paths(output_path, name_allocator)
+    while True:
+        candidate = next(candidates)
+        try:
+            fd = os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        except FileExistsError:
+            continue
+        except BaseException:
+            if name_allocator is not None:
+                name_allocator.release(candidate)
+            raise
+        if candidate != output_path:
+            logger.info(f"File exists, using: {candidate}")
+        return os.fdopen(fd, 'wb'), candidate
+
+
+def release_output_path(output_path: Path, name_allocator: Optional[OutputNameAllocator] = None) -> None:
+    """公開した出力ファイルを削除し、名前を解放する"""
+    try:
+        output_path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove {output_path}: {e}")
+    if name_allocator is not None:
+        name_allocator.release(output_path)
+
+
+class AtomicWriter:
+    """
+    同じディレクトリの一時ファイルに書き込み、完了後に出力パスへ公開するコンテキストマネージャ
+    
+    途中で中断された場合も出力パスには書きかけのファイルが残らない。
+    公開したパスは抜けた後に path で参照できる（上書きしない場合は番号付きの名前になることがある）。
+    """
+    
+    def __init__(
+        self,
+        output_path: Path,
+        fsync: bool = False,
+        overwrite: bool = True,
+        name_allocator: Optional[OutputNameAllocator] = None
+    ) -> None:
+        """
+        Args:
+            output_path: 希望する出力パス
+            fsync: 公開前にファイルを、公開後にディレクトリをfsyncするか
+            overwrite: 既存ファイルを上書きするか（Falseの場合は番号を付与した名前で公開する）
+            name_allocator: バッチ内で共有するファイル名アロケータ
+        """
+        self.path = output_path
+        self.fsync = fsync
+        self.overwrite = overwrite
+        self.name_allocator = name_allocator
+        self._temp_path: Optional[Path] = None
+        self._file: Optional[BinaryIO] = None
+    
+    def __enter__(self) -> BinaryIO:
+        directory = self.path.parent
         while True:
-            new_path = Path(f"{base_path}_{counter}{extension}")
-            if not new_path.exists():
-                logger.info(f"File exists, using: {new_path}")
-                return new_path
-            counter += 1
+            # 入力の探索や出力の一覧に紛れないよう、隠しファイル・別拡張子にする
+            temp_path = directory / f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+                break
+            except FileExistsError:
+                continue
+        self._temp_path = temp_path
+        self._file = os.fdopen(fd, 'wb')
+        return self._file
+    
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        assert self._temp_path is not None and self._file is not None
+        published = False
+        try:
+            with self._file as f:
+                if exc_type is None and self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if exc_type is None:
+                self.path = publish_output(self._temp_path, self.path, self.overwrite, self.name_allocator)
+                published = True
+        finally:
+            if not published:
+                try:
+                    self._temp_path.unlink()
+                except OSError:
+                    pass
+        
+        if published and self.fsync:
+            fsync_directory(self.path.parent)
 
+
+def atomic_write(
+    output_path: Path,
+    fsync: bool = False,
+    overwrite: bool = True,
+    name_allocator: Optional[OutputNameAllocator] = None
+) -> AtomicWriter:
+    """
+    同じディレクトリの一時ファイルに書き込み、完了後に出力パスへ公開する
+    
+    使い方:
+        writer = atomic_write(output_path, overwrite=False)
+        with writer as f:
+            f.write(data)
+        saved_path = writer.path
+    
+    Args:
+        output_path: 希望する出力パス
+        fsync: 公開前にファイルを、公開後にディレクトリをfsyncするか
+        overwrite: 既存ファイルを上書きするか（Falseの場合は番号を付与した名前で公開する）
+        name_allocator: バッチ内で共有するファイル名アロケータ
+        
+    Returns:
+        書き込み用のファイルを返すコンテキストマネージャ
+    """
+    return AtomicWriter(output_path, fsync, overwrite, name_allocator)
+
+
+def fsync_directory(directory: Path) -> None:
+    """ディレクトリをfsyncし、作成・リネームしたエントリを永続化する"""
+    # Windowsではディレクトリを開けないため何もしない
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_files(paths: Iterable[Path]) -> None:
+    """
+    バッチで書き込んだファイルをまとめて永続化する
+    
+    書き込み中はfsyncせず、バッチの終了時に書き込んだファイルを1つずつfsyncしてから、
+    それぞれの親ディレクトリを1回ずつfsyncする（ファイルシステム全体の同期は行わない）。
+    
+    Args:
+        paths: バッチで書き込んだ出力ファイル
+    """
+    directories: Set[Path] = set()
+    for path in paths:
+        try:
+            # Windowsでは書き込み可能なハンドルでないとfsyncできない
+            fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.warning(f"Could not fsync {path}: {e}")
+        directories.add(path.parent)
+    for directory in directories:
+        try:
+            fsync_directory(directory)
+        except OSError as e:
+            logger.warning(f"Could not fsync directory {directory}: {e}")
@@ -1,13 +1,69 @@
 """Validation functions for webp2png."""
+import errno
 import logging
+import os
+import stat
+import threading
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Optional, Set, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
 # デフォルトのファイルサイズ制限（100MB）
 MAX_FILE_SIZE = 100 * 1024 * 1024
 
+# WebPヘッダの判定に必要なバイト数
+WEBP_HEADER_SIZE = 12
+
+# Path.exists() が「存在しない」として扱うエラー番号
+_NOT_EXISTS_ERRNOS = (errno.ENOENT, errno.ENOTDIR, errno.EBADF, errno.ELOOP)
+
+
+class OutputDirCache:
+    """
+    作成・書き込み確認済みの出力ディレクトリを記録するキャッシュ
+    
+    1回のバッチ実行の間だけ使い、同じディレクトリへの mkdir と
+    書き込みテストをファイルごとに繰り返さないようにする。
+    書き込みに失敗した場合は invalidate() で再検証させる。
+    """
+    
+    def __init__(self) -> None:
+        self._verified: Set[Path] = set()
+        self._lock = threading.Lock()
+    
+    def is_verified(self, directory: Path) -> bool:
+        """検証済みのディレクトリかどうか"""
+        with self._lock:
+            return directory in self._verified
+    
+    def mark_verified(self, directory: Path) -> None:
+        """ディレクトリを検証済みとして記録する"""
+        with self._lock:
+            self._verified.add(directory)
+    
+    def invalidate(self, directory: Path) -> None:
+        """ディレクトリの検証結果を破棄する"""
+        with self._lock:
+            self._verified.discard(directory)
+        logger.debug(f"Invalidated output directory cache: {directory}")
+
+
+def has_webp_signature(header: bytes) -> bool:
+    """
+    先頭バイト列がWebPのマジックナンバーを持つかどうかを判定する
+    
+    Args:
+        header: ファイル先頭のバイト列（12バイト以上）
+        
+    Returns:
+        WebPのマジックナンバーの場合True
+    """
+    # WebPのマジックナンバー: "RIFF" + 4バイト + "WEBP"
+    if len(header) < WEBP_HEADER_SIZE:
+        return False
+    return header[0:4] == b'RIFF' and header[8:12] == b'WEBP'
+
 
 def is_webp_file(file_path: Path) -> bool:
     """
@@ -21,67 +77,119 @@ def is_webp_file(file_path: Path) -> bool:
     """
     try:
         with open(file_path, 'rb') as f:
-            header = f.read(12)
-            # WebPのマジックナンバー: "RIFF" + 4バイト + "WEBP"
-            if len(header) >= 12:
-                return header[0:4] == b'RIFF' and header[8:12] == b'WEBP'
+            return has_webp_signature(f.read(WEBP_HEADER_SIZE))
     except Exception as e:
         logger.error(f"Error reading file header: {e}")
         return False
-    
-    return False
 
 
-def validate_input_file(file_path: Path) -> Tuple[bool, str]:
+def open_input_file(file_path: Path) -> Tuple[Optional[BinaryIO], str]:
     """
-    入力ファイルを検証する
+    入力ファイルを検証し、開いたファイルを返す
+    
+    validate_input_file と同じ基準・同じエラーメッセージで検証するが、
+    メタデータ取得は1回のstat、読み込みは1回のopenで済ませる。
+    返されたファイルは読み取り位置が先頭に戻っており、そのままデコーダに渡せる。
     
     Args:
         file_path: 検証するファイルのパス
         
     Returns:
-        (検証成功フラグ, エラーメッセージ)
+        (開いたファイル or None（検証失敗時）, エラーメッセージ)
     """
-    # ファイル存在確認
-    if not file_path.exists():
-        return False, f"File does not exist: {file_path}"
+    # ファイル存在確認・種別・権限・サイズを1回のstatで取得
+    try:
+        st = os.stat(file_path)
+    except OSError as e:
+        if e.errno in _NOT_EXISTS_ERRNOS:
+            return None, f"File does not exist: {file_path}"
+        return None, f"Cannot access file {file_path}: {e}"
     
     # ファイルかどうか確認
-    if not file_path.is_file():
-        return False, f"Not a file: {file_path}"
+    if not stat.S_ISREG(st.st_mode):
+        return None, f"Not a file: {file_path}"
     
     # 読み取り権限確認
-    if not file_path.stat().st_mode & 0o044:
-        return False, f"No read permission: {file_path}"
+    if not st.st_mode & 0o044:
+        return None, f"No read permission: {file_path}"
     
     # ファイルサイズ確認
-    file_size = file_path.stat().st_size
+    file_size = st.st_size
     if file_size == 0:
-        return False, f"File is empty: {file_path}"
+        return None, f"File is empty: {file_path}"
     
     if file_size > MAX_FILE_SIZE:
-        return False, f"File too large ({file_size / 1024 / 1024:.2f}MB > {MAX_FILE_SIZE / 1024 / 1024}MB): {file_path}"
+        return None, f"File too large ({file_size / 1024 / 1024:.2f}MB > {MAX_FILE_SIZE / 1024 / 1024}MB): {file_path}"
     
-    # WebP形式確認
-    if not is_webp_file(file_path):
-        return False, f"Not a valid WebP file: {file_path}"
+    # WebP形式確認（開いたファイルはそのまま呼び出し元へ渡す）
+    f = None
+    try:
+        f = open(file_path, 'rb')
+        if has_webp_signature(f.read(WEBP_HEADER_SIZE)):
+            f.seek(0)
+            return f, ""
+    except Exception as e:
+        logger.error(f"Error reading file header: {e}")
     
+    if f is not None:
+        f.close()
+    return None, f"Not a valid WebP file: {file_path}"
+
+
+def validate_input_file(file_path: Path) -> Tuple[bool, str]:
+    """
+    入力ファイルを検証する
+    
+    Args:
+        file_path: 検証するファイルのパス
+        
+    Returns:
+        (検証成功フラグ, エラーメッセージ)
+    """
+    f, error_msg = open_input_file(file_path)
+    if f is None:
+        return False, error_msg
+    
+    f.close()
     return True, ""
 
 
-def validate_output_path(output_path: Path, force: bool = False) -> Tuple[bool, str]:
+def validate_input_bytes(data: Union[bytes, bytearray, memoryview]) -> Tuple[bool, str]:
     """
-    出力パスを検証する
+    メモリ上の入力データを検証する（validate_input_file と同じ基準）
     
     Args:
-        output_path: 検証する出力パスのパス
-        force: 既存ファイルを上書きするか
+        data: 検証するデータ
         
     Returns:
         (検証成功フラグ, エラーメッセージ)
     """
-    output_dir = output_path.parent
+    if isinstance(data, memoryview):
+        data = data.cast('B')
+    data_size = len(data)
+    if data_size == 0:
+        return False, "Input data is empty"
     
+    if data_size > MAX_FILE_SIZE:
+        return False, f"Input data too large ({data_size / 1024 / 1024:.2f}MB > {MAX_FILE_SIZE / 1024 / 1024}MB)"
+    
+    # WebP形式確認
+    if not has_webp_signature(bytes(data[:WEBP_HEADER_SIZE])):
+        return False, "Not a valid WebP data"
+    
+    return True, ""
+
+
+def validate_output_dir(output_dir: Path) -> Tuple[bool, str]:
+    """
+    出力ディレクトリを検証する（存在しない場合は作成する）
+    
+    Args:
+        output_dir: 検証する出力ディレクトリ
+        
+    Returns:
+        (検証成功フラグ, エラーメッセージ)
+    """
     # ディレクトリの存在確認と作成
     if output_dir.exists():
         if not output_dir.is_dir():
@@ -98,7 +206,8 @@ def validate_output_path(output_path: Path, force: bool = False) -> Tuple[bool,
     
     # 書き込み権限の確認（実際に書き込みテストファイルを作成して確認）
     try:
-        test_file = output_dir / ".webp2png_write_test"
+        # 並列ワーカーが同じディレクトリを同時に確認しても衝突しないよう、名前をスレッドごとに分ける
+        test_file = output_dir / f".webp2png_write_test.{os.getpid()}.{threading.get_ident()}"
         test_file.touch()
         test_file.unlink()
     except PermissionError:
@@ -106,9 +215,36 @@ def validate_output_path(output_path: Path, force: bool = False) -> Tuple[bool,
     except Exception as e:
         return False, f"Cannot write to directory {output_dir}: {e}"
     
+    return True, ""
+
+
+def validate_output_path(
+    output_path: Path,
+    force: bool = False,
+    dir_cache: Optional[OutputDirCache] = None
+) -> Tuple[bool, str]:
+    """
+    出力パスを検証する
+    
+    Args:
+        output_path: 検証する出力パスのパス
+        force: 既存ファイルを上書きするか
+        dir_cache: 検証済み出力ディレクトリのキャッシュ（指定時はディレクトリ検証を1回に抑える）
+        
+    Returns:
+        (検証成功フラグ, エラーメッセージ)
+    """
+    output_dir = output_path.parent
+    
+    if dir_cache is None or not dir_cache.is_verified(output_dir):
+        is_valid, error_msg = validate_output_dir(output_dir)
+        if not is_valid:
+            return False, error_msg
+        if dir_cache is not None:
+            dir_cache.mark_verified(output_dir)
+    
     # 既存ファイルの確認
     if output_path.exists() and not force:
         return False, f"Output file already exists (use --force to overwrite): {output_path}"
     
     return True, ""
-
@@ -0,0 +1,534 @@
+"""Directory watch mode for webp2png."""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .constants import (
+    BACKEND_AUTO,
+    BACKEND_CHOICES,
+    BACKEND_INOTIFY,
+    BACKEND_POLL,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_POLL_INTERVAL,
+    DURABILITY_BATCH,
+    DURABILITY_FILE,
+    EXECUTOR_AUTO,
+)
+from .converter import (
+    STATUS_SUCCESS,
+    ConversionResult,
+    _convert_one,
+    _create_executor,
+    _validate_convert_options,
+    default_jobs,
+)
+from .manifest import MANIFEST_NAME, Manifest, options_key
+from .utils import OutputNameAllocator, _is_webp_candidate, generate_output_path, iter_webp_files, matches_filters
+from .validator import OutputDirCache
+
+logger = logging.getLogger(__name__)
+
+# イベントループの1回の待ち時間（秒）
+_TICK = 0.2
+
+# 変更の種類
+EVENT_WRITTEN = "written"  # 書き込みが閉じられた、または移動してきた（ポーリングでは変化を検出した）
+EVENT_MODIFIED = "modified"  # 書き込み中（待機中のファイルの待ち時間を延ばす）
+EVENT_RESCAN = "rescan"  # ディレクトリを走査し直す（新しいサブディレクトリ、イベントの取りこぼし）
+
+# inotifyの定数（<sys/inotify.h>）
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_ONLYDIR
+# struct inotify_event の固定長部分（wd, mask, cookie, len）
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _InotifySource:
+    """inotifyでディレクトリを監視する（Linuxのみ）"""
+
+    name = BACKEND_INOTIFY
+
+    def __init__(self, root: Path, recursive: bool) -> None:
+        """
+        Raises:
+            OSError: inotifyが使えない場合
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not supported by the C library")
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.root = root
+        self.recursive = recursive
+        self._dirs: Dict[int, Path] = {}
+        self._add_tree(root)
+
+    def _add_tree(self, directory: Path) -> None:
+        """ディレクトリ（再帰時はサブディレクトリも）を監視対象に加える"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(current), _WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                logger.warning(f"Cannot watch {current}: {os.strerror(errno)}")
+                continue
+            self._dirs[wd] = current
+            if not self.recursive:
+                continue
+            try:
+                with os.scandir(current) as entries:
+                    stack.extend(Path(entry.path) for entry in entries if entry.is_dir(follow_symlinks=False))
+            except OSError as e:
+                logger.warning(f"Cannot read directory {current}: {e}")
+
+    def poll(self, timeout: float) -> List[Tuple[Path, str]]:
+        """最大timeout秒待ち、届いたイベントを (パス, 変更の種類) の一覧で返す"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+
+        events: List[Tuple[Path, str]] = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+                name = data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + length].rstrip(b'\0')
+                pos += _EVENT_HEADER.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    # イベントを取りこぼしたため全体を走査し直す
+                    logger.warning("inotify event queue overflowed, rescanning")
+                    events.append((self.root, EVENT_RESCAN))
+                    continue
+                if mask & _IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & _IN_ISDIR:
+                    if self.recursive and mask & (_IN_CREATE | _IN_MOVED_TO):
+                        # 監視を始める前に作られたファイルがあるため、中身を走査する
+                        self._add_tree(path)
+                        events.append((path, EVENT_RESCAN))
+                elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                    events.append((path, EVENT_WRITTEN))
+                elif mask & _IN_MODIFY:
+                    events.append((path, EVENT_MODIFIED))
+        return events
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingSource:
+    """ディレクトリを定期的に走査し、サイズ・更新時刻が変わったファイルを検出する"""
+
+    name = BACKEND_POLL
+
+    def __init__(
+        self,
+        root: Path,
+        recursive: bool,
+        interval: float,
+        walk_options: Dict[str, Any]
+    ) -> None:
+        self.root = root
+        self.recursive = recursive
+        self.interval = interval
+        self._walk_options = walk_options
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for path in iter_webp_files([self.root], recursive=self.recursive, **self._walk_options):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout: float) -> List[Tuple[Path, str]]:
+        """最大timeout秒待ち、走査の時刻になっていれば変化したファイルを返す"""
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        current = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+        changed = [(path, EVENT_WRITTEN) for path, signature in current.items() if self._snapshot.get(path) != signature]
+        self._snapshot = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class Watcher:
+    """
+    ディレクトリを監視し、追加・更新されたWebPを常駐のワーカープールで変換する
+
+    起動時に一度ディレクトリ全体を走査し、マニフェストに記録がなく出力も古い（または
+    存在しない）入力だけを変換する。その後はinotify（使えない環境ではポーリング）で
+    変更を検出する。書きかけのファイルを変換しないよう、書き込みが閉じられてから
+    （ポーリングでは変化を検出してから）debounce 秒サイズが変わらないことを確認して投入する。
+
+    使い方:
+        stop = threading.Event()
+        with Watcher(Path("incoming"), output_dir=Path("png")) as watcher:
+            watcher.run(stop)  # 別スレッドから stop.set() で終了
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        output_dir: Optional[Path] = None,
+        recursive: bool = True,
+        force: bool = False,
+        preserve_metadata: bool = True,
+        jobs: Optional[int] = None,
+        executor: str = EXECUTOR_AUTO,
+        backend: str = BACKEND_AUTO,
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        manifest: Optional[Manifest] = None,
+        detect_by_content: bool = False,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        on_result: Optional[Callable[[ConversionResult], None]] = None,
+        **convert_options: Any
+    ) -> None:
+        """
+        Args:
+            root: 監視するディレクトリ
+            output_dir: 出力ディレクトリ（Noneの場合は各入力ファイルと同じディレクトリ）
+            recursive: サブディレクトリも監視するか
+            force: 既存ファイルを上書きするか（更新された入力の出力は常に上書きする）
+            preserve_metadata: メタデータを保持するか
+            jobs: ワーカー数（Noneの場合はCPUコア数）
+            executor: ワーカープールの種類（"auto", "thread", "process"）
+            backend: 変更の検出方法（"auto", "inotify", "poll"）
+            debounce: 書き込み完了とみなすまでにサイズが変わらないことを確認する秒数
+            poll_interval: ポーリング時の走査間隔（秒）
+            manifest: 変換済みの入力を記録するマニフェスト（Noneの場合は出力ディレクトリ、
+                なければ監視ディレクトリの .webp2png-manifest.jsonl を使う）
+            detect_by_content: 拡張子ではなくRIFF/WEBPのマジックナンバーで判定するか
+            include: 包含パターン（fnmatch形式）
+            exclude: 除外パターン（fnmatch形式）
+            on_result: 変換が完了するたびに結果を受け取る関数
+            **convert_options: convert_webp_to_png に渡す追加オプション（profile, compress_level など）
+
+        Raises:
+            ValueError: 不明な検出方法、またはディレクトリでない場合
+            ConversionError: 変換オプションが不正な場合
+            OSError: inotifyを指定したが使えない場合
+        """
+        if backend not in BACKEND_CHOICES:
+            raise ValueError(f"Unknown watch backend: {backend} (choose from {', '.join(BACKEND_CHOICES)})")
+        self.root = Path(root)
+        if not self.root.is_dir():
+            raise ValueError(f"Not a directory: {self.root}")
+        _validate_convert_options(convert_options)
+        # 監視モードにはバッチの終わりがないため、ファイルごとに同期する
+        if convert_options.get('durability') == DURABILITY_BATCH:
+            convert_options = dict(convert_options, durability=DURABILITY_FILE)
+
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.recursive = recursive
+        self.force = force
+        self.preserve_metadata = preserve_metadata
+        self.debounce = debounce
+        self.on_result = on_result
+        self.convert_options = convert_options
+        self.include = include
+        self.exclude = exclude
+        self.detect_by_content = detect_by_content
+
+        self._owns_manifest = manifest is None
+        if manifest is None:
+            manifest = Manifest((self.output_dir or self.root) / MANIFEST_NAME)
+        self.manifest = manifest
+        # 変換オプションを変えて起動した場合は変換済みの入力も変換し直す
+        self._options_key = options_key(convert_options, preserve_metadata)
+
+        self._source = self._open_source(backend, poll_interval)
+        self.backend = self._source.name
+
+        self.jobs = jobs or default_jobs()
+        self._pool = _create_executor(self.jobs, executor)
+        # プロセスプールにはロックを持つキャッシュを渡せない
+        if isinstance(self._pool, ProcessPoolExecutor):
+            self._dir_cache: Optional[OutputDirCache] = None
+            self._name_allocator: Optional[OutputNameAllocator] = None
+        else:
+            self._dir_cache = OutputDirCache()
+            self._name_allocator = OutputNameAllocator()
+
+        # 書き込み完了を待っている入力: パス -> (最後の変更時刻, その時点のサイズ)
+        self._pending: Dict[Path, Tuple[float, int]] = {}
+        # 変換中の入力と、変換中に再び更新された入力
+        self._running: Dict[Future, Path] = {}
+        self._dirty: Set[Path] = set()
+        self._started = False
+        self._closed = False
+
+        self.converted = 0
+        self.failed = 0
+        self.up_to_date = 0
+
+    def _open_source(self, backend: str, poll_interval: float) -> Any:
+        if backend in (BACKEND_AUTO, BACKEND_INOTIFY):
+            try:
+                return _InotifySource(self.root, self.recursive)
+            except OSError as e:
+                if backend == BACKEND_INOTIFY:
+                    raise
+                logger.debug(f"inotify not available ({e}), falling back to polling")
+        walk_options = dict(detect_by_content=self.detect_by_content, include=self.include, exclude=self.exclude)
+        return _PollingSource(self.root, self.recursive, poll_interval, walk_options)
+
+    def start(self) -> None:
+        """ディレクトリ全体を既存の出力と突き合わせ、未変換の入力を投入する（run() から一度だけ呼ばれる）"""
+        if self._started:
+            return
+        self._started = True
+        # 監視を始めてから走査するため、走査中に追加されたファイルも取りこぼさない
+        queued = self._reconcile(self.root)
+        logger.info(
+            f"Watching {self.root} ({self.backend}, {self.jobs} workers): "
+            f"{queued} to convert, {self.up_to_date} up to date"
+        )
+
+    def _reconcile(self, directory: Path) -> int:
+        """ディレクトリを走査し、変換が必要な入力を待機列に入れる（戻り値はその件数）"""
+        root_walk_options = dict(detect_by_content=self.detect_by_content, include=self.include, exclude=self.exclude)
+        if directory == self.root:
+            walk_options = root_walk_options
+        else:
+            # パターンは監視ディレクトリからの相対パスで判定する
+            walk_options = dict(detect_by_content=self.detect_by_content)
+        paths = [
+            path for path in iter_webp_files([directory], recursive=self.recursive, **walk_options)
+            if directory == self.root or matches_filters(path, self.root, self.include, self.exclude)
+        ]
+        if directory == self.root or self.output_dir is None:
+            claimants = paths
+        else:
+            # 出力ディレクトリには他のディレクトリの入力も書き込むため、監視ディレクトリ全体で名前の重複を調べる
+            claimants = list(iter_webp_files([self.root], recursive=self.recursive, **root_walk_options))
+        claimed: Set[Path] = set()
+        shared_outputs: Set[Path] = set()
+        for path in claimants:
+            output_path = generate_output_path(path, self.output_dir)
+            if output_path in claimed:
+                shared_outputs.add(output_path)
+            claimed.add(output_path)
+
+        queued = 0
+        for path in paths:
+            if path in self._pending or path in self._running.values():
+                continue
+            if self._is_up_to_date(path, shared_outputs):
+                self.up_to_date += 1
+                continue
+            self._touch(path)
+            queued += 1
+        return queued
+
+    def _is_up_to_date(self, path: Path, shared_outputs: Set[Path]) -> bool:
+        """
+        マニフェストの記録、または入力より新しい出力があれば変換済みとみなす
+
+        他の入力と出力名が重なる場合は、既存の出力がどちらのものか分からないためマニフェストの記録でのみ判定する。
+        """
+        if self.manifest.lookup(path, self._options_key) is not None:
+            return True
+        if self.convert_options.get('renditions'):
+            # 複数の出力はマニフェストの記録でのみ判定する
+            return False
+        output_path = generate_output_path(path, self.output_dir)
+        if output_path in shared_outputs:
+            return False
+        try:
+            output_stat = output_path.stat()
+            input_stat = path.stat()
+        except OSError:
+            return False
+        if output_stat.st_size == 0 or output_stat.st_mtime_ns < input_stat.st_mtime_ns:
+            return False
+        # 次回からはマニフェストで判定できるよう記録しておく
+        try:
+            self.manifest.record(path, output_path, self._options_key)
+        except OSError as e:
+            logger.warning(f"Could not record {path} in manifest: {e}")
+        return True
+
+    def _touch(self, path: Path) -> None:
+        """入力を書き込み完了待ちにする（既に待っている場合は待ち時間を延ばす）"""
+        if path in self._running.values():
+            # 変換中に更新されたものは変換の完了後に改めて待つ
+            self._dirty.add(path)
+            return
+        try:
+            size = path.stat().st_size
+        except OSError:
+            self._pending.pop(path, None)
+            return
+        self._pending[path] = (time.monotonic(), size)
+
+    def _accepts(self, path: Path) -> bool:
+        """イベントのあったファイルが変換対象か"""
+        if not self.recursive and path.parent != self.root:
+            return False
+        if not matches_filters(path, self.root, self.include, self.exclude):
+            return False
+        return _is_webp_candidate(path.name, str(path), self.detect_by_content)
+
+    def _handle(self, path: Path, event: str) -> None:
+        if event == EVENT_RESCAN:
+            self._reconcile(path)
+        elif event == EVENT_MODIFIED:
+            if path in self._pending:
+                self._touch(path)
+        elif self._accepts(path):
+            self._touch(path)
+
+    def _submit_ready(self) -> None:
+        """debounce 秒以上サイズが変わっていない入力をワーカープールに投入する"""
+        now = time.monotonic()
+        for path, (changed_at, size) in list(self._pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            try:
+                current_size = path.stat().st_size
+            except OSError:
+                # 変換前に削除・移動された
+                del self._pending[path]
+                continue
+            if current_size != size:
+                self._pending[path] = (now, current_size)
+                continue
+            del self._pending[path]
+            self._submit(path)
+
+    def _submit(self, path: Path) -> None:
+        # 更新された入力は新しい名前を作らず、マニフェストに記録された前回の出力を置き換える
+        previous_outputs = [] if self.force else self.manifest.previous_outputs(path)
+        future = self._pool.submit(
+            _convert_one,
+            path, self.output_dir, self.force, self.preserve_metadata,
+            self._dir_cache, self.convert_options, self._name_allocator, False, previous_outputs
+        )
+        self._running[future] = path
+
+    def _collect(self, wait: bool = False) -> None:
+        """完了した変換の結果を記録する"""
+        for future in [future for future in self._running if wait or future.done()]:
+            path = self._running.pop(future)
+            if future.cancelled():
+                continue
+            result = future.result()
+            if result.status == STATUS_SUCCESS:
+                self.converted += 1
+                try:
+                    self.manifest.record(path, result.output_path, self._options_key, result.output_paths)
+                except OSError as e:
+                    logger.warning(f"Could not record {path} in manifest: {e}")
+            elif not result.ok:
+                self.failed += 1
+            if self.on_result is not None:
+                self.on_result(result)
+            if path in self._dirty:
+                self._dirty.discard(path)
+                self._touch(path)
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """
+        stop がセットされるまで（Noneの場合は割り込まれるまで）監視して変換する
+
+        終了時は実行中の変換の完了を待ち、未着手の変換は破棄する（次回の起動時に変換される）。
+
+        Args:
+            stop: 終了を指示するイベント
+        """
+        if stop is None:
+            stop = threading.Event()
+        self.start()
+        try:
+            while not stop.is_set():
+                for path, event in self._source.poll(_TICK):
+                    self._handle(path, event)
+                self._submit_ready()
+                self._collect()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """監視とワーカープールを終了する"""
+        if self._closed:
+            return
+        self._closed = True
+        self._source.close()
+        # 未着手の変換は取り消す（shutdown の cancel_futures は Python 3.9 以降のみ）
+        for future in self._running:
+            future.cancel()
+        self._pool.shutdown(wait=True)
+        self._collect(wait=True)
+        if self._owns_manifest:
+            self.manifest.close()
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def watch(root: Path, stop: Optional[threading.Event] = None, **watch_options: Any) -> Watcher:
+    """
+    ディレクトリを監視して変換する（stop がセットされるか割り込まれるまで戻らない）
+
+    Args:
+        root: 監視するディレクトリ
+        stop: 終了を指示するイベント
+        **watch_options: Watcher に渡すオプション（output_dir, jobs, profile など）
+
+    Returns:
+        終了した Watcher（converted, failed, up_to_date で件数を参照できる）
+    """
+    watcher = Watcher(root, **watch_options)
+    watcher.run(stop)
+    return watcher